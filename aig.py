@@ -0,0 +1,182 @@
+from gates import GATE_SIZES, tseitin
+from typing import Dict, List
+
+class AIG:
+    """
+    And-inverter graph for building circuits before they are Tseitin-encoded.
+    Besides AND nodes, it has XOR and 3-input XOR/majority nodes, so that
+    adders keep their compact encodings.
+
+    A literal is 2 * node + complement, and node 0 is the constant false, so
+    FALSE = 0 and TRUE = 1. Gates are structurally hashed, so building the
+    same gate twice returns the same literal, and constant or trivial inputs
+    are folded away while the graph is built. Only the gates in the cone of
+    the requested outputs are encoded.
+    """
+
+    FALSE = 0
+    TRUE  = 1
+
+    def __init__(self):
+        self.nodes = [('const',)] # node -> ('const',) | ('input',) | (kind, *fanins)
+        self.inputs = []          # input nodes, in creation order
+        self.table = {}           # (kind, *fanins) -> node
+
+    @staticmethod
+    def NOT(a: int) -> int:
+        return a ^ 1
+
+    def new_input(self) -> int:
+        self.nodes.append(('input',))
+        self.inputs.append(len(self.nodes) - 1)
+        return 2 * (len(self.nodes) - 1)
+
+    def _node(self, *key) -> int:
+        node = self.table.get(key)
+        if node == None:
+            self.nodes.append(key)
+            node = len(self.nodes) - 1
+            self.table[key] = node
+        return 2 * node
+
+    def AND(self, a: int, b: int) -> int:
+        if a > b: a, b = b, a
+        if a == self.FALSE: return self.FALSE
+        if a == self.TRUE:  return b
+        if a == b:          return a
+        if a == b ^ 1:      return self.FALSE
+        return self._node('and', a, b)
+
+    def OR(self, a: int, b: int) -> int:
+        return self.AND(a ^ 1, b ^ 1) ^ 1
+
+    def XOR(self, a: int, b: int) -> int:
+        # Move the complements to the output
+        parity = (a & 1) ^ (b & 1)
+        a, b = a & ~1, b & ~1
+        if a > b: a, b = b, a
+        if a == self.FALSE: return b ^ parity
+        if a == b:          return parity
+        return self._node('xor', a, b) ^ parity
+
+    def XOR3(self, a: int, b: int, c: int) -> int:
+        parity = (a & 1) ^ (b & 1) ^ (c & 1)
+        a, b, c = sorted([a & ~1, b & ~1, c & ~1])
+        if a == self.FALSE: return self.XOR(b, c) ^ parity
+        if a == b:          return c ^ parity
+        if b == c:          return a ^ parity
+        return self._node('xor3', a, b, c) ^ parity
+
+    def MAJ(self, a: int, b: int, c: int) -> int:
+        a, b, c = sorted([a, b, c])
+        if a == self.FALSE: return self.AND(b, c)
+        if a == self.TRUE:  return self.OR(b, c)
+        if a == b or b == c: return b
+        if a == b ^ 1:      return c
+        if b == c ^ 1:      return a
+        if a == c ^ 1:      return b
+        return self._node('maj', a, b, c)
+
+    def half_adder(self, a: int, b: int):
+        return self.XOR(a, b), self.AND(a, b)
+
+    def full_adder(self, a: int, b: int, c: int):
+        return self.XOR3(a, b, c), self.MAJ(a, b, c)
+
+    def cone(self, outputs: List[int]) -> List[int]:
+        """
+        Get the gate nodes that some output depends on, in topological order
+        """
+        live = set()
+        stack = [lit >> 1 for lit in outputs]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node in live or self.nodes[node][0] not in GATE_SIZES: continue
+            live.add(node)
+            stack += [lit >> 1 for lit in self.nodes[node][1:]]
+        return sorted(live)
+
+    def count_cnf(self, outputs: List[int]):
+        """
+        Get the (nvars, nclauses, nliterals) of to_cnf(outputs), without encoding
+        """
+        gates = self.cone(outputs)
+        nvars = len(self.inputs) + len(gates)
+        nclauses = sum(GATE_SIZES[self.nodes[node][0]][0] for node in gates)
+        nliterals = sum(GATE_SIZES[self.nodes[node][0]][1] for node in gates)
+        for (kind, count) in self._output_fixups(outputs):
+            nvars += count
+            nclauses += count * (1 if kind == 'const' else 2)
+            nliterals += count * (1 if kind == 'const' else 4)
+        return nvars, nclauses, nliterals
+
+    def _output_fixups(self, outputs: List[int]):
+        """
+        Outputs must be positive variables, so constant outputs share one fresh
+        variable per polarity, and each distinct complemented output gets a
+        fresh variable equivalent to it
+        """
+        consts = { lit for lit in outputs if lit >> 1 == 0 }
+        complemented = { lit for lit in outputs if lit >> 1 != 0 and lit & 1 }
+        return [('const', len(consts)), ('equiv', len(complemented))]
+
+    def to_cnf(self, outputs: List[int], offset: int = 1):
+        """
+        Tseitin-encode the cone of the outputs. Inputs get the first variables
+        (in creation order), followed by the live gates.
+
+        Returns (nvars, clauses, input_vars, output_vars)
+        """
+        original_offset = offset
+        var: Dict[int, int] = {}
+        for node in self.inputs:
+            var[node] = offset
+            offset += 1
+        gates = self.cone(outputs)
+        for node in gates:
+            var[node] = offset
+            offset += 1
+
+        def dimacs(lit: int) -> int:
+            return var[lit >> 1] * (-1 if lit & 1 else 1)
+
+        clauses = []
+        for node in gates:
+            (kind, *fanins) = self.nodes[node]
+            clauses += tseitin(kind, var[node], *[dimacs(lit) for lit in fanins])
+
+        # Give every output a positive variable
+        fixed = {}
+        output_vars = []
+        for lit in outputs:
+            if lit not in fixed:
+                if lit >> 1 != 0 and not lit & 1:
+                    fixed[lit] = var[lit >> 1]
+                else:
+                    fixed[lit] = offset
+                    if lit >> 1 == 0: clauses.append([offset if lit == self.TRUE else -offset])
+                    else:             clauses += [[offset, dimacs(lit ^ 1)], [-offset, dimacs(lit)]]
+                    offset += 1
+            output_vars.append(fixed[lit])
+
+        return offset - original_offset, clauses, [var[node] for node in self.inputs], output_vars
+
+def netlist_to_aig(aig: AIG, gates: list, assignment: Dict[int, int]) -> Dict[int, int]:
+    """
+    Rebuild a gate netlist (see generate_multiplier) in an AIG
+
+    @param assignment: AIG literal for each netlist input variable
+    @return AIG literal for every netlist variable
+    """
+    lits = dict(assignment)
+    def lit(v: int) -> int:
+        return lits[v] if v > 0 else AIG.NOT(lits[-v])
+
+    for (kind, out, *ins) in gates:
+        if   kind == 'and':  lits[out] = aig.AND(lit(ins[0]), lit(ins[1]))
+        elif kind == 'xor':  lits[out] = aig.XOR(lit(ins[0]), lit(ins[1]))
+        elif kind == 'xor3': lits[out] = aig.XOR3(lit(ins[0]), lit(ins[1]), lit(ins[2]))
+        elif kind == 'maj':  lits[out] = aig.MAJ(lit(ins[0]), lit(ins[1]), lit(ins[2]))
+        elif kind == 'zero': lits[out] = AIG.FALSE
+        else: assert(False), f'Unknown gate {kind}'
+    return lits
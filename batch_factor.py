@@ -0,0 +1,118 @@
+import argparse, sys, time
+from pysat.solvers import Solver
+from generate_multiplier import ASYMMETRIC_MULTIPLIERS, MULTIPLIERS, add_native_clauses, factor_widths, stream_asymmetric_multiplier
+
+class CryptoMiniSat:
+    """
+    The subset of the pysat solver interface used below, over pycryptosat,
+    which takes the XorClauses of a native_xor multiplier as XOR constraints
+    """
+
+    def __init__(self, bootstrap_with = ()):
+        import pycryptosat
+        self.solver = pycryptosat.Solver()
+        self.model = None
+        add_native_clauses(self.solver, bootstrap_with)
+
+    def add_clause(self, clause):
+        add_native_clauses(self.solver, [clause])
+
+    def solve(self, assumptions = []):
+        sat, solution = self.solver.solve(assumptions)
+        # solution[v] is the value of variable v (solution[0] is unused)
+        self.model = [ v if solution[v] else -v for v in range(1, len(solution)) ] if sat else None
+        return sat
+
+    def get_model(self):
+        return self.model
+
+    def delete(self):
+        self.solver = None
+
+class FactoringService:
+    """
+    Factor many integers of a fixed bit width with one multiplier and one
+    incremental solver. The multiplier and the 'x != 1', 'y != 1' side
+    conditions are added once; each query only passes the bits of the
+    composite as assumptions on the product bits.
+
+    With native_xor, the adders' sum bits are given to the solver as XOR
+    constraints, which needs the 'cryptominisat' solver (pycryptosat).
+    With asymmetric, the multiplier is only as wide as factor_widths(n).
+    """
+
+    def __init__(self, n: int, arch: str = 'array', solver: str = 'glucose3', native_xor: bool = False, asymmetric: bool = False):
+        if native_xor and solver != 'cryptominisat':
+            raise ValueError(f'Solver {solver} does not accept native XORs')
+        self.n = n
+        if asymmetric: multiplier = stream_asymmetric_multiplier(*factor_widths(n), arch=arch, native_xor=native_xor)
+        else:          multiplier = MULTIPLIERS[arch](n, native_xor=native_xor)
+        nvars, nclauses, clauses, self.x_vars, self.y_vars, self.out_vars = multiplier
+        if solver == 'cryptominisat': self.solver = CryptoMiniSat(bootstrap_with=clauses)
+        else:                         self.solver = Solver(name=solver, bootstrap_with=clauses)
+
+        # Assert that inputs are not equal to 1
+        self.solver.add_clause(self.x_vars[1:] + [-self.x_vars[0]])
+        self.solver.add_clause(self.y_vars[1:] + [-self.y_vars[0]])
+
+    def factor(self, c: int):
+        """
+        Get a nontrivial factor pair (x, y) with x <= y, or None if there is none
+        """
+        if c < 0 or c.bit_length() > self.n:
+            raise ValueError(f'{c} does not fit in {self.n} bits')
+
+        assumptions = [ o if (c >> i) & 1 else -o for i, o in enumerate(self.out_vars) ]
+        if not self.solver.solve(assumptions=assumptions): return None
+
+        model = self.solver.get_model()
+        x = sum(1 << i for i, v in enumerate(self.x_vars) if model[v - 1] > 0)
+        y = sum(1 << i for i, v in enumerate(self.y_vars) if model[v - 1] > 0)
+        return (y, x) if x > y else (x, y)
+
+    def factor_all(self, numbers):
+        """
+        Factor a stream of integers, yielding (c, factors, seconds) per query
+        """
+        for c in numbers:
+            start = time.perf_counter()
+            factors = self.factor(c)
+            yield c, factors, time.perf_counter() - start
+
+    def close(self):
+        self.solver.delete()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog = 'BatchFactoring',
+        description = "Factors a stream of integers (one per line) with a single reusable multiplier and solver"
+    )
+
+    parser.add_argument('-b', '--bits', type=int, required=True, help='bit width of the integers')
+    parser.add_argument('-a', '--arch', choices=MULTIPLIERS.keys(), default='array', help='multiplier architecture')
+    parser.add_argument('-s', '--solver', default='glucose3', help='pysat solver name, or cryptominisat (needs pycryptosat)')
+    parser.add_argument('--asymmetric', action='store_true', help='use an (n-1) x ceil(n/2)-bit multiplier (only with array or carrysave)')
+    parser.add_argument('--xor', action='store_true', help='give the adders\' sum bits to the solver as native XORs (only with cryptominisat)')
+    parser.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+
+    args = parser.parse_args()
+    if args.bits < 1:
+        parser.error('The bit width must be positive')
+    if args.xor and args.solver != 'cryptominisat':
+        parser.error('--xor needs the cryptominisat solver')
+    if args.asymmetric and args.arch not in ASYMMETRIC_MULTIPLIERS:
+        parser.error(f'--asymmetric is only supported with {", ".join(ASYMMETRIC_MULTIPLIERS)}')
+
+    start = time.perf_counter()
+    service = FactoringService(args.bits, args.arch, args.solver, args.xor, args.asymmetric)
+    print(f'c built {args.bits}-bit {args.arch} multiplier in {time.perf_counter() - start:.3f}s')
+
+    numbers = (int(line) for line in args.input if line.strip())
+    total = 0
+    for c, factors, seconds in service.factor_all(numbers):
+        total += seconds
+        if factors == None: print(f'{c} UNSAT {seconds:.6f}')
+        else:               print(f'{c} {factors[0]} {factors[1]} {seconds:.6f}')
+        sys.stdout.flush()
+    print(f'c total solve time {total:.3f}s')
+    service.close()
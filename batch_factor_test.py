@@ -0,0 +1,11 @@
+from batch_factor import FactoringService
+
+def test_batch_factoring():
+    for asymmetric in [False, True]:
+        service = FactoringService(7, asymmetric=asymmetric)
+        results = { c: factors for c, factors, seconds in service.factor_all([8, 13, 21, 65, 121, 127]) }
+        service.close()
+        assert results == { 8: (2, 4), 13: None, 21: (3, 7), 65: (5, 13), 121: (11, 11), 127: None }
+
+if __name__ == '__main__':
+    test_batch_factoring()
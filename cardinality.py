@@ -0,0 +1,178 @@
+import math
+from itertools import combinations
+from typing import List
+
+# At-most-one encodings, with their auxiliary variables:
+# 'pairwise'   no auxiliary variables, k(k-1)/2 binary clauses
+# 'sequential' Sinz's sequential counter, k - 1 prefix variables
+# 'commander'  Klieber & Kwon, one commander per group of COMMANDER_GROUP_SIZE, recursively
+# 'product'    Chen, a row and a column variable per cell of a sqrt(k) x sqrt(k) grid, recursively
+# 'binary'     Frisch, every variable implies its index in ceil(log2 k) bits
+# 'bimander'   Nguyen & Mai, pairwise within groups of BIMANDER_GROUP_SIZE and binary over the groups
+# 'ladder'     Gent & Nightingale, k - 1 prefix variables defined by full channeling
+AMO_ENCODINGS = ['pairwise', 'sequential', 'commander', 'product', 'binary', 'bimander', 'ladder']
+
+# Groups of at most this many variables use pairwise clauses, which are
+# smaller than any other encoding there
+MAX_PAIRWISE = 4
+
+COMMANDER_GROUP_SIZE = 3
+BIMANDER_GROUP_SIZE = 2
+
+def _pairwise(vs: List[int]) -> List[List[int]]:
+    return [ [-a, -b] for (a, b) in combinations(vs, 2) ]
+
+def _binary_bits(vs: List[int], groups: List[List[int]], new_var) -> List[List[int]]:
+    """
+    Clauses implying the index of its group in binary from every variable
+    """
+    bits = [ new_var() for _ in range((len(groups) - 1).bit_length()) ]
+    return [ [-v, b if (g >> j) & 1 else -b] for g, group in enumerate(groups) for v in group for j, b in enumerate(bits) ]
+
+def _ladder(vs: List[int], new_var):
+    """
+    Ladder of y_i <=> some of the first i variables is true, and x_i => NOT y_(i-1)
+
+    Returns (clauses, y)
+    """
+    k = len(vs)
+    y = [ new_var() for _ in range(k - 1) ]
+    clauses = [ [-y[i], y[i + 1]] for i in range(k - 2) ]
+    clauses += [[-vs[0], y[0]], [vs[0], -y[0]]]
+    for i in range(1, k - 1):
+        clauses += [[-vs[i], y[i]], [-vs[i], -y[i - 1]], [vs[i], -y[i], y[i - 1]]]
+    clauses.append([-vs[k - 1], -y[k - 2]])
+    return clauses, y
+
+def _groups(vs: List[int], size: int) -> List[List[int]]:
+    return [ vs[i:i + size] for i in range(0, len(vs), size) ]
+
+def at_most_one(vs: List[int], encoding: str = 'pairwise', new_var = None, max_pairwise: int = None) -> List[List[int]]:
+    """
+    Clauses encoding that at most one of vs is true. Every encoding propagates
+    as well as the pairwise one: setting a variable to true falsifies all the
+    others by unit propagation.
+
+    @param encoding : one of AMO_ENCODINGS
+    @param new_var  : function allocating an auxiliary variable (required by all but 'pairwise')
+    @param max_pairwise: groups up to this size use the pairwise encoding (at least 2)
+    """
+    if max_pairwise == None: max_pairwise = MAX_PAIRWISE
+    vs = list(vs)
+    k = len(vs)
+    if encoding == 'pairwise' or k <= max(2, max_pairwise): return _pairwise(vs)
+    assert(new_var != None), f'The {encoding} encoding needs auxiliary variables'
+
+    if encoding == 'sequential':
+        # s_i => some of the first i variables is true
+        s = [ new_var() for _ in range(k - 1) ]
+        clauses = [[-vs[0], s[0]]]
+        for i in range(1, k - 1):
+            clauses += [[-vs[i], s[i]], [-s[i - 1], s[i]], [-vs[i], -s[i - 1]]]
+        clauses.append([-vs[k - 1], -s[k - 2]])
+        return clauses
+
+    if encoding == 'ladder':
+        return _ladder(vs, new_var)[0]
+
+    if encoding == 'commander':
+        if k <= COMMANDER_GROUP_SIZE: return _pairwise(vs)
+        clauses = []
+        commanders = []
+        for group in _groups(vs, COMMANDER_GROUP_SIZE):
+            # A single variable is its own commander
+            if len(group) == 1:
+                commanders.append(group[0])
+                continue
+            c = new_var()
+            commanders.append(c)
+            clauses += _pairwise(group)
+            clauses += [ [-v, c] for v in group ]
+            clauses.append([-c] + group)
+        return clauses + at_most_one(commanders, encoding, new_var, max_pairwise)
+
+    if encoding == 'product':
+        # Variable i is cell (i // q, i % q) of the grid
+        q = math.ceil(k / math.ceil(math.sqrt(k)))
+        rows = [ new_var() for _ in range(math.ceil(k / q)) ]
+        columns = [ new_var() for _ in range(q) ]
+        clauses = []
+        for i, v in enumerate(vs):
+            clauses += [[-v, rows[i // q]], [-v, columns[i % q]]]
+        return clauses + at_most_one(rows, encoding, new_var, max_pairwise) + at_most_one(columns, encoding, new_var, max_pairwise)
+
+    if encoding == 'binary':
+        return _binary_bits(vs, [ [v] for v in vs ], new_var)
+
+    if encoding == 'bimander':
+        groups = _groups(vs, BIMANDER_GROUP_SIZE)
+        return [ clause for group in groups for clause in _pairwise(group) ] + _binary_bits(vs, groups, new_var)
+
+    assert(False), f'Unknown at-most-one encoding {encoding}'
+
+def exactly_one(vs: List[int], encoding: str = 'pairwise', new_var = None, max_pairwise: int = None) -> List[List[int]]:
+    """
+    Clauses encoding that exactly one of vs is true: the at-least-one clause
+    followed by at_most_one. In the ladder encoding, the at-least-one clause
+    is the missing channeling clause instead (the last variable is true
+    unless an earlier one is).
+    """
+    if max_pairwise == None: max_pairwise = MAX_PAIRWISE
+    vs = list(vs)
+    if encoding == 'ladder' and len(vs) > max(2, max_pairwise):
+        (clauses, y) = _ladder(vs, new_var)
+        return clauses + [[vs[-1], y[-1]]]
+    return [vs] + at_most_one(vs, encoding, new_var, max_pairwise)
+
+def count_at_most_one(k: int, encoding: str = 'pairwise', max_pairwise: int = None):
+    """
+    Get the (nauxiliary, nclauses, nliterals) of at_most_one over k variables
+    """
+    if max_pairwise == None: max_pairwise = MAX_PAIRWISE
+    if encoding == 'pairwise' or k <= max(2, max_pairwise): return 0, k * (k - 1) // 2, k * (k - 1)
+
+    if encoding == 'sequential':
+        return k - 1, 3 * k - 4, 6 * k - 8
+
+    if encoding == 'ladder':
+        return k - 1, 4 * k - 5, 9 * k - 12
+
+    if encoding == 'commander':
+        if k <= COMMANDER_GROUP_SIZE: return count_at_most_one(k, 'pairwise')
+        naux = nclauses = nliterals = 0
+        sizes = [ len(group) for group in _groups(list(range(k)), COMMANDER_GROUP_SIZE) ]
+        for size in sizes:
+            if size == 1: continue
+            naux += 1
+            nclauses += size * (size - 1) // 2 + size + 1
+            nliterals += size * (size - 1) + 2 * size + size + 1
+        (a, c, l) = count_at_most_one(len(sizes), encoding, max_pairwise)
+        return naux + a, nclauses + c, nliterals + l
+
+    if encoding == 'product':
+        q = math.ceil(k / math.ceil(math.sqrt(k)))
+        p = math.ceil(k / q)
+        (a1, c1, l1) = count_at_most_one(p, encoding, max_pairwise)
+        (a2, c2, l2) = count_at_most_one(q, encoding, max_pairwise)
+        return p + q + a1 + a2, 2 * k + c1 + c2, 4 * k + l1 + l2
+
+    if encoding == 'binary':
+        bits = (k - 1).bit_length()
+        return bits, k * bits, 2 * k * bits
+
+    if encoding == 'bimander':
+        sizes = [ len(group) for group in _groups(list(range(k)), BIMANDER_GROUP_SIZE) ]
+        bits = (len(sizes) - 1).bit_length()
+        npairs = sum(size * (size - 1) // 2 for size in sizes)
+        return bits, npairs + k * bits, 2 * npairs + 2 * k * bits
+
+    assert(False), f'Unknown at-most-one encoding {encoding}'
+
+def count_exactly_one(k: int, encoding: str = 'pairwise', max_pairwise: int = None):
+    """
+    Get the (nauxiliary, nclauses, nliterals) of exactly_one over k variables
+    """
+    if max_pairwise == None: max_pairwise = MAX_PAIRWISE
+    (naux, nclauses, nliterals) = count_at_most_one(k, encoding, max_pairwise)
+    if encoding == 'ladder' and k > max(2, max_pairwise): return naux, nclauses + 1, nliterals + 2
+    return naux, nclauses + 1, nliterals + k
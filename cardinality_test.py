@@ -0,0 +1,68 @@
+import itertools, os, sys
+from pysat.solvers import Glucose3
+from cardinality import *
+from generate_PHP import PigeonholePrinciple, countPigeonholePrinciple, writePigeonholePrinciple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'games'))
+from flow_free import FlowFreeBoard
+
+def test_encodings():
+    for encoding in AMO_ENCODINGS:
+        for max_pairwise in [2, MAX_PAIRWISE]:
+            for k in range(0, 14):
+                for exact in [False, True]:
+                    top = k
+                    def new_var():
+                        nonlocal top
+                        top += 1
+                        return top
+                    vs = list(range(1, k + 1))
+                    build = exactly_one if exact else at_most_one
+                    count = count_exactly_one if exact else count_at_most_one
+                    clauses = build(vs, encoding, new_var, max_pairwise)
+                    assert count(k, encoding, max_pairwise) == (top - k, len(clauses), sum(len(clause) for clause in clauses))
+
+                    g = Glucose3(bootstrap_with=clauses)
+                    if k <= 8:
+                        for bits in itertools.product([False, True], repeat=k):
+                            assumptions = [ v if bit else -v for v, bit in zip(vs, bits) ]
+                            assert g.solve(assumptions=assumptions) == (sum(bits) == 1 if exact else sum(bits) <= 1), f"{encoding}: {bits}"
+
+                    # Propagation must be as strong as with pairwise clauses
+                    for v in vs:
+                        (ok, lits) = g.propagate(assumptions=[v])
+                        assert ok and all(-u in lits for u in vs if u != v), f"{encoding}: {v} does not falsify the others"
+                    g.delete()
+
+def test_pigeonhole_encodings():
+    for encoding in AMO_ENCODINGS:
+        for numHoles in range(1, 7):
+            for numPigeons in [numHoles, numHoles + 1]:
+                for extensionMode in range(3):
+                    (numVars, clauses, extLevels) = PigeonholePrinciple(numPigeons, numHoles, True, extensionMode, None, encoding, encoding)
+                    numLiterals = sum(len(clause) for clause in clauses)
+                    assert countPigeonholePrinciple(numPigeons, numHoles, True, extensionMode, encoding, encoding) == (numVars, len(clauses), numLiterals)
+                    assert len(extLevels) == numVars and max(max(map(abs, clause)) for clause in clauses) <= numVars
+
+                    with Glucose3(bootstrap_with=clauses) as g:
+                        assert g.solve() == (numPigeons <= numHoles)
+
+def test_flow_free_encodings():
+    # One straight flow per row, and two flows that have to cross
+    boards = [
+        (6, 6, 6, [[i + 1] + [0] * 4 + [i + 1] for i in range(6)], True),
+        (2, 2, 2, [[1, 2], [2, 1]], False),
+    ]
+    for (width, height, numFlows, data, sat) in boards:
+        board = FlowFreeBoard(width, height, numFlows, data)
+        for encoding in AMO_ENCODINGS:
+            numVars, clauses = board.generateConstraints(None, encoding, encoding)
+            numLiterals = sum(len(clause) for clause in clauses)
+            assert board.countConstraints(encoding, encoding) == (numVars, len(clauses), numLiterals)
+            with Glucose3(bootstrap_with=clauses) as g:
+                assert g.solve() == sat
+
+if __name__ == '__main__':
+    test_encodings()
+    test_pigeonhole_encodings()
+    test_flow_free_encodings()
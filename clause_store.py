@@ -0,0 +1,185 @@
+import sys
+from array import array
+from typing import Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Literals up to this variable index are looked up in a prebuilt token table
+# (a few MB); larger ones are formatted on the fly
+MAX_TOKEN_TABLE = 1 << 16
+
+def literal_tokens(bound: int):
+    """
+    Get a function mapping each literal in [-bound, bound] to its DIMACS token
+    ('lit ' for a literal, '0\\n' for a clause terminator)
+
+    Literals up to MAX_TOKEN_TABLE are a lookup into a prebuilt table, where
+    negative literals use Python's negative indexing.
+    """
+    size = min(bound, MAX_TOKEN_TABLE)
+    table = ['0\n'] + [f'{i} ' for i in range(1, size + 1)] + [f'{i} ' for i in range(-size, 0)]
+    if bound <= size: return table.__getitem__
+    return lambda lit: table[lit] if -size <= lit <= size else f'{lit} '
+
+def binary_drat_tokens(bound: int):
+    """
+    Get a function mapping each literal in [-bound, bound] to its binary DRAT
+    encoding: 2 * var + (1 if negative), in little-endian groups of 7 bits
+    with the high bit set on every group but the last (0 terminates a clause)
+    """
+    def encode(lit: int) -> bytes:
+        u = 2 * lit if lit >= 0 else -2 * lit + 1
+        out = bytearray()
+        while u > 0x7F:
+            out.append((u & 0x7F) | 0x80)
+            u >>= 7
+        out.append(u)
+        return bytes(out)
+
+    size = min(bound, MAX_TOKEN_TABLE)
+    table = [b'\0'] + [encode(i) for i in range(1, size + 1)] + [encode(i) for i in range(-size, 0)]
+    if bound <= size: return table.__getitem__
+    return lambda lit: table[lit] if -size <= lit <= size else encode(lit)
+
+def write_binary_drat(steps: Iterable, bound: int, file = sys.stdout.buffer, chunk_size: int = 1 << 16):
+    """
+    Output a proof in binary DRAT format
+
+    @param steps: iterable of ('a', clause) additions and ('d', clause) deletions
+    @param bound: largest variable index appearing in the proof
+    """
+    to_bytes = binary_drat_tokens(bound)
+    prefix = { 'a': b'a', 'd': b'd' }
+    chunk = []
+    for (kind, clause) in steps:
+        chunk.append(prefix[kind])
+        chunk.extend(map(to_bytes, clause))
+        chunk.append(b'\0')
+        if len(chunk) >= chunk_size:
+            file.write(b''.join(chunk))
+            chunk = []
+    file.write(b''.join(chunk))
+
+def estimate_dimacs_bytes(nvars: int, nclauses: int, nliterals: int) -> int:
+    """
+    Estimate the size of a DIMACS file from its dimensions, assuming variables
+    are spread uniformly over [1, nvars] and half of the literals are negative
+    """
+    # Average number of digits of a variable in [1, nvars]
+    digits = 0
+    lo = 1
+    while lo <= nvars:
+        hi = min(nvars, 10 * lo - 1)
+        digits += len(str(lo)) * (hi - lo + 1)
+        lo *= 10
+    avg_digits = digits / max(1, nvars)
+
+    header = len(f'p cnf {nvars} {nclauses}\n')
+    return header + round(nliterals * (avg_digits + 1.5)) + 2 * nclauses
+
+def print_size_estimate(nvars: int, nclauses: int, nliterals: int, file = sys.stdout):
+    """
+    Output the dimensions of a CNF without generating it
+    """
+    print(f'vars {nvars}', file=file)
+    print(f'clauses {nclauses}', file=file)
+    print(f'literals {nliterals}', file=file)
+    print(f'bytes {estimate_dimacs_bytes(nvars, nclauses, nliterals)}', file=file)
+
+class ClauseStore:
+    """
+    Compact CNF clause container.
+
+    Literals are kept in one flat int32 buffer in which every clause is
+    terminated by a 0 (exactly as in DIMACS), and clause i occupies
+    lits[offsets[i] : offsets[i + 1] - 1]. This costs 4 bytes per literal plus
+    12 bytes per clause, instead of a Python list object per clause.
+    """
+
+    def __init__(self, clauses: Iterable[Iterable[int]] = ()):
+        self.lits = array('i')
+        self.offsets = array('q', [0])
+        self.extend(clauses)
+
+    def append(self, clause: Iterable[int]):
+        self.lits.extend(clause)
+        self.lits.append(0)
+        self.offsets.append(len(self.lits))
+
+    def extend(self, clauses: Iterable[Iterable[int]]):
+        if isinstance(clauses, ClauseStore):
+            base = len(self.lits)
+            self.lits.extend(clauses.lits)
+            self.offsets.extend(base + offset for offset in clauses.offsets[1:])
+            return
+        for clause in clauses:
+            self.append(clause)
+
+    def __iadd__(self, clauses: Iterable[Iterable[int]]):
+        self.extend(clauses)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> List[int]:
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError('clause index out of range')
+        return self.lits[self.offsets[i]:self.offsets[i + 1] - 1].tolist()
+
+    def __iter__(self):
+        lits = self.lits
+        start = 0
+        for end in self.offsets[1:]:
+            yield lits[start:end - 1].tolist()
+            start = end
+
+    def shifted(self, delta: int):
+        """
+        Get a copy of the store with every variable index increased by delta
+        (i.e. each literal moves away from zero, keeping its sign)
+        """
+        result = ClauseStore()
+        result.offsets = array('q', self.offsets)
+        if np is not None:
+            lits = np.frombuffer(self.lits, dtype=np.int32)
+            result.lits.frombytes((lits + np.sign(lits) * np.int32(delta)).astype(np.int32).tobytes())
+        else:
+            result.lits = array('i', (lit + delta if lit > 0 else lit - delta if lit < 0 else 0 for lit in self.lits))
+        return result
+
+    def iter_shifted(self, delta: int):
+        """
+        Iterate over the clauses of shifted(delta), without building the copy
+        """
+        lits = self.lits
+        start = 0
+        for end in self.offsets[1:]:
+            yield [ lit + delta if lit > 0 else lit - delta for lit in lits[start:end - 1] ]
+            start = end
+
+    def num_literals(self) -> int:
+        return len(self.lits) - len(self)
+
+    def max_var(self) -> int:
+        return max(map(abs, self.lits), default=0)
+
+    def write_dimacs(self, nvars: int = None, file = sys.stdout, chunk_size: int = 1 << 16):
+        """
+        Output the whole store in DIMACS format
+
+        Literal tokens come from literal_tokens, so no str() call is made per
+        literal. Clauses are serialized in chunks of chunk_size.
+        """
+        if nvars is None: nvars = self.max_var()
+        file.write(f'p cnf {nvars} {len(self)}\n')
+
+        to_str = literal_tokens(max(nvars, self.max_var()))
+        lits = self.lits
+        offsets = self.offsets
+        for i in range(0, len(self), chunk_size):
+            chunk = lits[offsets[i]:offsets[min(i + chunk_size, len(self))]]
+            file.write(''.join(map(to_str, chunk)))
@@ -0,0 +1,47 @@
+import io
+from clause_store import MAX_TOKEN_TABLE, ClauseStore, write_binary_drat
+from generate_multiplier import generate_array_multiplier, write_cnf
+
+def test_clause_store():
+    for n in range(1, 6):
+        nvars, clauses, x_vars, y_vars, out_vars = generate_array_multiplier(n)
+        nvars, store, x_vars, y_vars, out_vars = generate_array_multiplier(n, store=ClauseStore)
+        assert len(store) == len(clauses)
+        assert list(store) == clauses
+
+        # Bulk writer must match the per-clause writer
+        expected = io.StringIO()
+        write_cnf(nvars, len(clauses), clauses, expected)
+        received = io.StringIO()
+        store.write_dimacs(nvars, received, chunk_size=7)
+        assert received.getvalue() == expected.getvalue()
+
+def test_large_literals():
+    # Literals on both sides of MAX_TOKEN_TABLE, so both the token table and
+    # the on-the-fly fallback are exercised
+    big = MAX_TOKEN_TABLE + 4464
+    clauses = [[1, -2, MAX_TOKEN_TABLE], [-MAX_TOKEN_TABLE - 1, big], [-big], [3, MAX_TOKEN_TABLE + 1, -5]]
+    store = ClauseStore(clauses)
+
+    expected = f'p cnf {big} {len(clauses)}\n' + ''.join(' '.join(map(str, clause + [0])) + '\n' for clause in clauses)
+    received = io.StringIO()
+    store.write_dimacs(file=received, chunk_size=3)
+    assert received.getvalue() == expected
+
+    def varint(lit):
+        u = 2 * abs(lit) + (lit < 0)
+        out = []
+        while True:
+            out.append(u & 0x7F | (0x80 if u > 0x7F else 0))
+            if u <= 0x7F: return out
+            u >>= 7
+
+    steps = [('a', clause) for clause in clauses] + [('d', clauses[1])]
+    expected = b''.join(kind.encode() + bytes(sum(map(varint, clause), [])) + b'\0' for (kind, clause) in steps)
+    proof = io.BytesIO()
+    write_binary_drat(steps, big, proof, chunk_size=5)
+    assert proof.getvalue() == expected
+
+if __name__ == '__main__':
+    test_clause_store()
+    test_large_literals()
@@ -0,0 +1,126 @@
+import argparse, multiprocessing, os, sympy, sys, time
+from pysat.solvers import Solver
+from generate_multiplier import ASYMMETRIC_MULTIPLIERS, FACTORING_CONSTRAINTS, MULTIPLIERS, factor_widths, stream_backward_multiplication
+
+def factoring_cubes(c: int, k: int):
+    """
+    Split factoring c into cubes over the lowest k bits of x and y: every
+    pair of residues (r, s) mod 2^k with r * s = c (mod 2^k). For odd c, only
+    odd r remain and s = c / r, so there are 2^(k-1) cubes out of 4^k.
+    """
+    mod = 1 << k
+    for r in range(mod):
+        if r & 1: yield r, c * pow(r, -1, mod) % mod
+        elif c & 1: continue
+        else:
+            for s in range(mod):
+                if r * s % mod == c % mod: yield r, s
+
+# Per-process state of the pool workers: (solver, x_vars, y_vars, k)
+_worker = None
+
+def _init_worker(c: int, k: int, arch: str, solver: str, asymmetric: bool, constraints):
+    global _worker
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c, arch, asymmetric=asymmetric, constraints=constraints)
+    _worker = (Solver(name=solver, bootstrap_with=clauses), x_vars, y_vars, k)
+
+def _solve_cube(cube):
+    """
+    Solve the instance under the assumptions of one cube
+
+    Returns (cube, factors or None, seconds, conflicts)
+    """
+    solver, x_vars, y_vars, k = _worker
+    (r, s) = cube
+    assumptions  = [ v if (r >> i) & 1 else -v for i, v in enumerate(x_vars[:k]) ]
+    assumptions += [ v if (s >> i) & 1 else -v for i, v in enumerate(y_vars[:k]) ]
+
+    conflicts = solver.accum_stats()['conflicts']
+    start = time.perf_counter()
+    factors = None
+    if solver.solve(assumptions=assumptions):
+        model = solver.get_model()
+        x = sum(1 << i for i, v in enumerate(x_vars) if model[v - 1] > 0)
+        y = sum(1 << i for i, v in enumerate(y_vars) if model[v - 1] > 0)
+        factors = (y, x) if x > y else (x, y)
+    return cube, factors, time.perf_counter() - start, solver.accum_stats()['conflicts'] - conflicts
+
+def cube_and_conquer(c: int, k: int = None, jobs: int = None, arch: str = 'array', solver: str = 'glucose3',
+                     asymmetric: bool = False, constraints = (), report = None):
+    """
+    Factor c by solving the cubes of factoring_cubes(c, k) over a pool of
+    worker processes. Each worker builds the instance once and solves its
+    cubes incrementally under assumptions. As soon as one cube yields a
+    factorization, the remaining workers are terminated.
+
+    @param k     : number of low bits per cube (default: enough for about 16 cubes per worker)
+    @param report: optional function called with each (cube, factors, seconds, conflicts)
+    @return (factors or None, stats)
+    """
+    if jobs == None: jobs = os.cpu_count()
+    n = max(1, c.bit_length())
+    width = min(factor_widths(n)) if asymmetric else n
+    if k == None: k = max(1, (16 * jobs).bit_length())
+    k = min(k, width)
+
+    cubes = list(factoring_cubes(c, k))
+    stats = { 'cubes': len(cubes), 'solved': 0, 'conflicts': 0, 'cube seconds': 0.0, 'max cube seconds': 0.0 }
+    start = time.perf_counter()
+    factors = None
+    pool = multiprocessing.Pool(jobs, _init_worker, (c, k, arch, solver, asymmetric, tuple(constraints)))
+    try:
+        for result in pool.imap_unordered(_solve_cube, cubes):
+            (cube, cube_factors, seconds, conflicts) = result
+            stats['solved'] += 1
+            stats['conflicts'] += conflicts
+            stats['cube seconds'] += seconds
+            stats['max cube seconds'] = max(stats['max cube seconds'], seconds)
+            if report != None: report(result)
+            if cube_factors != None:
+                factors = cube_factors
+                break
+    finally:
+        # Cancel the cubes still running or queued
+        pool.terminate()
+        pool.join()
+    stats['seconds'] = time.perf_counter() - start
+    return factors, stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog = 'CubeAndConquerFactoring',
+        description = "Factors an integer by solving cubes over the low bits of its factors in parallel"
+    )
+
+    parser.add_argument('-f', '--factor', type=int)
+    parser.add_argument('-F', '--factor_bits', type=int, help='factor a random prime of this many bits (an UNSAT instance)')
+    parser.add_argument('-k', '--cube_bits', type=int, help='number of low bits of x and y fixed by each cube')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('-a', '--arch', choices=MULTIPLIERS.keys(), default='array', help='multiplier architecture')
+    parser.add_argument('-s', '--solver', default='glucose3', help='pysat solver name')
+    parser.add_argument('--asymmetric', action='store_true', help='use an (n-1) x ceil(n/2)-bit multiplier (only with array or carrysave)')
+    parser.add_argument('--constraints', nargs='+', choices=FACTORING_CONSTRAINTS, default=[], help='side constraints added to every cube')
+    parser.add_argument('-v', '--verbose', action='store_true', help='report every cube')
+
+    args = parser.parse_args()
+    if (args.factor == None) == (args.factor_bits == None):
+        parser.error('Please request exactly one of -f and -F')
+    if args.asymmetric and args.arch not in ASYMMETRIC_MULTIPLIERS:
+        parser.error(f'--asymmetric is only supported with {", ".join(ASYMMETRIC_MULTIPLIERS)}')
+
+    c = args.factor
+    if c == None:
+        c = sympy.randprime(2**(args.factor_bits-1), 2**(args.factor_bits))
+    print(f'c factoring {c}')
+
+    def report(result):
+        (cube, factors, seconds, conflicts) = result
+        print(f'c cube x={cube[0]} y={cube[1]} {"SAT" if factors != None else "UNSAT"} {seconds:.3f}s {conflicts} conflicts')
+        sys.stdout.flush()
+
+    factors, stats = cube_and_conquer(c, args.cube_bits, args.jobs, args.arch, args.solver, args.asymmetric, args.constraints,
+                                      report if args.verbose else None)
+    for key, value in stats.items():
+        print(f'c {key} {value:.3f}' if isinstance(value, float) else f'c {key} {value}')
+    if factors == None: print('UNSAT')
+    else:               print(f'{factors[0]} {factors[1]}')
@@ -0,0 +1,17 @@
+from cube_factor import cube_and_conquer, factoring_cubes
+
+def test_cube_and_conquer():
+    # Cubes cover exactly the residue pairs with x * y = c (mod 2^k)
+    for c in range(0, 64):
+        for k in range(1, 5):
+            cubes = set(factoring_cubes(c, k))
+            assert cubes == { (r, s) for r in range(2 ** k) for s in range(2 ** k) if r * s % 2 ** k == c % 2 ** k }
+
+    for asymmetric in [False, True]:
+        for (c, expected) in [(143, (11, 13)), (1000006, (2, 500003)), (1009, None)]:
+            factors, stats = cube_and_conquer(c, 3, 2, 'carrysave', asymmetric=asymmetric)
+            if expected == None: assert factors == None and stats['solved'] == stats['cubes']
+            else:                assert factors[0] * factors[1] == c and 1 < factors[0] <= factors[1]
+
+if __name__ == '__main__':
+    test_cube_and_conquer()
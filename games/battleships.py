@@ -1,8 +1,12 @@
+import os
 import sys
 from pysat.card import *
 from pysat.formula import *
 from pysat.solvers import Glucose3
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from preprocess import preprocess
+
 def parse_battleships_game(filepath: str):
     dim = 0
     data = []
@@ -77,7 +81,7 @@ def encode_if_AND_then_OR(and_set, or_set):
 if __name__ == '__main__':
     # Validate input
     if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1]>")
+        print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1,2]>")
         exit()
     filepath = sys.argv[1]
     mode = int(sys.argv[2])
@@ -296,16 +300,23 @@ if __name__ == '__main__':
     
     if mode == 1:
         print(cnf.to_dimacs())
+    elif mode == 2:
+        # Output the preprocessed instance
+        clauses, preprocessor = preprocess(cnf.nv, cnf.clauses)
+        simplified = CNF(from_clauses=clauses)
+        simplified.nv = cnf.nv
+        print(simplified.to_dimacs())
     else:
         print("Solving...")
 
         # Solve instance
+        clauses, preprocessor = preprocess(cnf.nv, cnf.clauses)
         g = Glucose3()
-        for clause in cnf.clauses:
+        for clause in clauses:
             g.add_clause(clause)
         if g.solve():
             # Decode model into solution
-            model = g.get_model()
+            model = preprocessor.extend_model(g.get_model())
             soln = [['.'] * dim for y in range(dim)]
             for y in range(dim):
                 for x in range(dim):
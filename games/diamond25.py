@@ -1,8 +1,12 @@
+import os
 import sys
 from pysat.card import *
 from pysat.formula import *
 from pysat.solvers import Glucose3
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from preprocess import preprocess
+
 def parse_diamond25_game(filepath: str):
     dim = 0
     data = []
@@ -37,7 +41,7 @@ def get_cell_vars(vpool, x, y):
 if __name__ == '__main__':
     # Validate input
     if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1]>")
+        print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1,2]>")
         exit()
     filepath = sys.argv[1]
     mode = int(sys.argv[2])
@@ -177,16 +181,23 @@ if __name__ == '__main__':
     
     if mode == 1:
         print(cnf.to_dimacs())
+    elif mode == 2:
+        # Output the preprocessed instance
+        clauses, preprocessor = preprocess(cnf.nv, cnf.clauses)
+        simplified = CNF(from_clauses=clauses)
+        simplified.nv = cnf.nv
+        print(simplified.to_dimacs())
     else:
         print("Solving...")
 
         # Solve instance
+        clauses, preprocessor = preprocess(cnf.nv, cnf.clauses)
         g = Glucose3()
-        for clause in cnf.clauses:
+        for clause in clauses:
             g.add_clause(clause)
         if g.solve():
             # Decode model into human readable format
-            model = g.get_model()
+            model = preprocessor.extend_model(g.get_model())
             soln = []
             for y, line in enumerate(data):
                 soln.append([])
@@ -1,12 +1,14 @@
+import os
 import sys
 from pysat.solvers import Glucose3
 
-def generateExactlyOneConstraint(varList):
-    return [varList] + [
-        [-varList[i], -varList[j]]
-        for i in range(0, len(varList))
-        for j in range(i + 1, len(varList))
-    ]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cardinality import AMO_ENCODINGS, at_most_one, count_at_most_one, count_exactly_one, exactly_one
+from clause_store import ClauseStore, print_size_estimate
+from preprocess import preprocess
+
+def generateExactlyOneConstraint(varList, encoding = 'pairwise', newVar = None):
+    return exactly_one(varList, encoding, newVar)
 
 def getLRUDChar(lrud):
     if lrud ==  0: return ' '
@@ -42,17 +44,24 @@ class FlowFreeBoard:
         self.numVerticalEdgeVars = self.getVerticalEdgeVar(width - 2, height - 1) - self.numColourVars
         self.numHorizontalEdgeVars = self.getHorizontalEdgeVar(width - 1, height - 2) - self.numVerticalEdgeVars - self.numColourVars
 
-    def generateConstraints(self):
-        clauses = []
+    def generateConstraints(self, clauses = None, colourEncoding = 'pairwise', endpointEncoding = 'pairwise'):
+        """
+        @param colourEncoding  : at-most-one encoding of the colours of each cell (see cardinality.AMO_ENCODINGS)
+        @param endpointEncoding: exactly-one encoding of the edges of each endpoint
+        @return (numVars, clauses), with the auxiliary variables of the encodings after the edge variables
+        """
+        if clauses is None: clauses = []
+
+        numVars = self.numVars()
+        def newVar():
+            nonlocal numVars
+            numVars += 1
+            return numVars
 
         # Generate clauses for 'at most 1 colour' in each cell
-        clauses += [
-            [-self.getColourVar(x, y, i), -self.getColourVar(x, y, j)]
-            for y in range(self.height)
-            for x in range(self.width)
-            for i in range(0, self.numFlows)
-            for j in range(i + 1, self.numFlows)
-        ]
+        for y in range(self.height):
+            for x in range(self.width):
+                clauses += at_most_one([self.getColourVar(x, y, i) for i in range(self.numFlows)], colourEncoding, newVar)
 
         # Generate clauses for 'at least 1 colour' in each cell
         clauses += [
@@ -71,7 +80,7 @@ class FlowFreeBoard:
         # Generate clauses for 'if there is a horizontal edge between two cells, then their colours are the same'
         for y in range(self.height - 1):
             for x in range(self.width):
-                for i in range(numFlows):
+                for i in range(self.numFlows):
                     clauses.append([-self.getHorizontalEdgeVar(x, y), +self.getColourVar(x, y, i), -self.getColourVar(x, y + 1, i)])
                     clauses.append([-self.getHorizontalEdgeVar(x, y), -self.getColourVar(x, y, i), +self.getColourVar(x, y + 1, i)])
 
@@ -101,9 +110,45 @@ class FlowFreeBoard:
                     ]
 
                 # Generate clauses for 'the root cell has the given colour' and 'root cells have exactly 1 edge'
-                else: clauses += [[self.getColourVar(x, y, self.data[y][x] - 1)]] + generateExactlyOneConstraint(adjacentEdgeVars)
+                else: clauses += [[self.getColourVar(x, y, self.data[y][x] - 1)]] + generateExactlyOneConstraint(adjacentEdgeVars, endpointEncoding, newVar)
         
-        return self.numVars(), clauses
+        return numVars, clauses
+
+    def countConstraints(self, colourEncoding = 'pairwise', endpointEncoding = 'pairwise'):
+        """
+        Count the variables, clauses and literals of generateConstraints without generating any clauses
+
+        @return (numVars, numClauses, numLiterals)
+        """
+        numCells = self.width * self.height
+        numEdges = self.height * (self.width - 1) + (self.height - 1) * self.width
+
+        # Exactly 1 colour in each cell
+        (numAux, numClauses, numLiterals) = count_at_most_one(self.numFlows, colourEncoding)
+        numVars      = self.numVars() + numCells * numAux
+        numClauses  *= numCells
+        numLiterals *= numCells
+        numClauses  += numCells
+        numLiterals += numCells * self.numFlows
+
+        # Edges connect cells of the same colour
+        numClauses  += 2 * numEdges * self.numFlows
+        numLiterals += 6 * numEdges * self.numFlows
+
+        for y in range(self.height):
+            for x in range(self.width):
+                degree = (0 < x) + (x < self.width - 1) + (0 < y) + (y < self.height - 1)
+                if self.data[y][x] == 0:
+                    numTriples = degree * (degree - 1) * (degree - 2) // 6
+                    numClauses  += numTriples + degree
+                    numLiterals += 3 * numTriples + degree * degree
+                else:
+                    (numAux, numEoClauses, numEoLiterals) = count_exactly_one(degree, endpointEncoding)
+                    numVars     += numAux
+                    numClauses  += 1 + numEoClauses
+                    numLiterals += 1 + numEoLiterals
+
+        return numVars, numClauses, numLiterals
 
     def numVars(self):
         return self.numColourVars + self.numVerticalEdgeVars + self.numHorizontalEdgeVars
@@ -174,40 +219,51 @@ def parse_flow_free(filepath):
 
 if __name__ == '__main__':
     # Validate input
-    if len(sys.argv) != 3:
-    	print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1]>")
+    if len(sys.argv) not in [3, 4, 5]:
+    	print(f"Usage: {sys.argv[0]} <PROBLEM_FILE> <MODE[0,1,2,3]> [COLOUR_ENCODING] [ENDPOINT_ENCODING]")
+    	print(f"Encodings: {', '.join(AMO_ENCODINGS)}")
     	exit()
 
     mode = int(sys.argv[2])
+    colourEncoding = sys.argv[3] if len(sys.argv) >= 4 else 'pairwise'
+    endpointEncoding = sys.argv[4] if len(sys.argv) >= 5 else 'pairwise'
+    assert(colourEncoding in AMO_ENCODINGS and endpointEncoding in AMO_ENCODINGS)
 
     # Parse file
-    if mode > 0: print("Parsing...")
+    if mode == 0: print("Parsing...")
     width, height, numFlows, data = parse_flow_free(sys.argv[1])
     if len(data) == 0:
         print(f"Failed to parse {sys.argv[1]}")
         exit()
 
-    # Generate instance
-    if mode > 0: print("Encoding...")
     board = FlowFreeBoard(width, height, numFlows, data)
-    numVars, clauses = board.generateConstraints()
+    if mode == 3:
+        # Only report the size of the encoding
+        print_size_estimate(*board.countConstraints(colourEncoding, endpointEncoding))
+        exit()
+
+    # Generate instance
+    if mode == 0: print("Encoding...")
+    numVars, clauses = board.generateConstraints(ClauseStore(), colourEncoding, endpointEncoding)
 
-    if mode == 0:
+    if mode == 1:
         # Output clauses as DIMACS
-        print(f"p cnf {numVars} {len(clauses)}")
-        for clause in clauses:
-            for i in clause: print(f'{i} ', end='')
-            print('0')
-    elif mode == 1:
+        clauses.write_dimacs(numVars)
+    elif mode == 2:
+        # Output the preprocessed instance
+        simplified, preprocessor = preprocess(numVars, clauses)
+        ClauseStore(simplified).write_dimacs(numVars)
+    elif mode == 0:
         print("Solving...")
 
         # Solve instance
+        simplified, preprocessor = preprocess(numVars, clauses)
         g = Glucose3()
-        for clause in clauses:
+        for clause in simplified:
             g.add_clause(clause)
         
         if g.solve():
-            model = g.get_model()
+            model = preprocessor.extend_model(g.get_model())
             board.outputBoard(1, model)
 
         else:
@@ -0,0 +1,182 @@
+import functools
+from itertools import combinations
+from typing import List
+
+# Gates with more inputs than this are split into chains of smaller gates
+# over auxiliary variables (when the caller can allocate variables)
+MAX_GATE_ARITY = 4
+
+def _parity_clauses(k: int) -> List[List[int]]:
+    """
+    Clauses encoding 1 <=> XOR(2, ..., k + 1): the 2^k clauses that block
+    every assignment of the wrong parity. Each clause is given by the set of
+    negated inputs, taken with even size, largest sets first.
+    """
+    even = [set(subset) for size in reversed(range(0, k + 1, 2)) for subset in combinations(range(k), size)]
+    vs = range(2, k + 2)
+
+    # x => XOR(v1, v2, ...)
+    forward_clauses = [ [-1] + [-v if i in negated else v for i, v in enumerate(vs)] for negated in even ]
+
+    # x <= XOR(v1, v2, ...)
+    backward_clauses = [ [1] + [-v if (i in negated) != (i == 0) else v for i, v in enumerate(vs)] for negated in even ]
+
+    return forward_clauses + backward_clauses
+
+@functools.lru_cache(maxsize=None)
+def gate_template(kind: str, k: int, t: int = 0):
+    """
+    Minimal CNF of a gate over placeholder variables: 1 is the output and
+    2, ..., k + 1 are the inputs. Templates are built once per
+    (kind, arity, threshold) and then only rewritten by instantiate.
+
+    @param kind: 'parity'    x <=> XOR(v1, ..., vk)
+                 'threshold' x <=> v1 + ... + vk >= t
+                 'and'       x <=> v1 AND v2
+                 'or'        x <=> v1 OR v2
+                 'or_and'    x <=> v1 OR (v2 AND v3)
+    """
+    x = 1
+    vs = list(range(2, k + 2))
+    if kind == 'parity':
+        if   k == 0: clauses = [[-x]]
+        elif k == 1: clauses = [[-x, vs[0]], [x, -vs[0]]]
+        else:        clauses = _parity_clauses(k)
+    elif kind == 'threshold':
+        if   t <= 0: clauses = [[x]]
+        elif t > k:  clauses = [[-x]]
+        else:
+            # x <= some t inputs are true
+            clauses  = [ [x] + [-v for v in subset] for subset in combinations(vs, t) ]
+            # x => any k - t + 1 inputs include a true one
+            clauses += [ [-x] + list(subset) for subset in reversed(list(combinations(vs, k - t + 1))) ]
+    elif kind == 'and':
+        assert(k == 2)
+        clauses = [[x, -vs[0], -vs[1]], [-x, vs[0]], [-x, vs[1]]]
+    elif kind == 'or':
+        assert(k == 2)
+        clauses = [[-x, vs[0], vs[1]], [x, -vs[0]], [x, -vs[1]]]
+    elif kind == 'or_and':
+        assert(k == 3)
+        clauses = [[-x, vs[0], vs[1]], [-x, vs[0], vs[2]], [x, -vs[0]], [x, -vs[1], -vs[2]]]
+    else:
+        assert(False), f'Unknown gate {kind}'
+    return tuple(tuple(clause) for clause in clauses)
+
+def instantiate(template, lits: List[int]) -> List[List[int]]:
+    """
+    Substitute literals for the placeholder variables of a template
+    (lits[0] for the output, then the inputs). Negative placeholders pick the
+    negated literal through Python's negative indexing.
+    """
+    table = [0] + lits + [-lit for lit in reversed(lits)]
+    return [[table[lit] for lit in clause] for clause in template]
+
+def parity_gate(x: int, vs: List[int], new_var = None, max_arity: int = None) -> List[List[int]]:
+    """
+    Clauses encoding x <=> XOR(vs). With more than max_arity inputs (and a
+    new_var function to allocate auxiliary variables), the parity is chained:
+    each auxiliary variable is the parity of the previous one and the next
+    max_arity - 1 inputs, so the clause count is linear in len(vs).
+    """
+    if max_arity == None: max_arity = MAX_GATE_ARITY
+    clauses = []
+    vs = list(vs)
+    if new_var != None:
+        while len(vs) > max_arity:
+            aux = new_var()
+            clauses += instantiate(gate_template('parity', max_arity), [aux] + vs[:max_arity])
+            vs = [aux] + vs[max_arity:]
+    clauses += instantiate(gate_template('parity', len(vs)), [x] + vs)
+    return clauses
+
+def threshold_gate(x: int, vs: List[int], t: int, new_var = None, max_arity: int = None) -> List[List[int]]:
+    """
+    Clauses encoding x <=> SUM(vs) >= t. With more than max_arity inputs (and
+    a new_var function to allocate auxiliary variables), the sum is counted in
+    unary, one input at a time (a sequential counter): r[j] <=> the inputs so
+    far include at least j true ones, updated by r[j] <- r[j] OR (r[j-1] AND v).
+    Only the counters that can still reach t are kept, so the clause count is
+    O(len(vs) * t).
+    """
+    if max_arity == None: max_arity = MAX_GATE_ARITY
+    k = len(vs)
+    if new_var == None or k <= max_arity or t <= 0 or t > k:
+        return instantiate(gate_template('threshold', k, t), [x] + list(vs))
+
+    clauses = []
+    counters = { 1: vs[0] }
+    for i in range(1, k):
+        v = vs[i]
+        last = i == k - 1
+        updated = {}
+        # Counters below t - (inputs left) can no longer reach t
+        for j in range(max(1, t - (k - 1 - i)), min(i + 1, t) + 1):
+            r = x if last else new_var()
+            if   j == 1:     clauses += instantiate(gate_template('or', 2), [r, counters[1], v])
+            elif j == i + 1: clauses += instantiate(gate_template('and', 2), [r, counters[j - 1], v])
+            else:            clauses += instantiate(gate_template('or_and', 3), [r, counters[j], counters[j - 1], v])
+            updated[j] = r
+        counters = updated
+    return clauses
+
+# Gate-level netlists: each gate is a tuple (kind, out, *inputs)
+#   ('and',  z, a, b)    z <=> a AND b
+#   ('xor',  s, a, b)    s <=> a XOR b
+#   ('xor3', s, a, b, c) s <=> XOR(a, b, c)
+#   ('maj',  c, a, b, d) c <=> a + b + d > 1
+#   ('zero', v)          v is false
+GATE_SIZES = { # (nclauses, nliterals) of the Tseitin encoding
+    'and':  (3,  7),
+    'xor':  (4, 12),
+    'xor3': (8, 32),
+    'maj':  (6, 18),
+    'zero': (1,  1),
+}
+
+def tseitin(kind: str, z: int, *ins: int) -> List[List[int]]:
+    """
+    Clauses encoding the netlist gate (kind, z, *ins)
+    """
+    if kind == 'and':  return instantiate(gate_template('and', 2), [z, *ins])
+    if kind == 'xor':  return instantiate(gate_template('parity', 2), [z, *ins])
+    if kind == 'xor3': return instantiate(gate_template('parity', 3), [z, *ins])
+    if kind == 'maj':  return instantiate(gate_template('threshold', 3, 2), [z, *ins])
+    if kind == 'zero': return [[-z]]
+    assert(False), f'Unknown gate {kind}'
+
+def count_parity_gate(k: int, max_arity: int = None):
+    """
+    Get the (nauxiliary, nclauses, nliterals) of parity_gate over k inputs
+    """
+    if max_arity == None: max_arity = MAX_GATE_ARITY
+    naux = 0
+    nclauses = 0
+    nliterals = 0
+    while k > max_arity:
+        naux += 1
+        nclauses += 2 ** max_arity
+        nliterals += 2 ** max_arity * (max_arity + 1)
+        k -= max_arity - 1
+    template = gate_template('parity', k)
+    return naux, nclauses + len(template), nliterals + sum(len(clause) for clause in template)
+
+def count_threshold_gate(k: int, t: int, max_arity: int = None):
+    """
+    Get the (nauxiliary, nclauses, nliterals) of threshold_gate over k inputs
+    """
+    if max_arity == None: max_arity = MAX_GATE_ARITY
+    if k <= max_arity or t <= 0 or t > k:
+        template = gate_template('threshold', k, t)
+        return 0, len(template), sum(len(clause) for clause in template)
+
+    counters = 0
+    nclauses = 0
+    nliterals = 0
+    for i in range(1, k):
+        for j in range(max(1, t - (k - 1 - i)), min(i + 1, t) + 1):
+            counters += 1
+            if j == 1 or j == i + 1: (nclauses, nliterals) = (nclauses + 3, nliterals + 7)
+            else:                    (nclauses, nliterals) = (nclauses + 4, nliterals + 11)
+    # The last counter is the output
+    return counters - 1, nclauses, nliterals
@@ -0,0 +1,63 @@
+import itertools
+from pysat.solvers import Glucose3
+from gates import *
+
+def check_gate(k: int, build, count, expected):
+    """
+    Check a gate over k inputs (every other one negated) for every input
+    assignment, with and without chaining, against its closed-form size
+    """
+    x = 1
+    vs = [ -(i + 2) if i % 2 else i + 2 for i in range(k) ]
+    for max_arity in [2, 3, 4]:
+        top = k + 2
+        def new_var():
+            nonlocal top
+            top += 1
+            return top - 1
+        clauses = build(x, vs, new_var, max_arity)
+        assert count(max_arity) == (top - k - 2, len(clauses), sum(len(clause) for clause in clauses))
+
+        g = Glucose3(bootstrap_with=clauses)
+        for bits in itertools.product([False, True], repeat=k):
+            assumptions = [ v if bit else -v for v, bit in zip(range(2, k + 2), bits) ]
+            values = [ bit != (i % 2 == 1) for i, bit in enumerate(bits) ]
+            # The output must be forced to the expected value
+            out = x if expected(values) else -x
+            assert g.solve(assumptions=assumptions + [out])
+            assert not g.solve(assumptions=assumptions + [-out])
+        g.delete()
+
+def test_parity():
+    for k in range(0, 9):
+        check_gate(k,
+            lambda x, vs, new_var, max_arity: parity_gate(x, vs, new_var, max_arity),
+            lambda max_arity: count_parity_gate(k, max_arity),
+            lambda values: sum(values) % 2 == 1)
+
+def test_threshold():
+    for k in range(0, 8):
+        for t in range(0, k + 2):
+            check_gate(k,
+                lambda x, vs, new_var, max_arity: threshold_gate(x, vs, t, new_var, max_arity),
+                lambda max_arity: count_threshold_gate(k, t, max_arity),
+                lambda values: sum(values) >= t)
+
+def test_linear():
+    # Chained gates grow linearly with the number of inputs
+    assert count_parity_gate(64) == (20, 21 * 2 ** 4, 21 * 2 ** 4 * 5)
+    assert count_threshold_gate(64, 2)[1] < 8 * 64
+
+def test_tseitin():
+    # Netlist gates match their sizes, and only hold on the right outputs
+    functions = { 'and': all, 'xor': lambda values: sum(values) % 2 == 1, 'xor3': lambda values: sum(values) % 2 == 1,
+                  'maj': lambda values: sum(values) > 1, 'zero': lambda values: False }
+    for kind, (nclauses, nliterals) in GATE_SIZES.items():
+        k = { 'and': 2, 'xor': 2, 'xor3': 3, 'maj': 3, 'zero': 0 }[kind]
+        clauses = tseitin(kind, 1, *range(2, k + 2))
+        assert (len(clauses), sum(len(clause) for clause in clauses)) == (nclauses, nliterals)
+        for values in itertools.product([False, True], repeat=k):
+            with Glucose3(bootstrap_with=clauses) as g:
+                assumptions = [ v if value else -v for v, value in zip(range(2, k + 2), values) ]
+                assert g.solve(assumptions=assumptions + [1]) == functions[kind](values)
+                assert g.solve(assumptions=assumptions + [-1]) != functions[kind](values)
@@ -1,7 +1,85 @@
 import sys
 import itertools
+import mmap
+import struct
+from array import array
+from cardinality import AMO_ENCODINGS, at_most_one, count_at_most_one
+from clause_store import ClauseStore, literal_tokens, print_size_estimate, write_binary_drat
 
-def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extensionMode = 0):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Symmetry breaking modes: lex-leader constraints between consecutive rows
+# (pigeons), columns (holes), or both (double-lex) of the getVar matrix
+SYMMETRY_BREAKING_MODES = ['none', 'rows', 'columns', 'both']
+
+def lexGreaterEqual(a, b, newVar):
+    """
+    Clauses encoding a >= b lexicographically (a[0] most significant), with
+    e_i <= a and b are equal before position i (e_0 is true and left out):
+    e_i => a_i OR NOT b_i, and e_i AND NOT (a_i AND NOT b_i) => e_(i+1)
+
+    @param newVar: function allocating an auxiliary variable (len(a) - 1 in total)
+    """
+    clauses = []
+    e = None
+    for i in range(len(a)):
+        prefix = [] if e is None else [-e]
+        clauses.append(prefix + [a[i], -b[i]])
+        if i == len(a) - 1: break
+        nextE = newVar()
+        clauses += [prefix + [a[i], nextE], prefix + [-b[i], nextE]]
+        e = nextE
+    return clauses
+
+def symmetryBreakingClauses(numPigeons: int, numHoles: int, symmetryBreaking: int, newVar):
+    """
+    Lex-leader clauses over the pigeon/hole matrix: every row (pigeon) is at
+    least the next one and/or every column (hole) is at least the next one.
+    Any assignment can be brought into this form by permuting pigeons and
+    holes, so satisfiability is preserved.
+
+    @param symmetryBreaking: index in SYMMETRY_BREAKING_MODES
+    """
+    def getVar(pigeon: int, hole: int) -> int:
+        return 1 + pigeon * numHoles + hole
+
+    clauses = []
+    if symmetryBreaking in [1, 3]:
+        for pigeon in range(numPigeons - 1):
+            clauses += lexGreaterEqual(
+                [ getVar(pigeon, hole) for hole in range(numHoles) ],
+                [ getVar(pigeon + 1, hole) for hole in range(numHoles) ], newVar)
+    if symmetryBreaking in [2, 3]:
+        for hole in range(numHoles - 1):
+            clauses += lexGreaterEqual(
+                [ getVar(pigeon, hole) for pigeon in range(numPigeons) ],
+                [ getVar(pigeon, hole + 1) for pigeon in range(numPigeons) ], newVar)
+    return clauses
+
+def countSymmetryBreaking(numPigeons: int, numHoles: int, symmetryBreaking: int):
+    """
+    Count the auxiliary variables, clauses and literals of symmetryBreakingClauses
+
+    @return (numVars, numClauses, numLiterals)
+    """
+    def countLex(n: int):
+        # 3 clauses per position but the last, with 2 literals at the first position and 3 after
+        if n == 1: return (0, 1, 2)
+        return (n - 1, 3 * n - 2, 9 * n - 9)
+
+    pairs = []
+    if symmetryBreaking in [1, 3]: pairs.append((max(0, numPigeons - 1), numHoles))
+    if symmetryBreaking in [2, 3]: pairs.append((max(0, numHoles - 1), numPigeons))
+    totals = [0, 0, 0]
+    for (numPairs, n) in pairs:
+        for i, value in enumerate(countLex(n)): totals[i] += numPairs * value
+    return tuple(totals)
+
+def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extensionMode = 0, clauses = None,
+                        holeEncoding = 'pairwise', functionalEncoding = 'pairwise', symmetryBreaking = 0):
     """
     Map m pigeons into n holes
 
@@ -9,6 +87,10 @@ def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extens
     @param numHoles  : the number of holes
     @param functional: True if each pigeon can only be assigned to one hole
     @param extensionMode : True if extension variables should be generated (according to Cook's short ER method)
+    @param clauses   : container to build the clauses into (e.g. a ClauseStore); a new list by default
+    @param holeEncoding      : at-most-one encoding of the hole clauses (see cardinality.AMO_ENCODINGS)
+    @param functionalEncoding: at-most-one encoding of the functional clauses
+    @param symmetryBreaking  : lex-leader symmetry breaking (index in SYMMETRY_BREAKING_MODES)
     """
 
     def getVar(pigeon: int, hole: int, nPigeons=numPigeons, nHoles=numHoles) -> int:
@@ -57,48 +139,45 @@ def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extens
         @param curr_nVars number of variables including the base layer
         """
 
-        clauses = []
         for pigeon in range(nPigeons):
             for hole in range(nHoles):
                 (Q_ij, P_ij, P_im, P_nj) = getExtDefVars(pigeon, hole, nPigeons + 1, nHoles + 1)
-                clauses += getExtDefClauses(
+                clauses.extend(getExtDefClauses(
                     curr_nVars + Q_ij,
                     prev_nVars + P_ij,
                     prev_nVars + P_im,
                     prev_nVars + P_nj,
                     (nPigeons) * (nHoles)
-                )
-        return clauses
+                ))
 
     ### Execution entry point ###
 
     # Initialize clause array
-    clauses = []
+    if clauses is None: clauses = []
+
+    # Auxiliary variables of the at-most-one encodings and of symmetry breaking come after the extension variables
+    numAuxVars = 0
+    def newVar() -> int:
+        nonlocal numAuxVars
+        numAuxVars += 1
+        return numExtVars + numAuxVars
+    numExtVars = countPigeonholePrinciple(numPigeons, numHoles, False, extensionMode)[0]
 
     # Generate pigeon clause: every pigeon must be assigned to a hole
-    clauses += [
+    clauses.extend(
         [
             getVar(pigeon, hole) for hole in range(numHoles)
         ] for pigeon in range(numPigeons)
-    ]
+    )
 
     # Generate hole clauses: every hole can contain at most 1 pigeon
-    clauses += [
-        [ -p1, -p2 ] for (p1, p2) in list(itertools.chain.from_iterable([
-            itertools.combinations([
-                getVar(pigeon, hole) for pigeon in range(numPigeons)
-            ], 2) for hole in range(numHoles)
-        ]))
-    ]
+    for hole in range(numHoles):
+        clauses.extend(at_most_one([ getVar(pigeon, hole) for pigeon in range(numPigeons) ], holeEncoding, newVar))
 
     # Generate functional PHP clauses: every pigeon can be in at most 1 hole
-    if functional: clauses += [
-        [ -h1, -h2 ] for (h1, h2) in list(itertools.chain.from_iterable([
-            itertools.combinations([
-                getVar(pigeon, hole) for hole in range(numHoles)
-            ], 2) for pigeon in range(numPigeons)
-        ]))
-    ]
+    if functional:
+        for pigeon in range(numPigeons):
+            clauses.extend(at_most_one([ getVar(pigeon, hole) for hole in range(numHoles) ], functionalEncoding, newVar))
 
     # Generate extension variable definition clauses according to Cook's short ER proof
     prev_nVars = 0
@@ -109,7 +188,7 @@ def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extens
             # Generate clauses
             nPigeons = numPigeons - layer
             nHoles   = numHoles - layer
-            clauses += generateExtLayer(nPigeons, nHoles, prev_nVars, curr_nVars)
+            generateExtLayer(nPigeons, nHoles, prev_nVars, curr_nVars)
 
             layer_size = nPigeons * nHoles
             prev_nVars = curr_nVars
@@ -122,7 +201,281 @@ def PigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extens
                 curr_nVars += 2 * layer_size
                 extLevels += [2 * layer] * layer_size + [2 * layer - 1] * layer_size
 
-    return (curr_nVars, clauses, extLevels)
+    # Generate symmetry breaking clauses
+    clauses.extend(symmetryBreakingClauses(numPigeons, numHoles, symmetryBreaking, newVar))
+
+    # Auxiliary variables are not extension variables
+    extLevels += [0] * numAuxVars
+    return (curr_nVars + numAuxVars, clauses, extLevels)
+
+def countPigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extensionMode = 0,
+                             holeEncoding = 'pairwise', functionalEncoding = 'pairwise', symmetryBreaking = 0):
+    """
+    Count the variables, clauses and literals of PigeonholePrinciple in closed
+    form, without generating any clauses (including those of
+    countSymmetryBreaking)
+
+    @return (numVars, numClauses, numLiterals)
+    """
+    numVars = numPigeons * numHoles
+
+    # Pigeon clauses and hole clauses
+    (numAux, numAmoClauses, numAmoLiterals) = count_at_most_one(numPigeons, holeEncoding)
+    numVars    += numHoles * numAux
+    numClauses  = numPigeons + numHoles * numAmoClauses
+    numLiterals = numPigeons * numHoles + numHoles * numAmoLiterals
+
+    # Functional clauses
+    if functional:
+        (numAux, numAmoClauses, numAmoLiterals) = count_at_most_one(numHoles, functionalEncoding)
+        numVars     += numPigeons * numAux
+        numClauses  += numPigeons * numAmoClauses
+        numLiterals += numPigeons * numAmoLiterals
+
+    # Extension definitions: 4 clauses (11 literals) or 6 clauses (14 literals) per extension cell
+    if extensionMode > 0:
+        for layer in range(1, numHoles):
+            layer_size = (numPigeons - layer) * (numHoles - layer)
+            numVars += extensionMode * layer_size
+            layer_size = max(0, layer_size)
+            if extensionMode == 1:
+                numClauses  += 4 * layer_size
+                numLiterals += 11 * layer_size
+            elif extensionMode == 2:
+                numClauses  += 6 * layer_size
+                numLiterals += 14 * layer_size
+
+    # Symmetry breaking
+    (symVars, symClauses, symLiterals) = countSymmetryBreaking(numPigeons, numHoles, symmetryBreaking)
+    return (numVars + symVars, numClauses + symClauses, numLiterals + symLiterals)
+
+def PigeonholePrincipleBlocks(numPigeons: int, numHoles: int, functional=False, extensionMode = 0,
+                              holeEncoding = 'pairwise', functionalEncoding = 'pairwise', symmetryBreaking = 0):
+    """
+    NumPy backend for PigeonholePrinciple. Rather than building one list per
+    clause, whole index grids are computed as int32 arrays (one block per hole,
+    per pigeon, and per extension layer). Each block is a flat buffer of
+    0-terminated clauses, and the blocks come out in the same order as the
+    clauses of PigeonholePrinciple.
+
+    @param numPigeons: the number of pigeons
+    @param numHoles  : the number of holes
+    @param functional: True if each pigeon can only be assigned to one hole
+    @param extensionMode : True if extension variables should be generated (according to Cook's short ER method)
+    @param holeEncoding      : at-most-one encoding of the hole clauses (see cardinality.AMO_ENCODINGS)
+    @param functionalEncoding: at-most-one encoding of the functional clauses
+    @param symmetryBreaking  : lex-leader symmetry breaking (index in SYMMETRY_BREAKING_MODES)
+
+    @return (numVars, numClauses, blocks, extLevels, maxVar), where blocks is a
+    generator and maxVar is the largest variable index appearing in a clause
+    """
+    if np is None: raise ImportError("The NumPy backend for PigeonholePrinciple requires numpy")
+
+    # grid[pigeon, hole] = getVar(pigeon, hole)
+    grid = np.arange(1, 1 + numPigeons * numHoles, dtype=np.int32).reshape(numPigeons, numHoles)
+
+    # Auxiliary variables of the at-most-one encodings and of symmetry breaking come after the extension variables
+    numExtVars = countPigeonholePrinciple(numPigeons, numHoles, False, extensionMode)[0]
+    nextVar = numExtVars
+    def newVar() -> int:
+        nonlocal nextVar
+        nextVar += 1
+        return nextVar
+
+    def atMostOneBlock(vars, encoding: str):
+        """
+        At-most-one clauses over vars (see at_most_one). Pairwise clauses are
+        built as a grid, in itertools.combinations order.
+        """
+        if encoding != 'pairwise':
+            return np.array([ lit for clause in at_most_one(vars.tolist(), encoding, newVar) for lit in clause + [0] ], dtype=np.int32)
+        (i, j) = np.triu_indices(len(vars), 1)
+        block = np.zeros((len(i), 3), dtype=np.int32)
+        block[:, 0] = -vars[i]
+        block[:, 1] = -vars[j]
+        return block.ravel()
+
+    def extLayerBlock(nPigeons: int, nHoles: int, prev_nVars: int, curr_nVars: int):
+        """
+        Extension definition clauses for a whole layer (see generateExtLayer)
+        """
+        (pigeon, hole) = np.divmod(np.arange(nPigeons * nHoles, dtype=np.int32), nHoles)
+        Q_ij = curr_nVars + 1 + pigeon * nHoles + hole
+        P_ij = prev_nVars + 1 + pigeon * (nHoles + 1) + hole
+        P_im = prev_nVars + 1 + pigeon * (nHoles + 1) + nHoles
+        P_nj = prev_nVars + 1 + nPigeons * (nHoles + 1) + hole
+        q_ij = Q_ij + nPigeons * nHoles
+        zero = np.zeros_like(Q_ij)
+        if extensionMode == 1: columns = [
+            Q_ij, -P_ij, zero,
+            Q_ij, -P_im, -P_nj, zero,
+           -Q_ij,  P_ij,  P_im, zero,
+           -Q_ij,  P_ij,  P_nj, zero,
+        ]
+        elif extensionMode == 2: columns = [
+           -q_ij, -P_im, -P_nj, zero,  q_ij,  P_im, zero,  q_ij,  P_nj, zero,
+           -Q_ij,  P_ij, -q_ij, zero,  Q_ij, -P_ij, zero,  Q_ij,  q_ij, zero,
+        ]
+        return np.stack(columns, axis=1).ravel()
+
+    def generateBlocks():
+        # Pigeon clauses: every pigeon must be assigned to a hole
+        yield np.hstack([grid, np.zeros((numPigeons, 1), dtype=np.int32)]).ravel()
+
+        # Hole clauses: every hole can contain at most 1 pigeon
+        for hole in range(numHoles): yield atMostOneBlock(grid[:, hole], holeEncoding)
+
+        # Functional PHP clauses: every pigeon can be in at most 1 hole
+        if functional:
+            for pigeon in range(numPigeons): yield atMostOneBlock(grid[pigeon, :], functionalEncoding)
+
+        # Extension variable definition clauses according to Cook's short ER proof
+        if extensionMode > 0:
+            prev_nVars = 0
+            curr_nVars = numPigeons * numHoles
+            for layer in range(1, numHoles):
+                nPigeons = numPigeons - layer
+                nHoles   = numHoles - layer
+                yield extLayerBlock(nPigeons, nHoles, prev_nVars, curr_nVars)
+                prev_nVars = curr_nVars
+                curr_nVars += extensionMode * nPigeons * nHoles
+
+        # Symmetry breaking clauses
+        if symmetryBreaking > 0:
+            yield np.array([ lit for clause in symmetryBreakingClauses(numPigeons, numHoles, symmetryBreaking, newVar) for lit in clause + [0] ], dtype=np.int32)
+
+    # Count variables and clauses in closed form, and build the extension level array
+    (numVars, numClauses, numLiterals) = countPigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, holeEncoding, functionalEncoding, symmetryBreaking)
+    maxVar = numPigeons * numHoles
+    extLevels = [np.zeros(maxVar, dtype=np.int32)]
+    if extensionMode > 0:
+        for layer in range(1, numHoles):
+            layer_size = max(0, (numPigeons - layer) * (numHoles - layer))
+            maxVar += extensionMode * layer_size
+            if extensionMode == 1:
+                extLevels.append(np.full(layer_size, layer, dtype=np.int32))
+            elif extensionMode == 2:
+                extLevels.append(np.full(layer_size, 2 * layer, dtype=np.int32))
+                extLevels.append(np.full(layer_size, 2 * layer - 1, dtype=np.int32))
+
+    # Auxiliary variables are not extension variables
+    numAuxVars = numVars - numExtVars
+    maxVar += numAuxVars
+    extLevels.append(np.zeros(numAuxVars, dtype=np.int32))
+
+    return (numVars, numClauses, generateBlocks(), np.concatenate(extLevels), maxVar)
+
+def writePigeonholePrinciple(numPigeons: int, numHoles: int, functional=False, extensionMode = 0, file = sys.stdout,
+                             holeEncoding = 'pairwise', functionalEncoding = 'pairwise', symmetryBreaking = 0):
+    """
+    Output PHP in DIMACS format using the NumPy backend, without materializing
+    the clauses. The output is identical to printCNF(*PigeonholePrinciple(...)[:2]).
+
+    @return (numVars, extLevels)
+    """
+    (numVars, numClauses, blocks, extLevels, maxVar) = PigeonholePrincipleBlocks(numPigeons, numHoles, functional, extensionMode, holeEncoding, functionalEncoding, symmetryBreaking)
+    to_str = literal_tokens(maxVar)
+
+    # Output DIMACS header
+    file.write(f"p cnf {numVars} {numClauses}\n")
+
+    # Output clauses
+    for block in blocks:
+        file.write(''.join(map(to_str, block.tolist())))
+
+    return (numVars, extLevels)
+
+def PigeonholeProof(numPigeons: int, numHoles: int, extensionMode = 0, numAuxVars = 0):
+    """
+    Cook's extended-resolution refutation of PHP, as DRAT steps. Layer l
+    reduces PHP over the variables of layer l - 1 (the original variables for
+    l = 1) to PHP over its extension variables, with one pigeon and one hole
+    fewer, until the last layer contradicts itself with a single hole.
+
+    Per layer, with L and H the last pigeon and hole of the previous layer:
+    - every pigeon clause OR_j Q_ij follows by unit propagation;
+    - every hole clause (-Q_ij, -Q_kj) follows from (-Q_ij, -Q_kj, -P_ij), which
+      is deleted again right after, by unit propagation.
+    The clauses derived for the previous layer are deleted once the layer is
+    complete. This adds O(numPigeons^2 * numHoles^2) clauses in total.
+
+    @param extensionMode: extension variables defined in the formula, as in
+                          PigeonholePrinciple. With 0, the proof adds the
+                          definitions of mode 1 itself as RAT clauses.
+    @param numAuxVars   : auxiliary variables of the at-most-one encodings and
+                          of symmetry breaking in the formula, which come
+                          before the extension variables of the proof in mode 0
+
+    The at-most-one encodings of cardinality all propagate like pairwise
+    clauses, so the proof is valid for any of them.
+
+    @return generator of ('a', clause) additions and ('d', clause) deletions,
+    ending with the empty clause
+    """
+    if numPigeons <= numHoles: raise ValueError("PHP has no refutation with at most as many pigeons as holes")
+
+    def layerClauses(offset: int, nPigeons: int, nHoles: int):
+        """
+        Get the PHP pigeon clauses and hole clauses over a layer of variables
+        """
+        def var(pigeon: int, hole: int) -> int:
+            return offset + 1 + pigeon * nHoles + hole
+        pigeonClauses = ( [ var(pigeon, hole) for hole in range(nHoles) ] for pigeon in range(nPigeons) )
+        holeClauses = ( [ -var(p1, hole), -var(p2, hole) ] for hole in range(nHoles) for (p1, p2) in itertools.combinations(range(nPigeons), 2) )
+        return itertools.chain(pigeonClauses, holeClauses)
+
+    def generateSteps():
+        prev_nVars = 0
+        curr_nVars = numPigeons * numHoles + (numAuxVars if extensionMode == 0 else 0)
+        for layer in range(1, numHoles):
+            nPigeons = numPigeons - layer
+            nHoles   = numHoles - layer
+
+            def P(pigeon: int, hole: int) -> int:
+                return prev_nVars + 1 + pigeon * (nHoles + 1) + hole
+            def Q(pigeon: int, hole: int) -> int:
+                return curr_nVars + 1 + pigeon * nHoles + hole
+
+            # Extension definitions: Q_ij <=> P_ij OR (P_iH AND P_Lj), positive clauses first for RAT on Q_ij
+            if extensionMode == 0:
+                for pigeon in range(nPigeons):
+                    for hole in range(nHoles):
+                        (Q_ij, P_ij, P_im, P_nj) = (Q(pigeon, hole), P(pigeon, hole), P(pigeon, nHoles), P(nPigeons, hole))
+                        yield 'a', [ Q_ij, -P_ij]
+                        yield 'a', [ Q_ij, -P_im, -P_nj]
+                        yield 'a', [-Q_ij,  P_ij,  P_im]
+                        yield 'a', [-Q_ij,  P_ij,  P_nj]
+
+            # Pigeon clauses of the new layer
+            for pigeon in range(nPigeons):
+                yield 'a', [ Q(pigeon, hole) for hole in range(nHoles) ]
+
+            # Hole clauses of the new layer, through the case P_ij
+            for hole in range(nHoles):
+                for (p1, p2) in itertools.combinations(range(nPigeons), 2):
+                    lemma = [ -Q(p1, hole), -Q(p2, hole), -P(p1, hole) ]
+                    yield 'a', lemma
+                    yield 'a', [ -Q(p1, hole), -Q(p2, hole) ]
+                    yield 'd', lemma
+
+            # The clauses derived for the previous layer are no longer needed
+            if layer > 1:
+                for clause in layerClauses(prev_nVars, nPigeons + 1, nHoles + 1): yield 'd', clause
+
+            prev_nVars = curr_nVars
+            curr_nVars += max(1, extensionMode) * nPigeons * nHoles
+
+        # The last layer has a single hole and at least two pigeons
+        yield 'a', []
+
+    return generateSteps()
+
+def writePigeonholeProof(numPigeons: int, numHoles: int, extensionMode = 0, file = sys.stdout.buffer, numAuxVars = 0):
+    """
+    Output the refutation of PigeonholeProof in binary DRAT format
+    """
+    (numVars, numClauses, numLiterals) = countPigeonholePrinciple(numPigeons, numHoles, False, max(1, extensionMode))
+    write_binary_drat(PigeonholeProof(numPigeons, numHoles, extensionMode, numAuxVars), numVars + numAuxVars, file)
 
 def printCNF(numVars, clauses):
     """
@@ -141,22 +494,131 @@ def printExtLvl(extLevels):
     for i, lvl in enumerate(extLevels):
         print(f"c extlvl {i + 1} {lvl}")
 
+def extLevelRuns(extLevels):
+    """
+    Run-length encode the extension levels: the levels are constant over the
+    original variables and over each extension layer, so there are only
+    O(numHoles) runs
+
+    @return list of (firstVar, lastVar, level), with 1-based variables
+    """
+    if np is not None:
+        levels = np.asarray(extLevels)
+        if len(levels) == 0: return []
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(levels)) + 1])
+        ends = np.concatenate([starts[1:], [len(levels)]])
+        return [ (int(start) + 1, int(end), int(levels[start])) for (start, end) in zip(starts, ends) ]
+
+    runs = []
+    var = 1
+    for (lvl, group) in itertools.groupby(extLevels):
+        size = sum(1 for _ in group)
+        runs.append((var, var + size - 1, lvl))
+        var += size
+    return runs
+
+def printExtLvlRuns(extLevels):
+    """
+    Output the extension levels as one comment line per run of equal levels
+    """
+    for (first, last, lvl) in extLevelRuns(extLevels):
+        print(f"c extlvls {first} {last} {lvl}")
+
+# Binary extension level file: a 16-byte header (magic, version, bytes per
+# level, number of variables) followed by one little-endian level per variable
+EXTLVL_MAGIC = b'EXTLVL'
+EXTLVL_HEADER = struct.Struct('<6sBBQ')
+
+def writeExtLvlFile(extLevels, path: str):
+    """
+    Write the extension levels to a binary side-file, as uint16 if every level
+    fits and as uint32 otherwise
+    """
+    itemsize = 2 if max(extLevels, default=0) < (1 << 16) else 4
+    with open(path, 'wb') as file:
+        file.write(EXTLVL_HEADER.pack(EXTLVL_MAGIC, 1, itemsize, len(extLevels)))
+        if np is not None:
+            file.write(np.asarray(extLevels, dtype=f'<u{itemsize}').tobytes())
+        else:
+            levels = array('H' if itemsize == 2 else 'I', extLevels)
+            if sys.byteorder != 'little': levels.byteswap()
+            file.write(levels.tobytes())
+
+def loadExtLvlFile(path: str):
+    """
+    Memory-map a binary extension level file. Nothing is read until a level is
+    accessed, and the level of variable v is at index v - 1.
+
+    @return read-only array of levels (a numpy memmap, or a memoryview without numpy)
+    """
+    with open(path, 'rb') as file:
+        (magic, version, itemsize, numVars) = EXTLVL_HEADER.unpack(file.read(EXTLVL_HEADER.size))
+        if magic != EXTLVL_MAGIC or version != 1 or itemsize not in [2, 4]:
+            raise ValueError(f"{path} is not an extension level file")
+        if np is not None:
+            return np.memmap(path, dtype=f'<u{itemsize}', mode='r', offset=EXTLVL_HEADER.size, shape=(numVars,))
+        if sys.byteorder != 'little':
+            raise ImportError("Loading extension level files on big-endian machines requires numpy")
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(buffer)[EXTLVL_HEADER.size:EXTLVL_HEADER.size + itemsize * numVars].cast('H' if itemsize == 2 else 'I')
+
+def outputExtLvl(extLevels, output):
+    """
+    Output the extension levels as requested on the command line
+    """
+    if   output == 1: printExtLvl(extLevels)
+    elif output == 2: printExtLvlRuns(extLevels)
+    elif isinstance(output, str): writeExtLvlFile(extLevels, output)
+
 if __name__ == '__main__':
     # Validate input
-    if len(sys.argv) != 6:
-    	print(f"Usage: {sys.argv[0]} <NUM_PIGEONS> <NUM_HOLES> <FUNCTIONAL?> <EXTENSION_MODE> <OUTPUT_EXT_LVL?>")
+    if len(sys.argv) not in range(6, 12):
+    	print(f"Usage: {sys.argv[0]} <NUM_PIGEONS> <NUM_HOLES> <FUNCTIONAL?> <EXTENSION_MODE> <OUTPUT_EXT_LVL (0: no, 1: per variable, 2: per run, or the path of a binary side-file)> [BACKEND (0: lists, 1: numpy, 2: count only)] [DRAT_PROOF_FILE (- for none)] [HOLE_ENCODING] [FUNCTIONAL_ENCODING] [SYMMETRY_BREAKING (0: none, 1: rows, 2: columns, 3: both)]")
+    	print(f"Encodings: {', '.join(AMO_ENCODINGS)}")
     	exit()
 
-    [ numPigeons, numHoles, functional, extensionMode, output_extLvl ] = [ int(arg) for arg in sys.argv[1:] ]
+    [ numPigeons, numHoles, functional, extensionMode ] = [ int(arg) for arg in sys.argv[1:5] ]
+    output_extLvl = int(sys.argv[5]) if sys.argv[5].isdigit() else sys.argv[5]
+    backend = int(sys.argv[6]) if len(sys.argv) >= 7 else 0
+    proofFile = sys.argv[7] if len(sys.argv) >= 8 and sys.argv[7] != '-' else None
+    holeEncoding = sys.argv[8] if len(sys.argv) >= 9 else 'pairwise'
+    functionalEncoding = sys.argv[9] if len(sys.argv) >= 10 else 'pairwise'
+    symmetryBreaking = int(sys.argv[10]) if len(sys.argv) >= 11 else 0
     assert(numPigeons > 0)
     assert(numHoles > 0)
     assert(0 <= functional and functional <= 1)
     assert(0 <= extensionMode and extensionMode <= 2)
-    assert(0 <= output_extLvl and output_extLvl <= 1)
+    assert(isinstance(output_extLvl, str) or (0 <= output_extLvl and output_extLvl <= 2))
+    assert(0 <= backend and backend <= 2)
+    assert(proofFile is None or numPigeons > numHoles)
+    assert(holeEncoding in AMO_ENCODINGS and functionalEncoding in AMO_ENCODINGS)
+    assert(0 <= symmetryBreaking and symmetryBreaking < len(SYMMETRY_BREAKING_MODES))
+    (numVars, numClauses, numLiterals) = countPigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, holeEncoding, functionalEncoding, symmetryBreaking)
+    numAuxVars = numVars - countPigeonholePrinciple(numPigeons, numHoles, False, extensionMode)[0]
+
+    if proofFile is not None:
+        # Output the refutation of the formula
+        with open(proofFile, 'wb') as file: writePigeonholeProof(numPigeons, numHoles, extensionMode, file, numAuxVars)
+
+    if backend == 2:
+        # Only report the size of the encoding
+        print_size_estimate(numVars, numClauses, numLiterals)
+        print(f'auxiliary vars {numAuxVars}')
+        (symVars, symClauses, symLiterals) = countSymmetryBreaking(numPigeons, numHoles, symmetryBreaking)
+        print(f'symmetry breaking vars {symVars}')
+        print(f'symmetry breaking clauses {symClauses}')
+        print(f'symmetry breaking literals {symLiterals}')
+        exit()
+
+    if backend == 1:
+        # Generate and output formula block by block
+        (numVars, extLevels) = writePigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, sys.stdout, holeEncoding, functionalEncoding, symmetryBreaking)
+        outputExtLvl(extLevels, output_extLvl)
+        exit()
 
     # Generate encoding
-    (numVars, clauses, extLevels) = PigeonholePrinciple(numPigeons, numHoles, functional, extensionMode)
+    (numVars, clauses, extLevels) = PigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, ClauseStore(), holeEncoding, functionalEncoding, symmetryBreaking)
     
     # Output formula
-    printCNF(numVars, clauses)
-    if output_extLvl == 1: printExtLvl(extLevels)
\ No newline at end of file
+    clauses.write_dimacs(numVars)
+    outputExtLvl(extLevels, output_extLvl)
\ No newline at end of file
@@ -1,62 +1,86 @@
-import argparse, sympy
+import argparse, sympy, sys
+from collections import OrderedDict
+from aig import AIG, netlist_to_aig
+from clause_store import ClauseStore, print_size_estimate
+from gates import GATE_SIZES, gate_template, instantiate, tseitin
 from typing import List
 
-def generate_xor(x: int, vs: List[int]):
+# Generate clauses encoding x <=> XOR(v1, v2, ...)
+def generate_xor(x: int, vs: List[int]) -> List[List[int]]:
     assert(len(vs) > 1)
+    return instantiate(gate_template('parity', len(vs)), [x] + vs)
 
-    def generate_xor_helper(clauses: List[List[int]], built: List[int], available: List[int]):
-        if len(available) <= 1:
-            clauses.append(built + available)
-            return clauses
-        
-        for i in range(len(available)):
-            tmp1 = built + available[:i] + [-available[i]]
-            for j in range(i + 1, len(available)):
-                tmp2 = tmp1 + available[i+1:j] + [-available[j]]
-                generate_xor_helper(clauses, tmp2, available[j+1:])
+# Generate clauses encoding x <=> XOR(a, b, c)
+def generate_3xor(x: int, a: int, b: int, c: int) -> List[List[int]]:
+    return instantiate(gate_template('parity', 3), [x, a, b, c])
 
-        if len(built) == 1: clauses.append(built + available)
-        return clauses
+# Generate clauses encoding x <=> SUM(v1, v2, ...) > 1
+def generate_gt1(x: int, vs: List[int]) -> List[List[int]]:
+    assert(len(vs) > 1)
+    return instantiate(gate_template('threshold', len(vs), 2), [x] + vs)
 
-    # x => XOR(v1, v2, ...)
-    forward_clauses = generate_xor_helper([], [-x], vs)
+# Generate clauses encoding x <=> a + b + c > 1
+def generate_3gt1(x: int, a: int, b: int, c: int) -> List[List[int]]:
+    return instantiate(gate_template('threshold', 3, 2), [x, a, b, c])
 
-    # x <= XOR(v1, v2, ...)
-    vs = [-vs[0]] + vs[1:]
-    backward_clauses = generate_xor_helper([], [x], vs)
+class XorClause(list):
+    """
+    Native XOR constraint: the XOR of the literals is true. It is written as
+    an extended DIMACS 'x' line, and given as is to solvers that accept XORs.
+    """
 
-    return forward_clauses + backward_clauses
+# Generate the XOR constraint encoding x <=> XOR(v1, v2, ...)
+def generate_native_xor(x: int, vs: List[int]) -> XorClause:
+    return XorClause([-x] + vs)
 
-# Generate clauses encoding x <=> XOR(a, b, c)
-def generate_3xor(x: int, a: int, b: int, c: int) -> List[List[int]]:
-    return [
-        [-x, a, b, c], [-x,-a,-b, c], [-x,-a, b,-c], [-x, a,-b,-c],
-        [ x,-a,-b,-c], [ x, a, b,-c], [ x, a,-b, c], [ x,-a, b, c],
-    ]
+def count_array_multiplier(n: int, native_xor: bool = False):
+    """
+    Closed-form (nvars, nclauses, nliterals) of generate_array_multiplier(n)
+    """
+    nvars = 3 * n * n + 2 * n
 
-def generate_gt1(x: int, vs: List[int]):
-    assert(len(vs) > 1)
-    clauses = []
+    # AND gates, zeroed carries, and one full adder (XOR: 8x4 literals, GT1: 6x3 literals) per cell below row 0
+    # With native XORs, each sum bit is a single XOR constraint over 4 literals
+    nclauses  = 3 * n * n + 2 * n + (7 if native_xor else 14) * n * (n - 1)
+    nliterals = 7 * n * n + 2 * n + (22 if native_xor else 50) * n * (n - 1)
+    return nvars, nclauses, nliterals
 
-    # x <= SUM(vs) > 1
-    for i in range(len(vs)):
-        for j in range(i + 1, len(vs)):
-            clauses.append([x, -vs[i], -vs[j]])
+def count_forward_multiplication(x: int, y: int, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    n = max(1, x.bit_length(), y.bit_length())
+    nvars, nclauses, nliterals = MULTIPLIER_COUNTS[arch](n, native_xor=native_xor, **multiplier_options(arch, cutoff))
+    return nvars, nclauses + 2 * n, nliterals + 2 * n
 
-    # x => SUM(vs) > 1
-    for i in range(len(vs)):
-        clauses.append([-x] + vs[0:i] + vs[i+1:])
+def count_backward_multiplication(c: int, arch: str = 'array', native_xor: bool = False, asymmetric: bool = False,
+                                  constraints = (), congruence_bits: int = None, cutoff: int = None):
+    n = max(1, c.bit_length())
+    if asymmetric:
+        m, k = factor_widths(n)
+        nvars, nclauses, nliterals = count_asymmetric_multiplier(m, k, arch=arch, native_xor=native_xor)
+    else:
+        m, k = n, n
+        nvars, nclauses, nliterals = MULTIPLIER_COUNTS[arch](n, native_xor=native_xor, **multiplier_options(arch, cutoff))
 
-    return clauses
+    # The side constraints only depend on the operand widths
+    naux, side = generate_factoring_constraints(c, list(range(1, m + 1)), list(range(m + 1, m + k + 1)), m + k + 1,
+                                                asymmetric, constraints, congruence_bits)
+    nclauses += len(side)
+    nliterals += sum(len(clause) for clause in side)
+    return nvars + naux, nclauses + m + k + 2, nliterals + 2 * (m + k)
 
-# Generate clauses encoding x <=> a + b + c > 1
-def generate_3gt1(x: int, a: int, b: int, c: int) -> List[List[int]]:
-    return [
-        [ x,-a,-b], [ x,-a,-c], [ x,-b,-c],
-        [-x, a, b], [-x, a, c], [-x, b, c],
-    ]
+def count_commutativity(n: int, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    nvars, nclauses, nliterals = MULTIPLIER_COUNTS[arch](n, native_xor=native_xor, **multiplier_options(arch, cutoff))
+
+    # The reported variable count is one past the last difference variable
+    if native_xor: return 2 * nvars + 2 * n + 1, 2 * nclauses + 6 * n + 1, 2 * nliterals + 16 * n
+    return 2 * nvars + 2 * n + 1, 2 * nclauses + 12 * n + 1, 2 * nliterals + 34 * n
 
-def generate_array_multiplier(n: int, offset: int = 1):
+def array_multiplier_layout(n: int, offset: int = 1):
+    """
+    Variables of an n-bit array multiplier, shared by stream_array_multiplier
+    and build_array_multiplier
+
+    Returns (nvars, x_vars, y_vars, mult_vars, adder_out_vars, adder_carry_vars, out_vars)
+    """
     original_offset = offset
 
     # Step 0: define variables for the inputs
@@ -74,18 +98,6 @@ def generate_array_multiplier(n: int, offset: int = 1):
         offset += len(row_vars)
         mult_vars.append(row_vars)
 
-    # Step 2: generate all the bitwise multiplication clauses
-    clauses = []
-    for row, x_var in enumerate(x_vars):
-        for col, y_var in enumerate(y_vars):
-            # z <=> x AND y
-            z = mult_vars[row][col]
-            clauses += [
-                [ z, -x_var, -y_var],
-                [-z,  x_var],
-                [-z,  y_var],
-            ]
-
     # Step 3: generate all the output variables for the adders
     # note that the output of row 0 is just the multiplication variables
     adder_out_vars = []
@@ -106,113 +118,937 @@ def generate_array_multiplier(n: int, offset: int = 1):
         offset += len(row_vars)
         adder_carry_vars.append(row_vars)
 
-    # Step 5: set the carry bits of row 0 and column 0 to zero
-    clauses += [ [-adder_carry_vars[0][col]] for col in range(n + 1) ]
-    clauses += [ [-adder_carry_vars[row][0]] for row in range(1, n) ]
+    # Step 7: get a list of the output variables
+    out_vars = [ adder_out_vars[row][0] for row in range(n) ]
+    out_vars += adder_out_vars[-1][1:] + [ adder_carry_vars[-1][n] ]
+
+    return offset - original_offset, x_vars, y_vars, mult_vars, adder_out_vars, adder_carry_vars, out_vars
+
+def stream_array_multiplier(n: int, offset: int = 1, native_xor: bool = False):
+    """
+    Lazy variant of generate_array_multiplier: all variables are laid out up
+    front, and the clauses are yielded one at a time by the returned generator.
+    With native_xor, each sum bit is a single XorClause instead of 8 clauses.
+
+    Returns (nvars, nclauses, clauses, x_vars, y_vars, out_vars)
+    """
+    layout_vars, x_vars, y_vars, mult_vars, adder_out_vars, adder_carry_vars, out_vars = array_multiplier_layout(n, offset)
+
+    def generate_clauses():
+        # Step 2: generate all the bitwise multiplication clauses
+        for row, x_var in enumerate(x_vars):
+            for col, y_var in enumerate(y_vars):
+                # z <=> x AND y
+                z = mult_vars[row][col]
+                yield [ z, -x_var, -y_var]
+                yield [-z,  x_var]
+                yield [-z,  y_var]
+
+        # Step 5: set the carry bits of row 0 and column 0 to zero
+        for col in range(n + 1): yield [-adder_carry_vars[0][col]]
+        for row in range(1, n):  yield [-adder_carry_vars[row][0]]
+
+        # Step 6: generate all the adder output clauses
+        for row in range(1, n):
+            for col in range(n - 1):
+                in_1  = mult_vars       [row    ][col    ]
+                in_2  = adder_out_vars  [row - 1][col + 1]
+                out   = adder_out_vars  [row    ][col    ]
+                c_in  = adder_carry_vars[row    ][col    ]
+                c_out = adder_carry_vars[row    ][col + 1]
+                if native_xor: yield generate_native_xor(out, [in_1, in_2, c_in])
+                else:          yield from generate_xor(out, [in_1, in_2, c_in])
+                yield from generate_gt1(c_out, [in_1, in_2, c_in])
+
+            # Map each adder's overflow carry bit to the input of the adder below
+            col   = n - 1
+            in_1  = mult_vars       [row    ][col    ]
+            in_2  = adder_carry_vars[row - 1][col + 1]
+            out   = adder_out_vars  [row    ][col    ]
+            c_in  = adder_carry_vars[row    ][col    ]
+            c_out = adder_carry_vars[row    ][col + 1]
+            if native_xor: yield generate_native_xor(out, [in_1, in_2, c_in])
+            else:          yield from generate_xor(out, [in_1, in_2, c_in])
+            yield from generate_gt1(c_out, [in_1, in_2, c_in])
+
+    nvars, nclauses, nliterals = count_array_multiplier(n, native_xor)
+    assert(nvars == layout_vars)
+    return nvars, nclauses, generate_clauses(), x_vars, y_vars, out_vars
+
+def generate_array_multiplier(n: int, offset: int = 1, store = list, native_xor: bool = False):
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_array_multiplier(n, offset, native_xor)
+    return nvars, store(clauses), x_vars, y_vars, out_vars
+
+# Gate-level netlists are lists of gate tuples (kind, out, *inputs), see gates.GATE_SIZES
+NATIVE_XOR_GATE_SIZES = { # (nclauses, nliterals) of the gates that become one XorClause
+    'xor':  (1, 3),
+    'xor3': (1, 4),
+}
+
+def generate_gate_clauses(gate, native_xor: bool = False) -> List[List[int]]:
+    kind, out, *ins = gate
+    if native_xor and kind in NATIVE_XOR_GATE_SIZES: return [generate_native_xor(out, ins)]
+    return tseitin(kind, out, *ins)
+
+def count_netlist(gates, native_xor: bool = False):
+    sizes = {**GATE_SIZES, **NATIVE_XOR_GATE_SIZES} if native_xor else GATE_SIZES
+    nclauses = sum(sizes[gate[0]][0] for gate in gates)
+    nliterals = sum(sizes[gate[0]][1] for gate in gates)
+    return nclauses, nliterals
+
+def stream_netlist(gates, native_xor: bool = False):
+    for gate in gates:
+        yield from generate_gate_clauses(gate, native_xor)
+
+class Netlist:
+    """
+    Netlist under construction: gates over variables allocated in order from
+    an offset on. new_var and gates are what the *_multiply helpers take.
+    """
+
+    def __init__(self, offset: int = 1):
+        self.start = offset
+        self.offset = offset
+        self.gates = []
+
+    def new_var(self) -> int:
+        self.offset += 1
+        return self.offset - 1
+
+    def new_vars(self, k: int) -> List[int]:
+        return [ self.new_var() for _ in range(k) ]
+
+    def nvars(self) -> int:
+        return self.offset - self.start
+
+def netlist_circuit(build):
+    """
+    Get the (count, stream, generate) functions of a circuit from its netlist
+    builder, which returns (nvars, gates, *operand_vars, out_vars). Their
+    positional and remaining keyword arguments are passed to the builder:
+      count(*args, native_xor, **options)         -> (nvars, nclauses, nliterals)
+      stream(*args, native_xor, **options)        -> (nvars, nclauses, clauses, *operand_vars, out_vars)
+      generate(*args, store, native_xor, **options) -> (nvars, clauses, *operand_vars, out_vars)
+    With native_xor, the XOR gates are emitted as XorClauses.
+    """
+    def count(*args, native_xor: bool = False, **options):
+        nvars, gates, *io_vars = build(*args, **options)
+        return (nvars, *count_netlist(gates, native_xor))
+
+    def stream(*args, native_xor: bool = False, **options):
+        nvars, gates, *io_vars = build(*args, **options)
+        nclauses, nliterals = count_netlist(gates, native_xor)
+        return (nvars, nclauses, stream_netlist(gates, native_xor), *io_vars)
+
+    def generate(*args, store = list, native_xor: bool = False, **options):
+        nvars, nclauses, clauses, *io_vars = stream(*args, native_xor=native_xor, **options)
+        return (nvars, store(clauses), *io_vars)
+
+    return count, stream, generate
+
+def reduce_columns(columns: List[List[int]], new_var, gates: list, width: int) -> List[int]:
+    """
+    Sum the bits in each column (column i has weight 2^i) with a Dadda
+    reduction tree of full and half adders, followed by a ripple-carry adder
+    over the final two rows. Returns the lowest width bits of the sum.
+
+    @param new_var: function allocating a fresh variable
+    @param gates  : gate list to which the adders are appended
+    """
+    columns = [list(column) for column in columns] + [[] for _ in range(width - len(columns))]
+
+    # Dadda heights: 2, 3, 4, 6, 9, 13, ...
+    heights = [2]
+    while heights[-1] < max(len(column) for column in columns):
+        heights.append(heights[-1] * 3 // 2)
+
+    # Reduce every column to at most d bits, for each target height d in decreasing order
+    for d in reversed(heights[:-1]):
+        for i in range(width):
+            while len(columns[i]) > d:
+                if len(columns[i]) == d + 1:
+                    a, b = columns[i].pop(0), columns[i].pop(0)
+                    s, c = new_var(), new_var()
+                    gates += [('xor', s, a, b), ('and', c, a, b)]
+                else:
+                    a, b, cin = columns[i].pop(0), columns[i].pop(0), columns[i].pop(0)
+                    s, c = new_var(), new_var()
+                    gates += [('xor3', s, a, b, cin), ('maj', c, a, b, cin)]
+                columns[i].append(s)
+                if i + 1 < width: columns[i + 1].append(c)
+
+    # Ripple-carry adder over the remaining two rows
+    out_vars = []
+    carry = []
+    for i in range(width):
+        bits = columns[i] + carry
+        last = i + 1 == width
+        if len(bits) == 0:
+            s = new_var()
+            gates.append(('zero', s))
+            carry = []
+        elif len(bits) == 1:
+            s = bits[0]
+            carry = []
+        elif len(bits) == 2:
+            s = new_var()
+            gates.append(('xor', s, *bits))
+            carry = []
+            if not last:
+                carry = [new_var()]
+                gates.append(('and', carry[0], *bits))
+        else:
+            s = new_var()
+            gates.append(('xor3', s, *bits))
+            carry = []
+            if not last:
+                carry = [new_var()]
+                gates.append(('maj', carry[0], *bits))
+        out_vars.append(s)
+
+    return out_vars
+
+def carrysave_multiply(xs: List[int], ys: List[int], new_var, gates: list) -> List[int]:
+    """
+    Netlist of a carry-save multiplier over the given input literals: the
+    partial products are grouped by column and summed with the reduction tree.
+    Returns the len(xs) + len(ys) product bits.
+    """
+    width = len(xs) + len(ys)
+    columns = [[] for _ in range(width)]
+    for row, x in enumerate(xs):
+        for col, y in enumerate(ys):
+            z = new_var()
+            gates.append(('and', z, x, y))
+            columns[row + col].append(z)
+    return reduce_columns(columns, new_var, gates, width)
+
+def build_carrysave_multiplier(n: int, offset: int = 1):
+    """
+    Build the netlist of an n-bit carry-save (Dadda tree) multiplier
+
+    Returns (nvars, gates, x_vars, y_vars, out_vars)
+    """
+    net = Netlist(offset)
+    x_vars, y_vars = net.new_vars(n), net.new_vars(n)
+    out_vars = carrysave_multiply(x_vars, y_vars, net.new_var, net.gates)
+    return net.nvars(), net.gates, x_vars, y_vars, out_vars
+
+count_carrysave_multiplier, stream_carrysave_multiplier, generate_carrysave_multiplier = netlist_circuit(build_carrysave_multiplier)
+
+def array_multiply(xs: List[int], ys: List[int], new_var, gates: list) -> List[int]:
+    """
+    Netlist of an array multiplier over the given input literals: one row of
+    partial products per bit of xs, accumulated by a ripple-carry adder per row.
+    Returns the len(xs) + len(ys) product bits.
+    """
+    assert(len(xs) > 0 and len(ys) > 0)
+
+    # Row 0 is just the partial products
+    acc = []
+    for y in ys:
+        z = new_var()
+        gates.append(('and', z, xs[0], y))
+        acc.append(z)
+
+    out_vars = []
+    for x in xs[1:]:
+        row = []
+        for y in ys:
+            z = new_var()
+            gates.append(('and', z, x, y))
+            row.append(z)
+
+        # The lowest bit of the accumulator is final, and the rest is added to the next row
+        out_vars.append(acc[0])
+        upper = acc[1:]
+        acc = []
+        carry = None
+        for i in range(len(row)):
+            bits = [row[i]] + upper[i:i+1] + ([carry] if carry != None else [])
+            if len(bits) == 1:
+                acc.append(bits[0])
+                carry = None
+                continue
+            s, c = new_var(), new_var()
+            if len(bits) == 2: gates += [('xor',  s, *bits), ('and', c, *bits)]
+            else:              gates += [('xor3', s, *bits), ('maj', c, *bits)]
+            acc.append(s)
+            carry = c
+        if carry != None: acc.append(carry)
+
+    out_vars += acc
+    while len(out_vars) < len(xs) + len(ys):
+        z = new_var()
+        gates.append(('zero', z))
+        out_vars.append(z)
+    return out_vars[:len(xs) + len(ys)]
+
+# Default operand width at or below which the Karatsuba multiplier falls back
+# to the array multiplier (every builder also takes a cutoff argument)
+KARATSUBA_CUTOFF = 16
+
+def karatsuba_multiply(xs: List[int], ys: List[int], new_var, gates: list, true_lit: int, cutoff: int) -> List[int]:
+    """
+    Netlist of a recursive Karatsuba multiplier over two equal-width operands:
+        x * y = z2 * 2^(2m) + (P - z0 - z2) * 2^m + z0
+    where z0 = x0 * y0, z2 = x1 * y1 and P = (x0 + x1) * (y0 + y1).
+    The subtraction is folded into a single multi-operand reduction in two's
+    complement, with all constant bits gathered into one number.
+    Returns the 2 * len(xs) product bits.
+    """
+    n = len(xs)
+    assert(len(ys) == n)
+    # Below 4 bits, the operand sums are as wide as the operands
+    if n <= max(3, cutoff): return array_multiply(xs, ys, new_var, gates)
+
+    width = 2 * n
+    m = n // 2
+    (x0, x1) = (xs[:m], xs[m:])
+    (y0, y1) = (ys[:m], ys[m:])
+    h = n - m
+
+    # Operand sums are h + 1 bits wide
+    def add(a: List[int], b: List[int]) -> List[int]:
+        return reduce_columns([[a[i]] + b[i:i+1] for i in range(len(a))], new_var, gates, len(a) + 1)
+    z0 = karatsuba_multiply(x0, y0, new_var, gates, true_lit, cutoff)
+    z2 = karatsuba_multiply(x1, y1, new_var, gates, true_lit, cutoff)
+    P  = karatsuba_multiply(add(x1, x0), add(y1, y0), new_var, gates, true_lit, cutoff)
+
+    # Collect the terms column by column
+    columns = [[] for _ in range(width)]
+    constant = 0
+    for i, bit in enumerate(z0): columns[i].append(bit)
+    for i, bit in enumerate(z2): columns[i + 2 * m].append(bit)
+    for i, bit in enumerate(P):
+        if i + m < width: columns[i + m].append(bit)
+
+    # -z * 2^m = (NOT z, extended with ones) * 2^m + 2^m  (mod 2^width)
+    for z in [z0, z2]:
+        for i in range(m, width):
+            if i - m < len(z): columns[i].append(-z[i - m])
+            else:              constant += 1 << i
+        constant += 1 << m
+    constant &= (1 << width) - 1
+    for i in range(width):
+        if (constant >> i) & 1: columns[i].append(true_lit)
+
+    return reduce_columns(columns, new_var, gates, width)
+
+def build_karatsuba_multiplier(n: int, offset: int = 1, cutoff: int = None):
+    """
+    Build the netlist of an n-bit Karatsuba multiplier
+
+    Returns (nvars, gates, x_vars, y_vars, out_vars)
+    """
+    if cutoff == None: cutoff = KARATSUBA_CUTOFF
+    net = Netlist(offset)
+    x_vars, y_vars = net.new_vars(n), net.new_vars(n)
+
+    # Step 1: define a constant for the two's complement terms, if needed
+    true_lit = None
+    if n > max(3, cutoff):
+        true_lit = -net.new_var()
+        net.gates.append(('zero', -true_lit))
+
+    # Step 2: multiply
+    out_vars = karatsuba_multiply(x_vars, y_vars, net.new_var, net.gates, true_lit, cutoff)
+
+    return net.nvars(), net.gates, x_vars, y_vars, out_vars
+
+count_karatsuba_multiplier, stream_karatsuba_multiplier, generate_karatsuba_multiplier = netlist_circuit(build_karatsuba_multiplier)
+
+def build_booth_multiplier(n: int, offset: int = 1):
+    """
+    Build the netlist of an n-bit multiplier with radix-4 (modified Booth)
+    partial products. Each group (y[2i+1], y[2i], y[2i-1]) selects a digit in
+    {-2, -1, 0, 1, 2}, so there are floor(n/2) + 1 partial product rows
+    instead of n. Rows are summed with the same reduction tree as the
+    carry-save multiplier.
+
+    Returns (nvars, gates, x_vars, y_vars, out_vars)
+    """
+    width = 2 * n
+    net = Netlist(offset)
+    x_vars, y_vars = net.new_vars(n), net.new_vars(n)
+    (new_var, gates) = (net.new_var, net.gates)
+
+    def y_bit(i: int):
+        return y_vars[i] if 0 <= i < n else None
+
+    def x_bit(j: int):
+        return x_vars[j] if 0 <= j < n else None
+
+    def gate_and(a, b):
+        if a == None or b == None: return None
+        z = new_var()
+        gates.append(('and', z, a, b))
+        return z
+
+    def gate_xor(*ins):
+        ins = [i for i in ins if i != None]
+        if len(ins) == 0: return None
+        if len(ins) == 1: return ins[0]
+        z = new_var()
+        gates.append(('xor' if len(ins) == 2 else 'xor3', z, *ins))
+        return z
+
+    columns = [[] for _ in range(width)]
+    constant = 0
+    for i in range(n // 2 + 1):
+        # Step 1: Booth-encode the group
+        #   neg    = y[2i+1]
+        #   single = y[2i] XOR y[2i-1]              (digit is +-1)
+        #   double = (y[2i+1] XOR y[2i]) AND NOT single (digit is +-2)
+        (hi, mid, lo) = (y_bit(2 * i + 1), y_bit(2 * i), y_bit(2 * i - 1))
+        neg = hi
+        single = gate_xor(mid, lo)
+        double = gate_xor(hi, mid)
+        if double != None and single != None: double = gate_and(double, -single)
+
+        # Step 2: generate the partial product bits, inverted if the digit is negative
+        for j in range(n + 1):
+            bit = gate_xor(gate_and(single, x_bit(j)), gate_and(double, x_bit(j - 1)), neg)
+            if bit != None and 2 * i + j < width: columns[2 * i + j].append(bit)
+
+        # Step 3: complete the two's complement (+neg) and sign-extend the row:
+        # neg * (2^width - 2^k) = (NOT neg) * 2^k + (2^width - 2^k)  (mod 2^width)
+        if neg != None:
+            columns[2 * i].append(neg)
+            k = 2 * i + n + 1
+            if k < width:
+                columns[k].append(-neg)
+                constant += (1 << width) - (1 << k)
+
+    # Step 4: add the constant bits
+    constant &= (1 << width) - 1
+    if constant != 0:
+        true_lit = -new_var()
+        gates.append(('zero', -true_lit))
+        for i in range(width):
+            if (constant >> i) & 1: columns[i].append(true_lit)
+
+    # Step 5: sum the columns
+    out_vars = reduce_columns(columns, new_var, gates, width)
+
+    return net.nvars(), gates, x_vars, y_vars, out_vars
+
+count_booth_multiplier, stream_booth_multiplier, generate_booth_multiplier = netlist_circuit(build_booth_multiplier)
+
+def build_array_multiplier(n: int, offset: int = 1):
+    """
+    Build the netlist of generate_array_multiplier(n, offset), with the same
+    variables: the forced-zero carries become 'zero' gates, and each adder
+    becomes an 'xor3' and a 'maj' gate
+
+    Returns (nvars, gates, x_vars, y_vars, out_vars)
+    """
+    nvars, x_vars, y_vars, mult_vars, adder_out_vars, adder_carry_vars, out_vars = array_multiplier_layout(n, offset)
 
-    # Step 6: generate all the adder output clauses
+    gates = []
+    for row, x_var in enumerate(x_vars):
+        for col, y_var in enumerate(y_vars):
+            gates.append(('and', mult_vars[row][col], x_var, y_var))
+    gates += [ ('zero', adder_carry_vars[0][col]) for col in range(n + 1) ]
+    gates += [ ('zero', adder_carry_vars[row][0]) for row in range(1, n) ]
     for row in range(1, n):
-        for col in range(n - 1):
+        for col in range(n):
             in_1  = mult_vars       [row    ][col    ]
-            in_2  = adder_out_vars  [row - 1][col + 1]
+            in_2  = adder_out_vars  [row - 1][col + 1] if col < n - 1 else adder_carry_vars[row - 1][n]
             out   = adder_out_vars  [row    ][col    ]
             c_in  = adder_carry_vars[row    ][col    ]
             c_out = adder_carry_vars[row    ][col + 1]
-            clauses += generate_xor(  out, [in_1, in_2, c_in])
-            clauses += generate_gt1(c_out, [in_1, in_2, c_in])
-
-        # Map each adder's overflow carry bit to the input of the adder below
-        col   = n - 1
-        in_1  = mult_vars       [row    ][col    ]
-        in_2  = adder_carry_vars[row - 1][col + 1]
-        out   = adder_out_vars  [row    ][col    ]
-        c_in  = adder_carry_vars[row    ][col    ]
-        c_out = adder_carry_vars[row    ][col + 1]
-        clauses += generate_xor(  out, [in_1, in_2, c_in])
-        clauses += generate_gt1(c_out, [in_1, in_2, c_in])
+            gates += [('xor3', out, in_1, in_2, c_in), ('maj', c_out, in_1, in_2, c_in)]
 
-    # Step 7: get a list of the output variables
-    out_vars = [ adder_out_vars[row][0] for row in range(n) ]
-    out_vars += adder_out_vars[-1][1:] + [ adder_carry_vars[-1][n] ]
+    return nvars, gates, x_vars, y_vars, out_vars
+
+# Architectures that build_asymmetric_multiplier supports
+ASYMMETRIC_MULTIPLIERS = ['array', 'carrysave']
+
+def build_asymmetric_multiplier(m: int, k: int, offset: int = 1, arch: str = 'array'):
+    """
+    Build the netlist of a multiplier of an m-bit x by a k-bit y, with
+    m * k partial products and m + k output bits. 'array' accumulates one row
+    per bit of x, 'carrysave' sums all columns with the reduction tree.
+
+    Returns (nvars, gates, x_vars, y_vars, out_vars)
+    """
+    if arch not in ASYMMETRIC_MULTIPLIERS:
+        raise ValueError(f'Architecture {arch} only supports equal operand widths')
+    net = Netlist(offset)
+    x_vars, y_vars = net.new_vars(m), net.new_vars(k)
+    multiply = array_multiply if arch == 'array' else carrysave_multiply
+    out_vars = multiply(x_vars, y_vars, net.new_var, net.gates)
+    return net.nvars(), net.gates, x_vars, y_vars, out_vars
+
+count_asymmetric_multiplier, stream_asymmetric_multiplier, generate_asymmetric_multiplier = netlist_circuit(build_asymmetric_multiplier)
+
+def build_squarer(n: int, offset: int = 1):
+    """
+    Build the netlist of an n-bit squarer. Since x_i * x_j = x_j * x_i,
+    x^2 = SUM x_i * 2^(2i) + SUM_{i<j} x_i * x_j * 2^(i+j+1), so there are
+    n(n-1)/2 partial products instead of n^2 (and x_i * x_i = x_i needs no
+    gate). The columns are summed with the carry-save reduction tree.
+
+    Returns (nvars, gates, x_vars, out_vars), with 2n output bits
+    """
+    net = Netlist(offset)
+    x_vars = net.new_vars(n)
 
-    return offset - original_offset, clauses, x_vars, y_vars, out_vars
+    # Step 1: generate the diagonal bits and the doubled partial products, grouped by column
+    columns = [[] for _ in range(2 * n)]
+    for i, x_var in enumerate(x_vars):
+        columns[2 * i].append(x_var)
+        for j in range(i + 1, n):
+            z = net.new_var()
+            net.gates.append(('and', z, x_var, x_vars[j]))
+            columns[i + j + 1].append(z)
 
-def generate_forward_multiplication(x: int, y: int):
+    # Step 2: sum the columns
+    out_vars = reduce_columns(columns, net.new_var, net.gates, 2 * n)
+
+    return net.nvars(), net.gates, x_vars, out_vars
+
+count_squarer, stream_squarer, generate_squarer = netlist_circuit(build_squarer)
+
+def factor_widths(n: int):
+    """
+    Operand widths (m, k) that cover a nontrivial factor pair x >= y of any
+    n-bit number: y <= sqrt(c) has at most ceil(n/2) bits, and x <= c/2 has
+    at most n - 1 bits
+    """
+    return max(1, n - 1), (n + 1) // 2
+
+# Netlist builders for each architecture: (nvars, gates, x_vars, y_vars, out_vars)
+NETLISTS = {
+    'array':     build_array_multiplier,
+    'carrysave': build_carrysave_multiplier,
+    'karatsuba': build_karatsuba_multiplier,
+    'booth':     build_booth_multiplier,
+}
+
+def build_aig_multiplier(n: int, arch: str = 'array', x: int = None, y: int = None, cutoff: int = None):
+    """
+    Build an n-bit multiplier in an AIG. Known operands become constants, so
+    the graph only keeps the logic that still depends on the free inputs.
+
+    Returns (aig, x_lits, y_lits, out_lits)
+    """
+    nvars, gates, x_vars, y_vars, out_vars = NETLISTS[arch](n, **multiplier_options(arch, cutoff))
+    aig = AIG()
+    def operand(vs: List[int], value: int):
+        if value == None: return [ aig.new_input() for v in vs ]
+        return [ AIG.TRUE if (value >> i) & 1 else AIG.FALSE for i in range(len(vs)) ]
+    x_lits = operand(x_vars, x)
+    y_lits = operand(y_vars, y)
+    lits = netlist_to_aig(aig, gates, dict(zip(x_vars + y_vars, x_lits + y_lits)))
+    return aig, x_lits, y_lits, [ lits[o] for o in out_vars ]
+
+def generate_aig_multiplier(n: int, offset: int = 1, arch: str = 'array', cutoff: int = None):
+    """
+    Same contract as generate_array_multiplier, but built through the AIG:
+    shared gates are merged, constants folded, and dead gates dropped
+    """
+    aig, x_lits, y_lits, out_lits = build_aig_multiplier(n, arch, cutoff=cutoff)
+    nvars, clauses, input_vars, out_vars = aig.to_cnf(out_lits, offset)
+    return nvars, clauses, input_vars[:n], input_vars[n:], out_vars
+
+def count_aig_multiplier(n: int, arch: str = 'array', cutoff: int = None):
+    aig, x_lits, y_lits, out_lits = build_aig_multiplier(n, arch, cutoff=cutoff)
+    return aig.count_cnf(out_lits)
+
+def generate_forward_multiplication_aig(x: int, y: int, arch: str = 'array', cutoff: int = None):
+    """
+    Same contract as generate_forward_multiplication, but the operands are
+    folded into the circuit instead of being pinned by unit clauses. The
+    input variables are still defined (and pinned), but the circuit reduces to
+    the constant product.
+    """
     n = max(1, x.bit_length(), y.bit_length())
-    
-    # Generate multiplier
-    nvars, clauses, x_vars, y_vars, out_vars = generate_array_multiplier(n)
+    aig, x_lits, y_lits, out_lits = build_aig_multiplier(n, arch, x, y, cutoff)
 
-    # Set input bits
+    # Pinned input variables
+    clauses = []
+    x_vars = [ 1 + i for i in range(n) ]
+    y_vars = [ 1 + n + i for i in range(n) ]
     for i in range(n):
         clauses += [
-            [x_vars[i] * (1 if x & 1 == 1 else -1)],
-            [y_vars[i] * (1 if y & 1 == 1 else -1)],
+            [x_vars[i] * (1 if (x >> i) & 1 else -1)],
+            [y_vars[i] * (1 if (y >> i) & 1 else -1)],
         ]
-        x >>= 1
-        y >>= 1
 
-    return nvars, clauses, x_vars, y_vars, out_vars
+    nvars, circuit, input_vars, out_vars = aig.to_cnf(out_lits, 1 + 2 * n)
+    return 2 * n + nvars, clauses + circuit, x_vars, y_vars, out_vars
+
+# Multiplier architectures, by name. Each entry streams an n-bit multiplier at
+# a given offset: (nvars, nclauses, clauses, x_vars, y_vars, out_vars)
+# All of them take a native_xor keyword to emit their XOR gates as XorClauses,
+# and the keywords from multiplier_options. All but 'array', which has its own
+# streaming encoding, are netlist_circuit over their NETLISTS builder.
+MULTIPLIERS = {
+    'array':     stream_array_multiplier,
+    'carrysave': stream_carrysave_multiplier,
+    'karatsuba': stream_karatsuba_multiplier,
+    'booth':     stream_booth_multiplier,
+}
+
+# Size of each architecture, by name: (nvars, nclauses, nliterals)
+MULTIPLIER_COUNTS = {
+    'array':     count_array_multiplier,
+    'carrysave': count_carrysave_multiplier,
+    'karatsuba': count_karatsuba_multiplier,
+    'booth':     count_booth_multiplier,
+}
+
+def multiplier_options(arch: str, cutoff: int = None):
+    """
+    Architecture-specific keyword arguments of the MULTIPLIERS,
+    MULTIPLIER_COUNTS and NETLISTS entries: only Karatsuba takes a cutoff
+    (None for KARATSUBA_CUTOFF)
+    """
+    return { 'cutoff': cutoff } if arch == 'karatsuba' else {}
+
+# Maximum number of multiplier templates kept by multiplier_template
+MULTIPLIER_TEMPLATE_CACHE_SIZE = 32
+
+# Cached templates by (arch, n, cutoff), least recently used first
+multiplier_templates = OrderedDict()
+
+def multiplier_template_key(arch: str, n: int, cutoff: int = None):
+    # Other architectures share one template per width
+    if arch != 'karatsuba':  cutoff = None
+    elif cutoff == None:     cutoff = KARATSUBA_CUTOFF
+    return (arch, n, cutoff)
+
+def multiplier_template(arch: str, n: int, cutoff: int = None):
+    """
+    Get the clauses of an n-bit multiplier of the given architecture built at
+    offset 1, as a ClauseStore. Templates are cached (least recently used
+    first out), so later instances only pay for a literal shift.
+
+    Returns (nvars, clauses, x_vars, y_vars, out_vars)
+    """
+    key = multiplier_template_key(arch, n, cutoff)
+    if key in multiplier_templates:
+        multiplier_templates.move_to_end(key)
+        return multiplier_templates[key]
+
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n, **multiplier_options(arch, key[2]))
+    template = (nvars, ClauseStore(clauses), tuple(x_vars), tuple(y_vars), tuple(out_vars))
+    multiplier_templates[key] = template
+    if len(multiplier_templates) > MULTIPLIER_TEMPLATE_CACHE_SIZE: multiplier_templates.popitem(last=False)
+    return template
+
+def instantiate_multiplier(n: int, offset: int = 1, arch: str = 'array', cutoff: int = None):
+    """
+    Get an n-bit multiplier at the given offset from the template cache.
+    Produces the same clauses as building the multiplier at that offset.
+
+    Returns (nvars, clauses, x_vars, y_vars, out_vars), with the clauses in a ClauseStore
+    """
+    nvars, clauses, x_vars, y_vars, out_vars = multiplier_template(arch, n, cutoff)
+    # Always copy, so the cached template cannot be modified by the caller
+    delta = offset - 1
+    clauses = clauses.shifted(delta)
+    shift = lambda vs: [ v + delta for v in vs ]
+    return nvars, clauses, shift(x_vars), shift(y_vars), shift(out_vars)
+
+def stream_forward_multiplication(x: int, y: int, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    n = max(1, x.bit_length(), y.bit_length())
+
+    # Generate multiplier
+    nvars, nclauses, mult_clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n, native_xor=native_xor, **multiplier_options(arch, cutoff))
+
+    # Set input bits
+    def generate_clauses(x: int, y: int):
+        yield from mult_clauses
+        for i in range(n):
+            yield [x_vars[i] * (1 if x & 1 == 1 else -1)]
+            yield [y_vars[i] * (1 if y & 1 == 1 else -1)]
+            x >>= 1
+            y >>= 1
+
+    nclauses += 2 * n
+    return nvars, nclauses, generate_clauses(x, y), x_vars, y_vars, out_vars
+
+def generate_forward_multiplication(x: int, y: int, store = list, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_forward_multiplication(x, y, arch, native_xor, cutoff)
+    return nvars, store(clauses), x_vars, y_vars, out_vars
+
+# Optional side constraints of factoring instances, by name:
+#   'order':      the factors are ordered: x <= y, or y <= x with an asymmetric multiplier (y is the narrow one)
+#   'odd':        both factors are odd if c is odd
+#   'congruence': for odd c, y = c / x (mod 2^k) over the lowest congruence_bits bits of x and y
+#   'length':     the smaller factor (per 'order') has at most ceil(n/2) bits, and
+#                 the larger one between ceil(n/2) and n - 1 bits
+FACTORING_CONSTRAINTS = ['order', 'odd', 'congruence', 'length']
+CONGRUENCE_BITS = 3
+
+def generate_leq(a: List[int], b: List[int], offset: int):
+    """
+    Clauses asserting a <= b for two unsigned numbers given by their bits
+    (lowest bit first; missing high bits are zero). g_i, at variable
+    offset + i, means that a <= b must hold on bits 0..i, and the top one is
+    asserted.
+
+    Returns (nvars, clauses)
+    """
+    width = max(len(a), len(b))
+    def bit(vs: List[int], i: int, positive: bool):
+        # A missing bit is false, so its literal is a constant
+        if i >= len(vs): return not positive
+        return vs[i] if positive else -vs[i]
+    def clause(*lits):
+        if any(lit is True for lit in lits): return []
+        return [[lit for lit in lits if lit is not False]]
 
-def generate_backward_multiplication(c: int):
+    clauses = [[offset + width - 1]]
+    for i in range(width):
+        g = offset + i
+        # a_i <= b_i
+        clauses += clause(-g, bit(a, i, False), bit(b, i, True))
+        # a_i = b_i => the lower bits decide
+        if i > 0:
+            clauses += clause(-g, bit(a, i, True),  bit(b, i, True),  g - 1)
+            clauses += clause(-g, bit(a, i, False), bit(b, i, False), g - 1)
+    return width, clauses
+
+def generate_factoring_constraints(c: int, x_vars: List[int], y_vars: List[int], offset: int, asymmetric: bool = False,
+                                   constraints = (), congruence_bits: int = None):
+    """
+    Clauses for the requested FACTORING_CONSTRAINTS of a factoring instance
+    for c, with auxiliary variables from offset on
+
+    Returns (nvars, clauses)
+    """
+    if congruence_bits == None: congruence_bits = CONGRUENCE_BITS
+    for name in constraints:
+        if name not in FACTORING_CONSTRAINTS: raise ValueError(f'Unknown factoring constraint {name}')
+    n = max(1, c.bit_length())
+    (small, large) = (y_vars, x_vars) if asymmetric else (x_vars, y_vars)
+
+    nvars = 0
+    clauses = []
+    if 'order' in constraints:
+        nvars, clauses = generate_leq(small, large, offset)
+
+    if 'odd' in constraints and c & 1:
+        clauses += [[x_vars[0]], [y_vars[0]]]
+
+    if 'congruence' in constraints and c & 1:
+        # x -> c / x (mod 2^k) is a bijection on the odd residues, so the low
+        # bits of each factor determine the low bits of the other
+        k = min(congruence_bits, len(x_vars), len(y_vars))
+        for (a, b) in [(x_vars, y_vars), (y_vars, x_vars)]:
+            for r in range(1, 1 << k, 2):
+                s = c * pow(r, -1, 1 << k) % (1 << k)
+                differs = [ -a[j] if (r >> j) & 1 else a[j] for j in range(k) ]
+                clauses += [ differs + [b[j] if (s >> j) & 1 else -b[j]] for j in range(k) ]
+
+    if 'length' in constraints and c >= 4:
+        h = (n + 1) // 2
+        # small <= sqrt(c) < 2^h
+        clauses += [ [-v] for v in small[h:] ]
+        # 2^(h-1) <= sqrt(c) <= large <= c/2 < 2^(n-1)
+        clauses += [ [-v] for v in large[n - 1:] ]
+        clauses.append(large[h - 1:])
+
+    return nvars, clauses
+
+def stream_backward_multiplication(c: int, arch: str = 'array', native_xor: bool = False, asymmetric: bool = False,
+                                   constraints = (), congruence_bits: int = None, cutoff: int = None):
+    """
+    Factoring instance for c. With asymmetric, the multiplier is only as wide
+    as factor_widths requires, instead of n x n bits. Any FACTORING_CONSTRAINTS
+    named in constraints are added at the end.
+    """
     n = max(1, c.bit_length())
 
     # Generate multiplier
-    nvars, clauses, x_vars, y_vars, out_vars = generate_array_multiplier(n)
+    if asymmetric: nvars, nclauses, mult_clauses, x_vars, y_vars, out_vars = stream_asymmetric_multiplier(*factor_widths(n), arch=arch, native_xor=native_xor)
+    else:          nvars, nclauses, mult_clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n, native_xor=native_xor, **multiplier_options(arch, cutoff))
 
-    # Set output bits
-    for i in range(n):
-        clauses += [
-            [out_vars[i] * (1 if c & 1 == 1 else -1)],
-            [-out_vars[n + i]], # Left-pad with zeroes
-        ]
-        c >>= 1
+    def generate_clauses(c: int):
+        yield from mult_clauses
+
+        # Set output bits
+        for i in range(n):
+            yield [out_vars[i] * (1 if c & 1 == 1 else -1)]
+            if n + i < len(out_vars): yield [-out_vars[n + i]] # Left-pad with zeroes
+            c >>= 1
+
+        # Assert that inputs are not equal to 1
+        yield [x for x in x_vars[1:]] + [-x_vars[0]]
+        yield [y for y in y_vars[1:]] + [-y_vars[0]]
 
-    # Assert that inputs are not equal to 1
-    clauses.append([x for x in x_vars[1:]] + [-x_vars[0]])
-    clauses.append([y for y in y_vars[1:]] + [-y_vars[0]])
+        yield from side_clauses
 
-    return nvars, clauses, x_vars, y_vars, out_vars
+    naux, side_clauses = generate_factoring_constraints(c, x_vars, y_vars, 1 + nvars, asymmetric, constraints, congruence_bits)
+    nclauses += len(out_vars) + 2 + len(side_clauses)
+    return nvars + naux, nclauses, generate_clauses(c), x_vars, y_vars, out_vars
+
+def generate_backward_multiplication(c: int, store = list, arch: str = 'array', native_xor: bool = False, asymmetric: bool = False,
+                                     constraints = (), congruence_bits: int = None, cutoff: int = None):
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c, arch, native_xor, asymmetric, constraints, congruence_bits, cutoff)
+    return nvars, store(clauses), x_vars, y_vars, out_vars
+
+def stream_commutativity(n: int, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    # A cached template is shifted clause by clause, and otherwise both
+    # multipliers are streamed, so the formula is never held in memory
+    # (templates only hold plain CNF)
+    template = multiplier_templates.get(multiplier_template_key(arch, n, cutoff)) if not native_xor else None
+    def instantiate(offset: int):
+        if template == None: return MULTIPLIERS[arch](n, offset, native_xor=native_xor, **multiplier_options(arch, cutoff))
+        nvars, clauses, x_vars, y_vars, out_vars = template
+        delta = offset - 1
+        shift = lambda vs: [ v + delta for v in vs ]
+        return nvars, len(clauses), clauses.iter_shifted(delta), shift(x_vars), shift(y_vars), shift(out_vars)
 
-def generate_commutativity(n: int):
     # Generate multipliers
     offset = 1
-    nvars1, clauses1, x_vars1, y_vars1, out_vars1 = generate_array_multiplier(n, offset)
+    nvars1, nclauses1, clauses1, x_vars1, y_vars1, out_vars1 = instantiate(offset)
     offset += nvars1
-    nvars2, clauses2, x_vars2, y_vars2, out_vars2 = generate_array_multiplier(n, offset)
+    nvars2, nclauses2, clauses2, x_vars2, y_vars2, out_vars2 = instantiate(offset)
     offset += nvars2
 
-    # Assert that x1 = y2 and x2 = y1
-    clauses = clauses1 + clauses2
-    for i in range(n):
-        clauses += [
-            [ x_vars1[i],-y_vars2[i]], [-x_vars1[i], y_vars2[i]],
-            [ x_vars2[i],-y_vars1[i]], [-x_vars2[i], y_vars1[i]],
-        ]
+    def generate_clauses():
+        yield from clauses1
+        yield from clauses2
 
-    # Define variables to find differences in the output
-    e = offset
-    for i in range(2 * n):
-        # e <=> (o1 <=/=> o2)
-        o1 = out_vars1[i]
-        o2 = out_vars2[i]
-        clauses += [
-            [ e,-o1, o2], [ e, o1,-o2],
-            [-e, o1, o2], [-e,-o1,-o2],
-        ]
-        e += 1
+        # Assert that x1 = y2 and x2 = y1
+        for i in range(n):
+            yield [ x_vars1[i],-y_vars2[i]]
+            yield [-x_vars1[i], y_vars2[i]]
+            yield [ x_vars2[i],-y_vars1[i]]
+            yield [-x_vars2[i], y_vars1[i]]
+
+        # Define variables to find differences in the output
+        for i in range(2 * n):
+            # e <=> (o1 <=/=> o2)
+            e  = offset + i
+            o1 = out_vars1[i]
+            o2 = out_vars2[i]
+            if native_xor:
+                yield generate_native_xor(e, [o1, o2])
+            else:
+                yield [ e,-o1, o2]
+                yield [ e, o1,-o2]
+                yield [-e, o1, o2]
+                yield [-e,-o1,-o2]
 
-    # Assert that the outputs differ somewhere
-    clauses.append([ e for e in range(offset, offset + 2 * n) ])
-    offset = e
+        # Assert that the outputs differ somewhere
+        yield [ e for e in range(offset, offset + 2 * n) ]
 
-    return e, clauses
+    # The reported variable count is one past the last difference variable
+    nclauses = nclauses1 + nclauses2 + (6 if native_xor else 12) * n + 1
+    return offset + 2 * n, nclauses, generate_clauses()
+
+def generate_commutativity(n: int, store = list, arch: str = 'array', native_xor: bool = False, cutoff: int = None):
+    nvars, nclauses, clauses = stream_commutativity(n, arch, native_xor, cutoff)
+    return nvars, store(clauses)
+
+def count_forward_squaring(x: int, native_xor: bool = False):
+    n = max(1, x.bit_length())
+    nvars, nclauses, nliterals = count_squarer(n, native_xor=native_xor)
+    return nvars, nclauses + n, nliterals + n
+
+def stream_forward_squaring(x: int, native_xor: bool = False):
+    n = max(1, x.bit_length())
+
+    # Generate squarer
+    nvars, nclauses, sq_clauses, x_vars, out_vars = stream_squarer(n, native_xor=native_xor)
+
+    # Set input bits
+    def generate_clauses(x: int):
+        yield from sq_clauses
+        for i in range(n):
+            yield [x_vars[i] * (1 if x & 1 == 1 else -1)]
+            x >>= 1
+
+    return nvars, nclauses + n, generate_clauses(x), x_vars, out_vars
+
+def generate_forward_squaring(x: int, store = list, native_xor: bool = False):
+    nvars, nclauses, clauses, x_vars, out_vars = stream_forward_squaring(x, native_xor)
+    return nvars, store(clauses), x_vars, out_vars
+
+def square_root_width(c: int, modulus_bits: int = None) -> int:
+    """
+    Width of the squarer for a square root of c: a root of c has at most
+    ceil(n/2) bits, and a root modulo 2^k can be taken below 2^k
+    """
+    if modulus_bits != None: return max(1, modulus_bits)
+    return max(1, (c.bit_length() + 1) // 2)
+
+def count_backward_squaring(c: int, native_xor: bool = False, modulus_bits: int = None):
+    h = square_root_width(c, modulus_bits)
+    nvars, nclauses, nliterals = count_squarer(h, native_xor=native_xor)
+    npinned = h if modulus_bits != None else 2 * h
+    return nvars, nclauses + npinned, nliterals + npinned
+
+def stream_backward_squaring(c: int, native_xor: bool = False, modulus_bits: int = None):
+    """
+    Square root instance: x^2 = c, which is satisfiable iff c is a perfect
+    square. With modulus_bits = k, x^2 = c (mod 2^k) instead, so only the low
+    k output bits are pinned.
+    """
+    h = square_root_width(c, modulus_bits)
+
+    # Generate squarer
+    nvars, nclauses, sq_clauses, x_vars, out_vars = stream_squarer(h, native_xor=native_xor)
+    pinned = out_vars[:h] if modulus_bits != None else out_vars
+
+    def generate_clauses(c: int):
+        yield from sq_clauses
+
+        # Set output bits (left-padded with zeroes)
+        for o in pinned:
+            yield [o * (1 if c & 1 == 1 else -1)]
+            c >>= 1
+
+    return nvars, nclauses + len(pinned), generate_clauses(c), x_vars, out_vars
+
+def generate_backward_squaring(c: int, store = list, native_xor: bool = False, modulus_bits: int = None):
+    nvars, nclauses, clauses, x_vars, out_vars = stream_backward_squaring(c, native_xor, modulus_bits)
+    return nvars, store(clauses), x_vars, out_vars
 
 def print_cnf(nvars, clauses):
     # Output CNF
     print(f'p cnf {nvars} {len(clauses)}')
     for clause in clauses:
-        print(' '.join(str(lit) for lit in clause) + ' 0')
+        print(('x' if isinstance(clause, XorClause) else '') + ' '.join(str(lit) for lit in clause) + ' 0')
+
+def write_cnf(nvars: int, nclauses: int, clauses, file = sys.stdout, chunk_size: int = 1 << 16):
+    """
+    Output a CNF in one pass from a clause iterator. The header must be known
+    in advance, and clauses are written in chunks rather than one line at a time.
+    XorClauses are written as extended DIMACS 'x' lines, and count as clauses.
+    """
+    file.write(f'p cnf {nvars} {nclauses}\n')
+    count = 0
+    lines = []
+    for clause in clauses:
+        if isinstance(clause, XorClause): lines.append('x' + ' '.join(map(str, clause)) + ' 0\n')
+        else:                             lines.append(' '.join(map(str, clause)) + ' 0\n')
+        if len(lines) >= chunk_size:
+            file.write(''.join(lines))
+            count += len(lines)
+            lines.clear()
+    file.write(''.join(lines))
+    count += len(lines)
+    assert(count == nclauses), f'Header declared {nclauses} clauses, but {count} were written'
+
+def add_native_clauses(solver, clauses):
+    """
+    Add clauses to a solver that accepts native XORs (pycryptosat.Solver):
+    each XorClause becomes one XOR constraint over its variables, with the
+    negations moved into the right-hand side
+    """
+    for clause in clauses:
+        if isinstance(clause, XorClause):
+            rhs = sum(1 for lit in clause if lit < 0) % 2 == 0
+            solver.add_xor_clause([abs(lit) for lit in clause], rhs)
+        else:
+            solver.add_clause(clause)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -225,33 +1061,79 @@ if __name__ == '__main__':
     parser.add_argument('-F', '--factor_bits', type=int)
     parser.add_argument('-c', '--commutativity', type=int)
     parser.add_argument('-x', nargs=2, type=int)
+    parser.add_argument('-q', '--square', type=int, help='square a number with the squarer')
+    parser.add_argument('-r', '--sqrt', type=int, help='find a square root of a number with the squarer')
+    parser.add_argument('--modulus-bits', type=int, help='with -r, find a square root modulo 2^k instead')
+    parser.add_argument('-a', '--arch', choices=MULTIPLIERS.keys(), default='array', help='multiplier architecture')
+    parser.add_argument('--cutoff', type=int, default=KARATSUBA_CUTOFF, help='operand width at which the Karatsuba multiplier falls back to the array multiplier')
+    parser.add_argument('--aig', action='store_true', help='build the multiplier through the AIG (only with -n or -x)')
+    parser.add_argument('--asymmetric', action='store_true', help='factor with an (n-1) x ceil(n/2)-bit multiplier (only with -f or -F, and array or carrysave)')
+    parser.add_argument('--constraints', nargs='+', choices=FACTORING_CONSTRAINTS, default=[], help='side constraints for factoring (only with -f or -F)')
+    parser.add_argument('--congruence-bits', type=int, default=CONGRUENCE_BITS, help='number of low bits covered by the congruence constraint')
+    parser.add_argument('--xor', action='store_true', help='emit the XOR gates as native extended DIMACS \'x\' lines')
+    parser.add_argument('--count', action='store_true', help='only report the instance size')
 
     args = parser.parse_args()
     count = 0
     if args.size          != None: count += 1
-    if args.size          != None: count += 1
+    if args.factor        != None: count += 1
     if args.factor_bits   != None: count += 1
     if args.x             != None: count += 1
     if args.commutativity != None: count += 1
+    if args.square        != None: count += 1
+    if args.sqrt          != None: count += 1
 
     if count > 1:
         parser.error('Please request at most one action')
+    if args.aig and args.size == None and args.x == None:
+        parser.error('--aig is only supported with -n or -x')
+    if args.aig and args.xor:
+        parser.error('--xor is not supported with --aig')
+    if args.asymmetric and args.factor == None and args.factor_bits == None:
+        parser.error('--asymmetric is only supported with -f or -F')
+    if args.modulus_bits != None and args.sqrt == None:
+        parser.error('--modulus-bits is only supported with -r')
+    if args.constraints and args.factor == None and args.factor_bits == None:
+        parser.error('--constraints is only supported with -f or -F')
+    if args.asymmetric and args.arch not in ASYMMETRIC_MULTIPLIERS:
+        parser.error(f'--asymmetric is only supported with {", ".join(ASYMMETRIC_MULTIPLIERS)}')
 
-    if args.size != None:
-        # nvars, clauses, x_vars, y_vars, out_vars = generate_array_multiplier(args.size)
-        nvars, clauses, x_vars, y_vars, out_vars = generate_carrysave_multiplier(args.size)
-        print_cnf(nvars, clauses)
+    if args.aig and args.count and args.size != None:
+        print_size_estimate(*count_aig_multiplier(args.size, args.arch, args.cutoff))
+    elif args.aig:
+        if args.size != None: nvars, clauses, x_vars, y_vars, out_vars = generate_aig_multiplier(args.size, arch=args.arch, cutoff=args.cutoff)
+        else:                 nvars, clauses, x_vars, y_vars, out_vars = generate_forward_multiplication_aig(args.x[0], args.x[1], args.arch, args.cutoff)
+        if args.count: print_size_estimate(nvars, len(clauses), sum(len(clause) for clause in clauses))
+        else:          write_cnf(nvars, len(clauses), clauses)
+    elif args.count:
+        if   args.size          != None: print_size_estimate(*MULTIPLIER_COUNTS[args.arch](args.size, native_xor=args.xor, **multiplier_options(args.arch, args.cutoff)))
+        elif args.factor        != None: print_size_estimate(*count_backward_multiplication(args.factor, args.arch, args.xor, args.asymmetric, args.constraints, args.congruence_bits, args.cutoff))
+        elif args.factor_bits   != None: print_size_estimate(*count_backward_multiplication(2 ** args.factor_bits - 1, args.arch, args.xor, args.asymmetric, args.constraints, args.congruence_bits, args.cutoff))
+        elif args.x             != None: print_size_estimate(*count_forward_multiplication(args.x[0], args.x[1], args.arch, args.xor, args.cutoff))
+        elif args.commutativity != None: print_size_estimate(*count_commutativity(args.commutativity, args.arch, args.xor, args.cutoff))
+        elif args.square        != None: print_size_estimate(*count_forward_squaring(args.square, args.xor))
+        elif args.sqrt          != None: print_size_estimate(*count_backward_squaring(args.sqrt, args.xor, args.modulus_bits))
+        else: parser.error('No action requested')
+    elif args.size != None:
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[args.arch](args.size, native_xor=args.xor, **multiplier_options(args.arch, args.cutoff))
+        write_cnf(nvars, nclauses, clauses)
     elif args.factor != None:
-        nvars, clauses, x_vars, y_vars, out_vars = generate_backward_multiplication(args.factor)
-        print_cnf(nvars, clauses)
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(args.factor, args.arch, args.xor, args.asymmetric, args.constraints, args.congruence_bits, args.cutoff)
+        write_cnf(nvars, nclauses, clauses)
     elif args.factor_bits != None:
-        nvars, clauses, x_vars, y_vars, out_vars = generate_backward_multiplication(sympy.randprime(2**(args.factor_bits-1), 2**(args.factor_bits)))
-        print_cnf(nvars, clauses)
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(sympy.randprime(2**(args.factor_bits-1), 2**(args.factor_bits)), args.arch, args.xor, args.asymmetric, args.constraints, args.congruence_bits, args.cutoff)
+        write_cnf(nvars, nclauses, clauses)
     elif args.x != None:
-        nvars, clauses, x_vars, y_vars, out_vars = generate_forward_multiplication(args.x[0], args.x[1])
-        print_cnf(nvars, clauses)
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_forward_multiplication(args.x[0], args.x[1], args.arch, args.xor, args.cutoff)
+        write_cnf(nvars, nclauses, clauses)
     elif args.commutativity != None:
-        nvars, clauses = generate_commutativity(args.commutativity)
-        print_cnf(nvars, clauses)
+        nvars, nclauses, clauses = stream_commutativity(args.commutativity, args.arch, args.xor, args.cutoff)
+        write_cnf(nvars, nclauses, clauses)
+    elif args.square != None:
+        nvars, nclauses, clauses, x_vars, out_vars = stream_forward_squaring(args.square, args.xor)
+        write_cnf(nvars, nclauses, clauses)
+    elif args.sqrt != None:
+        nvars, nclauses, clauses, x_vars, out_vars = stream_backward_squaring(args.sqrt, args.xor, args.modulus_bits)
+        write_cnf(nvars, nclauses, clauses)
     else:
         parser.error('No action requested')
\ No newline at end of file
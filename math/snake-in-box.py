@@ -1,9 +1,13 @@
+import os
 import sys
 from typing import List
 from pysat.card import IDPool, CNF, CardEnc
 from pysat.formula import *
 from pysat.solvers import Glucose3
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from clause_store import ClauseStore, print_size_estimate
+
 vpool: IDPool = IDPool()
 Lit = int
 Clause = List[Lit]
@@ -61,10 +65,103 @@ def encode_hamming_distance_ge(
     clauses.extend(CardEnc.atleast(eq_lits, distance, vpool=vpool).clauses)
     return clauses
 
-def encode_snake_in_box(hypercube_dimension: int, snake_length: int) -> List[Clause]:
+# Encodings of the snake:
+# 'coordinates' d coordinate bits per vertex, with a Hamming distance
+#               constraint over fresh eq() helpers for every vertex pair
+# 'onehot'      additionally, d one-hot flip variables per step (the
+#               dimension that changes), with vertex d(j+1) = d(j) XOR flips
+# 'log'         as onehot, with the flipped dimension chosen by ceil(log2 d) bits
+SNAKE_ENCODINGS = ['coordinates', 'onehot', 'log']
+
+def encode_xor(z: Lit, a: Lit, b: Lit) -> List[Clause]:
+    """
+    Encodes z <-> a XOR b
+    """
+    return encode_equal(-z, a, b)
+
+def encode_differ(x: Lit, a: Lit, b: Lit) -> List[Clause]:
+    """
+    Encodes x -> (a != b)
+    """
+    return [[-x, +a, +b], [-x, -a, -b]]
+
+def encode_flips(step: int, hypercube_dimension: int, encoding: str) -> List[Clause]:
+    """
+    Encodes that exactly one flip variable t(step, k) is true. With 'log',
+    t(step, k) <-> (the bits b(step, .) of the step hold k), and values of
+    the bits that are not dimensions are excluded.
+    """
+    d = hypercube_dimension
+    flips = [vpool.id(f"t({step},{k})") for k in range(d)]
+    if encoding == 'onehot':
+        return CardEnc.equals(flips, 1, vpool=vpool).clauses
+
+    bits = [vpool.id(f"b({step},{m})") for m in range((d - 1).bit_length())]
+    def value_lits(value: int) -> List[Lit]:
+        return [b if (value >> m) & 1 else -b for m, b in enumerate(bits)]
+
+    clauses: List[Clause] = []
+    for k, t in enumerate(flips):
+        lits = value_lits(k)
+        clauses.extend([-t, lit] for lit in lits)
+        clauses.append([t] + [-lit for lit in lits])
+    clauses.extend([-lit for lit in value_lits(value)] for value in range(d, 1 << len(bits)))
+    return clauses
+
+def encode_snake_transitions(hypercube_dimension: int, snake_length: int, encoding: str, clauses) -> List[Clause]:
+    """
+    Transition encoding of the snake (see SNAKE_ENCODINGS). The vertices
+    v_i and v_j of a segment of the path differ in the parity of the flips in
+    between, whose weight has the parity of j - i. So for j - i even, the
+    snake only needs v_i != v_j (at least one coordinate differs), and for
+    j - i odd, that at least 2 coordinates differ. Short segments are
+    expressed on the flips alone: consecutive flips differ (j - i = 2), and
+    so do flips two steps apart (j - i = 3, where flip i + 1 differs from
+    both). Coordinates of the origin are constant, so segments from v_0
+    need no helpers.
+    """
+    d = hypercube_dimension
+    def coords(i: int) -> List[Lit]:
+        return [vpool.id(f"d({i},{k})") for k in range(d)]
+    def flips(i: int) -> List[Lit]:
+        return [vpool.id(f"t({i},{k})") for k in range(d)]
+
+    # The path follows edges of the hypercube: every step flips exactly one coordinate
+    for i in range(snake_length - 1):
+        clauses.extend(encode_flips(i, d, encoding))
+        for a, b, t in zip(coords(i), coords(i + 1), flips(i)):
+            clauses.extend(encode_xor(b, a, t))
+
+    # Segments of 2 and 3 steps never flip the same dimension at both ends
+    for gap in [1, 2]:
+        for i in range(snake_length - 1 - gap):
+            clauses.extend([-a, -b] for a, b in zip(flips(i), flips(i + gap)))
+
+    # Longer segments: v_i != v_j, or at least 2 differing coordinates for odd lengths
+    for i in range(0, snake_length - 4):
+        for j in range(i + 4, snake_length):
+            if i == 0:
+                differ_lits = coords(j)
+            else:
+                differ_lits = []
+                for a, b in zip(coords(i), coords(j)):
+                    x = vpool.id(f"ne({a},{b})")
+                    differ_lits.append(x)
+                    clauses.extend(encode_differ(x, a, b))
+            if (j - i) % 2 == 0: clauses.append(differ_lits)
+            else:                clauses.extend(CardEnc.atleast(differ_lits, 2, vpool=vpool).clauses)
+
+    # The path starts from the origin
+    clauses.extend([[-vpool.id(f"d(0,{i})")] for i in range(d)])
+    return clauses
+
+def encode_snake_in_box(hypercube_dimension: int, snake_length: int, clauses = None, encoding: str = 'coordinates') -> List[Clause]:
     # The path follows edges of the hypercube
     # i.e. Hamming distance = 1 between vertices adjacent on the path
-    clauses: List[Clause] = []
+    if clauses is None: clauses = []
+    if encoding != 'coordinates':
+        return encode_snake_transitions(hypercube_dimension, snake_length, encoding, clauses)
+
     for i in range(snake_length - 1):
         a = [vpool.id(f"d({i+0},{j})") for j in range(hypercube_dimension)]
         b = [vpool.id(f"d({i+1},{j})") for j in range(hypercube_dimension)]
@@ -81,22 +178,106 @@ def encode_snake_in_box(hypercube_dimension: int, snake_length: int) -> List[Cla
     clauses.extend([[-vpool.id(f"d(0,{i})")] for i in range(hypercube_dimension)])
     return clauses
 
+def count_snake_in_box(hypercube_dimension: int, snake_length: int, encoding: str = 'coordinates'):
+    """
+    Count the variables, clauses and literals of encode_snake_in_box without
+    generating the instance. Every vertex pair produces the same cardinality
+    constraint up to renaming, so each constraint is encoded once on a scratch
+    pool and its size is reused. The variable count matches the header written
+    by print_dimacs for a fresh vpool.
+
+    Returns (nvars, nclauses, nliterals)
+    """
+    d = hypercube_dimension
+    num_adjacent = max(0, snake_length - 1)
+    num_nonadjacent = snake_length * (snake_length - 1) // 2 - num_adjacent
+
+    def card_size(encode, bound: int):
+        if bound > d: return 0, 0, 0
+        pool = IDPool(start_from=d + 1)
+        enc = encode([-(i + 1) for i in range(d)], bound, vpool=pool)
+        return pool.top - d, len(enc.clauses), sum(len(clause) for clause in enc.clauses)
+
+    if encoding != 'coordinates':
+        # Vertices, flips and the XOR chain between consecutive vertices
+        nvars     = d * snake_length + d * num_adjacent
+        nclauses  = 4 * d * num_adjacent
+        nliterals = 12 * d * num_adjacent
+        if encoding == 'onehot':
+            (aux, card_clauses, card_literals) = card_size(CardEnc.equals, 1)
+            nvars     += num_adjacent * aux
+            nclauses  += num_adjacent * card_clauses
+            nliterals += num_adjacent * card_literals
+        else:
+            m = (d - 1).bit_length()
+            nvars     += num_adjacent * m
+            nclauses  += num_adjacent * (d * m + d + (2 ** m - d))
+            nliterals += num_adjacent * (2 * d * m + d * (m + 1) + m * (2 ** m - d))
+
+        # Segments of 2 and 3 steps, and the origin
+        num_short = max(0, snake_length - 2) + max(0, snake_length - 3)
+        nclauses  += d * num_short + d
+        nliterals += 2 * d * num_short + d
+
+        # Longer segments, with differ() helpers unless they start at the origin
+        (aux, card_clauses, card_literals) = card_size(CardEnc.atleast, 2)
+        for gap in range(4, snake_length):
+            count = snake_length - gap
+            nvars     += (count - 1) * d
+            nclauses  += (count - 1) * 2 * d
+            nliterals += (count - 1) * 6 * d
+            if gap % 2 == 0:
+                nclauses  += count
+                nliterals += count * d
+            else:
+                nvars     += count * aux
+                nclauses  += count * card_clauses
+                nliterals += count * card_literals
+
+        # print_dimacs reports one past the next free variable
+        return nvars + 2, nclauses, nliterals
+
+    # Each pair has d eq() helpers (4 clauses of 3 literals each) and one cardinality constraint
+    nvars = d * snake_length
+    nclauses = d
+    nliterals = d
+    for count, (aux, card_clauses, card_literals) in [
+        (num_adjacent,    card_size(CardEnc.equals,  1)),
+        (num_nonadjacent, card_size(CardEnc.atleast, 2)),
+    ]:
+        if count == 0: continue
+        nvars     += count * (d + aux)
+        nclauses  += count * (4 * d + card_clauses)
+        nliterals += count * (12 * d + card_literals)
+
+    # print_dimacs reports one past the next free variable
+    return nvars + 2, nclauses, nliterals
+
 def print_dimacs(clauses: List[Clause], file = sys.stdout) -> None:
+    if isinstance(clauses, ClauseStore):
+        clauses.write_dimacs(vpool._next() + 1, file)
+        return
     print(f"p cnf {vpool._next() + 1} {len(clauses)}", file=file)
     for clause in clauses:
         print(f"{' '.join([str(l) for l in clause])} 0", file=file)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <HYPERCUBE_DIMENSION> <SNAKE_LENGTH>")
+    if len(sys.argv) not in [3, 4, 5]:
+        print(f"Usage: {sys.argv[0]} <HYPERCUBE_DIMENSION> <SNAKE_LENGTH> [COUNT_ONLY?] [ENCODING ({', '.join(SNAKE_ENCODINGS)})]")
         exit(1)
 
     hypercube_dimension = int(sys.argv[1])
     snake_length = int(sys.argv[2]) + 1
+    encoding = sys.argv[4] if len(sys.argv) == 5 else 'coordinates'
 
     assert hypercube_dimension >= 1
     assert 1 <= snake_length
     assert snake_length <= 2 ** hypercube_dimension
+    assert encoding in SNAKE_ENCODINGS
+
+    if len(sys.argv) >= 4 and int(sys.argv[3]) == 1:
+        print_size_estimate(*count_snake_in_box(hypercube_dimension, snake_length, encoding))
+        exit(0)
 
-    clauses = encode_snake_in_box(hypercube_dimension, snake_length)
+    clauses = encode_snake_in_box(hypercube_dimension, snake_length, ClauseStore(), encoding)
     print_dimacs(clauses)
@@ -0,0 +1,240 @@
+import argparse, random, sys, time
+from pysat.solvers import Solver
+from typing import Dict, List
+from aig import AIG, netlist_to_aig
+from gates import tseitin
+from generate_multiplier import NETLISTS, write_cnf
+
+def simulate(kind: str, ins: List[int]) -> int:
+    """
+    Evaluate a gate on bit-parallel input patterns (one pattern per bit).
+    The inputs are nonnegative, so no pattern beyond them is set.
+    """
+    if kind == 'and':  return ins[0] & ins[1]
+    if kind == 'xor':  return ins[0] ^ ins[1]
+    if kind == 'xor3': return ins[0] ^ ins[1] ^ ins[2]
+    if kind == 'maj':  return (ins[0] & ins[1]) | (ins[0] & ins[2]) | (ins[1] & ins[2])
+    assert(False), f'Unknown gate {kind}'
+
+class Sweeper:
+    """
+    SAT sweeping (fraiging) of an AIG: the graph is rebuilt node by node into
+    a fresh AIG, and each new node is merged with an earlier node that has
+    the same value (or its complement) on every random simulation pattern,
+    once an incremental solver proves that they are equivalent.
+
+    Every rebuilt node is Tseitin-encoded in the solver as it is created
+    (node i is variable i + 1), and every proven equivalence is added as two
+    binary clauses. Nodes are swept bottom-up (by level), so by the time a
+    pair is proven, everything below it that could be merged has been, and
+    the proof only needs to look at the nodes between the merged fanins.
+
+    A failed proof yields a counterexample, which is added to the
+    simulation as a new pattern: the classes it separates are split, so
+    the same wrong candidates are not proposed again. Candidates whose proof
+    runs out of conflicts are kept as separate nodes.
+    """
+
+    def __init__(self, num_patterns: int = 1024, conf_budget: int = 1000, solver: str = 'glucose3', seed: int = 0):
+        self.aig = AIG()
+        self.mask = (1 << num_patterns) - 1
+        self.num_patterns = num_patterns
+        self.conf_budget = conf_budget
+        self.random = random.Random(seed)
+
+        self.solver = Solver(name=solver)
+        self.solver.add_clause([-1]) # Node 0 is the constant false
+        self.sim = [0]               # Node -> simulation patterns
+        self.classes = { 0: [AIG.FALSE] } # Canonical patterns -> literals with those patterns
+
+        self.proofs = 0
+        self.merges = 0
+        self.counterexamples = 0
+        self.failures = 0 # Proofs out of conflicts
+
+    def dimacs(self, lit: int) -> int:
+        return ((lit >> 1) + 1) * (-1 if lit & 1 else 1)
+
+    def value(self, lit: int) -> int:
+        return self.sim[lit >> 1] ^ (self.mask if lit & 1 else 0)
+
+    def new_input(self) -> int:
+        lit = self.aig.new_input()
+        self.sim.append(self.random.getrandbits(self.num_patterns))
+        self.classes.setdefault(self.sim[-1], []).append(lit)
+        return lit
+
+    def _sync(self):
+        """
+        Encode and simulate the nodes created since the last call
+        """
+        for node in range(len(self.sim), len(self.aig.nodes)):
+            (kind, *fanins) = self.aig.nodes[node]
+            self.solver.append_formula(tseitin(kind, node + 1, *[self.dimacs(lit) for lit in fanins]))
+            self.sim.append(simulate(kind, [self.value(lit) for lit in fanins]))
+
+    def _refine(self):
+        """
+        Add the solver's model as a new simulation pattern (the highest bit, so
+        that the phase of every node is unchanged), and split the classes
+        """
+        model = self.solver.get_model()
+        bit = 1 << self.num_patterns
+        # Every node is encoded, so the model is a consistent simulation;
+        # inputs the solver has not seen yet are false
+        for node in range(1, min(len(self.sim), len(model))):
+            if model[node] > 0: self.sim[node] |= bit
+        self.num_patterns += 1
+        self.mask |= bit
+
+        classes = {}
+        for lits in self.classes.values():
+            for lit in lits:
+                classes.setdefault(self.value(lit), []).append(lit)
+        self.classes = classes
+
+    def _equivalent(self, a: int, b: int) -> bool:
+        self.proofs += 1
+        da, db = self.dimacs(a), self.dimacs(b)
+        for assumptions in ([da, -db], [-da, db]):
+            self.solver.conf_budget(self.conf_budget)
+            result = self.solver.solve_limited(assumptions=assumptions)
+            if result == None:
+                self.failures += 1
+                return False
+            if result == True:
+                self.counterexamples += 1
+                self._refine()
+                return False
+        self.solver.append_formula([[-da, db], [da, -db]])
+        return True
+
+    def gate(self, kind: str, *fanins: int) -> int:
+        """
+        Rebuild a gate over already swept literals, and merge it into an
+        equivalent earlier literal if there is one
+        """
+        if   kind == 'and':  lit = self.aig.AND(*fanins)
+        elif kind == 'xor':  lit = self.aig.XOR(*fanins)
+        elif kind == 'xor3': lit = self.aig.XOR3(*fanins)
+        elif kind == 'maj':  lit = self.aig.MAJ(*fanins)
+        else: assert(False), f'Unknown gate {kind}'
+        self._sync()
+
+        # Patterns are normalized so that complemented nodes share a class
+        phase = self.value(lit) & 1
+        canonical = lit ^ phase
+        tried = set()
+        while True:
+            # A counterexample splits the classes, so look the class up again
+            candidates = self.classes.setdefault(self.value(canonical), [])
+            if canonical in candidates: return lit
+            untried = [ candidate for candidate in candidates if candidate not in tried ]
+            if len(untried) == 0: break
+            tried.add(untried[0])
+            if self._equivalent(canonical, untried[0]):
+                self.merges += 1
+                return untried[0] ^ phase
+        candidates.append(canonical)
+        return lit
+
+    def sweep(self, aig: AIG, assignment: Dict[int, int], outputs: List[int]) -> List[int]:
+        """
+        Rebuild the cone of the outputs of another AIG
+
+        @param assignment: swept literal for each input node of aig
+        @return swept literal for each output
+        """
+        lits = { 0: AIG.FALSE, **assignment }
+        def lit(l: int) -> int:
+            return lits[l >> 1] ^ (l & 1)
+
+        # Sweep bottom-up: by level, so that both circuits of a miter advance together
+        level = {}
+        for node in aig.cone(outputs):
+            level[node] = 1 + max(level.get(l >> 1, 0) for l in aig.nodes[node][1:])
+        for node in sorted(level, key=level.get):
+            (kind, *fanins) = aig.nodes[node]
+            lits[node] = self.gate(kind, *[lit(l) for l in fanins])
+        return [lit(l) for l in outputs]
+
+    def close(self):
+        self.solver.delete()
+
+def build_miter(n: int, arch1: str = 'array', arch2: str = 'carrysave', swap: bool = False):
+    """
+    Build both n-bit multipliers over the same inputs in one AIG. With swap,
+    the second multiplier computes y * x instead of x * y.
+
+    Returns (aig, x_lits, y_lits, out_lits1, out_lits2)
+    """
+    aig = AIG()
+    x_lits = [ aig.new_input() for _ in range(n) ]
+    y_lits = [ aig.new_input() for _ in range(n) ]
+
+    out_lits = []
+    for arch, (xs, ys) in [(arch1, (x_lits, y_lits)), (arch2, (y_lits, x_lits) if swap else (x_lits, y_lits))]:
+        nvars, gates, x_vars, y_vars, out_vars = NETLISTS[arch](n)
+        lits = netlist_to_aig(aig, gates, dict(zip(x_vars + y_vars, xs + ys)))
+        out_lits.append([ lits[o] for o in out_vars ])
+
+    return aig, x_lits, y_lits, out_lits[0], out_lits[1]
+
+def miter_cnf(aig: AIG, out_lits1: List[int], out_lits2: List[int]):
+    """
+    Encode 'some output differs' over an AIG
+
+    Returns (nvars, clauses)
+    """
+    assert(len(out_lits1) == len(out_lits2))
+    differ = AIG.FALSE
+    for (a, b) in zip(out_lits1, out_lits2):
+        differ = aig.OR(differ, aig.XOR(a, b))
+    nvars, clauses, input_vars, out_vars = aig.to_cnf([differ])
+    return nvars, clauses + [[out_vars[0]]]
+
+def generate_miter(n: int, arch1: str = 'array', arch2: str = 'carrysave', swap: bool = False, sweep: bool = True,
+                   num_patterns: int = 1024, conf_budget: int = 1000, seed: int = 0):
+    """
+    Generate an equivalence instance for two n-bit multipliers, which is
+    UNSAT if and only if they compute the same product. With sweep, the
+    internal equivalences between the two circuits are proven and merged
+    first, so only the part that could not be merged is left to the solver.
+
+    Returns (nvars, clauses, stats)
+    """
+    aig, x_lits, y_lits, out_lits1, out_lits2 = build_miter(n, arch1, arch2, swap)
+    stats = { 'nodes': len(aig.cone(out_lits1 + out_lits2)) }
+    if sweep:
+        sweeper = Sweeper(num_patterns, conf_budget, seed=seed)
+        inputs = { lit >> 1: sweeper.new_input() for lit in x_lits + y_lits }
+        swept = sweeper.sweep(aig, inputs, out_lits1 + out_lits2)
+        sweeper.close()
+        aig, out_lits1, out_lits2 = sweeper.aig, swept[:len(out_lits1)], swept[len(out_lits1):]
+        stats.update({ 'swept nodes': len(aig.cone(swept)), 'proofs': sweeper.proofs, 'merges': sweeper.merges,
+                      'counterexamples': sweeper.counterexamples, 'failures': sweeper.failures })
+    nvars, clauses = miter_cnf(aig, out_lits1, out_lits2)
+    return nvars, clauses, stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog = 'MultiplierMiter',
+        description = "Generates equivalence instances for two multiplier architectures, simplified by SAT sweeping"
+    )
+
+    parser.add_argument('-n', '--size', type=int, required=True)
+    parser.add_argument('arch1', choices=NETLISTS.keys())
+    parser.add_argument('arch2', choices=NETLISTS.keys())
+    parser.add_argument('--swap', action='store_true', help='compare x * y against y * x')
+    parser.add_argument('--no-sweep', action='store_true', help='emit the miter without SAT sweeping')
+    parser.add_argument('--patterns', type=int, default=1024, help='number of random simulation patterns')
+    parser.add_argument('--budget', type=int, default=1000, help='conflict budget of each equivalence proof')
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    nvars, clauses, stats = generate_miter(args.size, args.arch1, args.arch2, args.swap, not args.no_sweep, args.patterns, args.budget, args.seed)
+    for key, value in stats.items():
+        print(f'c {key} {value}')
+    print(f'c built in {time.perf_counter() - start:.3f}s')
+    write_cnf(nvars, len(clauses), clauses)
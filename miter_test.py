@@ -0,0 +1,34 @@
+from pysat.solvers import Glucose3
+from aig import AIG
+from miter import Sweeper, build_miter, generate_miter, miter_cnf
+
+def test_miter():
+    for n in range(1, 6):
+        for (arch1, arch2, swap) in [('array', 'carrysave', False), ('booth', 'karatsuba', False), ('array', 'array', True)]:
+            for sweep in [False, True]:
+                nvars, clauses, stats = generate_miter(n, arch1, arch2, swap, sweep, num_patterns=64)
+                assert not Glucose3(bootstrap_with=clauses).solve(), f"{arch1} != {arch2}"
+
+    # A miter of different circuits must stay satisfiable after sweeping
+    aig, x_lits, y_lits, out_lits1, out_lits2 = build_miter(4, 'array', 'booth')
+    sweeper = Sweeper(64)
+    inputs = { lit >> 1: sweeper.new_input() for lit in x_lits + y_lits }
+    swept = sweeper.sweep(aig, inputs, out_lits1 + out_lits2[:3] + [AIG.NOT(out_lits2[3])] + out_lits2[4:])
+    nvars, clauses = miter_cnf(sweeper.aig, swept[:8], swept[8:])
+    assert Glucose3(bootstrap_with=clauses).solve()
+
+    # Counterexamples split the classes, so even with few patterns the sweep
+    # of the 8-bit x * y vs y * x miter only disproves a few candidates, and it
+    # merges the low product bits into a smaller miter
+    aig, x_lits, y_lits, out_lits1, out_lits2 = build_miter(8, 'array', 'array', swap=True)
+    sweeper = Sweeper(16)
+    inputs = { lit >> 1: sweeper.new_input() for lit in x_lits + y_lits }
+    swept = sweeper.sweep(aig, inputs, out_lits1 + out_lits2)
+    sweeper.close()
+    assert 0 < sweeper.counterexamples and sweeper.proofs < 64
+    assert swept[:5] == swept[16:21]
+    assert len(sweeper.aig.cone(swept)) < len(aig.cone(out_lits1 + out_lits2))
+    assert miter_cnf(sweeper.aig, swept[:16], swept[16:])[0] < miter_cnf(aig, out_lits1, out_lits2)[0]
+
+if __name__ == '__main__':
+    test_miter()
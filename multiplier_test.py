@@ -1,11 +1,12 @@
-import sys
+import io, pytest, sys, sympy
 from pysat.solvers import Glucose3
 from generate_multiplier import *
+from batch_factor import CryptoMiniSat, FactoringService
 
 def test_multiplication():
-    def test(x: int, y: int):
+    def test(x: int, y: int, arch: str):
         # Generate instance
-        nvars, clauses, x_vars, y_vars, out_vars = generate_forward_multiplication(x, y)
+        nvars, clauses, x_vars, y_vars, out_vars = generate_forward_multiplication(x, y, arch=arch)
         g = Glucose3()
         for clause in clauses:
             g.add_clause(clause)
@@ -21,14 +22,15 @@ def test_multiplication():
         expected = x * y
         assert result == expected, f"Expected: {x} * {y} = {expected}; Received: {result}"
 
-    for x in range(0, 31):
-        for y in range(0, 31):
-            test(x, y)
+    for arch in MULTIPLIERS:
+        for x in range(0, 31):
+            for y in range(0, 31):
+                test(x, y, arch)
 
 def test_factoring():
-    def test(c: int):
+    def test(c: int, arch: str, asymmetric: bool = False):
         # Generate instance
-        nvars, clauses, x_vars, y_vars, out_vars = generate_backward_multiplication(c)
+        nvars, clauses, x_vars, y_vars, out_vars = generate_backward_multiplication(c, arch=arch, asymmetric=asymmetric)
         g = Glucose3()
         for clause in clauses:
             g.add_clause(clause)
@@ -48,20 +50,81 @@ def test_factoring():
         else:
             return None
 
-    assert test(1)  == None
-    assert test(2)  == None
-    assert test(3)  == None
-    assert test(5)  == None
-    assert test(8)  == (2, 4)
-    assert test(13) == None
-    assert test(21) == (3, 7)
-    assert test(44) != None
-    assert test(65) == (5, 13)
+    for arch in MULTIPLIERS:
+        assert test(1,  arch) == None
+        assert test(2,  arch) == None
+        assert test(3,  arch) == None
+        assert test(5,  arch) == None
+        assert test(8,  arch) == (2, 4)
+        assert test(13, arch) == None
+        assert test(21, arch) == (3, 7)
+        assert test(44, arch) != None
+        assert test(65, arch) == (5, 13)
+
+    for arch in ASYMMETRIC_MULTIPLIERS:
+        for c in range(1, 150):
+            factors = test(c, arch, asymmetric=True)
+            if c < 4 or sympy.isprime(c): assert factors == None
+            else: assert factors[0] * factors[1] == c and factors[0] != 1
+
+def test_factoring_constraints():
+    subsets = [[name] for name in FACTORING_CONSTRAINTS] + [FACTORING_CONSTRAINTS]
+    for asymmetric in [False, True]:
+        for constraints in subsets:
+            for c in range(1, 100):
+                nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c, 'carrysave', asymmetric=asymmetric, constraints=constraints)
+                clauses = list(clauses)
+                assert (nvars, nclauses, sum(len(clause) for clause in clauses)) == count_backward_multiplication(c, 'carrysave', asymmetric=asymmetric, constraints=constraints)
+
+                # The constraints must keep exactly the composites satisfiable
+                g = Glucose3(bootstrap_with=clauses)
+                assert g.solve() == (c >= 4 and not sympy.isprime(c)), f"{constraints}: factoring {c}"
+                if c >= 4 and not sympy.isprime(c):
+                    model = g.get_model()
+                    x = sum(1 << i for i, v in enumerate(x_vars) if model[v - 1] > 0)
+                    y = sum(1 << i for i, v in enumerate(y_vars) if model[v - 1] > 0)
+                    assert x * y == c
+                    if 'order' in constraints: assert (y <= x) if asymmetric else (x <= y)
+                g.delete()
+
+def test_squaring():
+    def value(model, vs):
+        return sum(1 << i for i, v in enumerate(vs) if model[v - 1] > 0)
+
+    # Forward squaring
+    for x in range(0, 64):
+        nvars, nclauses, clauses, x_vars, out_vars = stream_forward_squaring(x)
+        clauses = list(clauses)
+        assert (nvars, nclauses, sum(len(clause) for clause in clauses)) == count_forward_squaring(x)
+        g = Glucose3(bootstrap_with=clauses)
+        assert g.solve()
+        assert value(g.get_model(), out_vars) == x * x
+        g.delete()
+
+    # Square roots: satisfiable exactly for perfect squares
+    for c in range(0, 150):
+        nvars, nclauses, clauses, x_vars, out_vars = stream_backward_squaring(c)
+        clauses = list(clauses)
+        assert (nvars, nclauses, sum(len(clause) for clause in clauses)) == count_backward_squaring(c)
+        g = Glucose3(bootstrap_with=clauses)
+        assert g.solve() == (sympy.sqrt(c).is_integer), f"square root of {c}"
+        if sympy.sqrt(c).is_integer: assert value(g.get_model(), x_vars) ** 2 == c
+        g.delete()
+
+    # Square roots modulo 2^k
+    for k in range(1, 6):
+        for c in range(0, 1 << k):
+            nvars, clauses, x_vars, out_vars = generate_backward_squaring(c, modulus_bits=k)
+            g = Glucose3(bootstrap_with=clauses)
+            roots = [ x for x in range(1 << k) if x * x % (1 << k) == c ]
+            assert g.solve() == (len(roots) > 0), f"square root of {c} mod 2^{k}"
+            if roots: assert value(g.get_model(), x_vars) in roots
+            g.delete()
 
 def test_commutativity():
-    def test(n: int):
+    def test(n: int, arch: str):
         # Generate instance
-        nvars, clauses = generate_commutativity(n)
+        nvars, clauses = generate_commutativity(n, arch=arch)
         g = Glucose3()
         for clause in clauses:
             g.add_clause(clause)
@@ -69,12 +132,222 @@ def test_commutativity():
         # Must be commutative
         assert not g.solve()
     
-    test(1)
-    test(2)
-    test(3)
-    test(4)
+    for arch in MULTIPLIERS:
+        test(1, arch)
+        test(2, arch)
+        test(3, arch)
+        test(4, arch)
+
+def bits_to_literals(vs, value: int):
+    return [v if (value >> i) & 1 else -v for i, v in enumerate(vs)]
+
+def verify_multiplier(n: int, arch: str = 'array'):
+    """
+    Exhaustively check an n-bit multiplier with a single incremental solver:
+    for every (x, y), the input bits and the expected product bits are passed
+    as assumptions, which must be satisfiable. Every gate is functional, so
+    the product bits are forced by the inputs.
+    """
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n)
+    g = Glucose3(bootstrap_with=clauses)
+    for x in range(2 ** n):
+        x_lits = bits_to_literals(x_vars, x)
+        for y in range(2 ** n):
+            assumptions = x_lits + bits_to_literals(y_vars, y) + bits_to_literals(out_vars, x * y)
+            assert g.solve(assumptions=assumptions), f"{arch}: {x} * {y} != {x * y}"
+    g.delete()
+
+def verify_factoring(n: int, arch: str = 'array'):
+    """
+    Exhaustively check factoring of every c < 2^n with a single incremental
+    solver, by passing the bits of c as assumptions on the product bits
+    """
+    nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n)
+    g = Glucose3(bootstrap_with=clauses)
+
+    # Assert that inputs are not equal to 1
+    g.add_clause(x_vars[1:] + [-x_vars[0]])
+    g.add_clause(y_vars[1:] + [-y_vars[0]])
+
+    for c in range(2 ** n):
+        sat = g.solve(assumptions=bits_to_literals(out_vars, c))
+        assert sat == (c == 0 or (c > 1 and not sympy.isprime(c))), f"{arch}: factoring {c}"
+        if sat:
+            model = g.get_model()
+            x = sum(1 << i for i, v in enumerate(x_vars) if model[v - 1] > 0)
+            y = sum(1 << i for i, v in enumerate(y_vars) if model[v - 1] > 0)
+            assert x * y == c and x != 1 and y != 1, f"{arch}: {x} * {y} != {c}"
+    g.delete()
+
+def test_multiplication_incremental():
+    for arch in MULTIPLIERS:
+        verify_multiplier(7, arch)
+
+def test_factoring_incremental():
+    for arch in MULTIPLIERS:
+        verify_factoring(6, arch)
+
+def test_aig():
+    for arch in NETLISTS:
+        for n in range(1, 6):
+            # Free operands
+            nvars, clauses, x_vars, y_vars, out_vars = generate_aig_multiplier(n, arch=arch)
+            g = Glucose3(bootstrap_with=clauses)
+            for x in range(2 ** n):
+                for y in range(2 ** n):
+                    assumptions = bits_to_literals(x_vars, x) + bits_to_literals(y_vars, y) + bits_to_literals(out_vars, x * y)
+                    assert g.solve(assumptions=assumptions), f"{arch}: {x} * {y} != {x * y}"
+            g.delete()
+
+        # Known operands fold down to the constant product
+        for (x, y) in [(0, 0), (1, 7), (13, 11), (40000, 12345)]:
+            nvars, clauses, x_vars, y_vars, out_vars = generate_forward_multiplication_aig(x, y, arch)
+            assert all(len(clause) == 1 for clause in clauses)
+            g = Glucose3(bootstrap_with=clauses)
+            assert g.solve()
+            model = g.get_model()
+            result = sum(1 << i for i, o in enumerate(out_vars) if model[o - 1] > 0)
+            assert result == x * y, f"Expected: {x} * {y} = {x * y}; Received: {result}"
+
+def test_karatsuba():
+    def test(x: int, y: int, n: int, cutoff: int):
+        # Generate instance with recursion all the way down
+        nvars, clauses, x_vars, y_vars, out_vars = generate_karatsuba_multiplier(n, cutoff=cutoff)
+        g = Glucose3()
+        for clause in clauses:
+            g.add_clause(clause)
+
+        # Perform multiplication by sat solving
+        assert g.solve(assumptions=bits_to_literals(x_vars, x) + bits_to_literals(y_vars, y))
+        model = g.get_model()
+        result = 0
+        for i, o in enumerate(out_vars):
+            result |= (1 << i) if model[o - 1] > 0 else 0
+
+        expected = x * y
+        assert result == expected, f"Expected: {x} * {y} = {expected}; Received: {result}"
+
+    for n in range(4, 10):
+        for x in [0, 1, 2 ** n - 1, 0b1011 << (n - 4), 0b1101]:
+            for y in [0, 1, 2 ** n - 1, 0b0111 << (n - 4), 0b1001]:
+                test(x, y, n, 1)
+
+    # The cutoff is passed through the generic entry points
+    for cutoff in [1, 4, 8]:
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_forward_multiplication(1000, 2000, 'karatsuba', cutoff=cutoff)
+        clauses = list(clauses)
+        assert len(clauses) == nclauses
+        assert count_forward_multiplication(1000, 2000, 'karatsuba', cutoff=cutoff) == (nvars, nclauses, sum(len(clause) for clause in clauses))
+    assert count_forward_multiplication(1000, 2000, 'karatsuba', cutoff=1) != count_forward_multiplication(1000, 2000, 'karatsuba', cutoff=8)
+
+def test_templates():
+    for arch in MULTIPLIERS:
+        for n in range(1, 6):
+            for offset in [1, 2, 100]:
+                nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n, offset)
+                nvars2, store, x_vars2, y_vars2, out_vars2 = instantiate_multiplier(n, offset, arch)
+                assert nvars2 == nvars
+                assert list(store) == list(clauses)
+                assert (x_vars2, y_vars2, out_vars2) == (x_vars, y_vars, out_vars)
+
+    # Each Karatsuba cutoff gets its own template
+    for cutoff in [1, 4, 8]:
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_karatsuba_multiplier(12, 5, cutoff)
+        nvars2, store, x_vars2, y_vars2, out_vars2 = instantiate_multiplier(12, 5, 'karatsuba', cutoff)
+        assert nvars2 == nvars
+        assert list(store) == list(clauses)
+
+    # Commutativity streams the multipliers unless their template is cached,
+    # and the output is the same either way
+    multiplier_templates.clear()
+    nvars, nclauses, clauses = stream_commutativity(6, 'carrysave')
+    assert len(multiplier_templates) == 0
+    instantiate_multiplier(6, 1, 'carrysave')
+    nvars2, nclauses2, clauses2 = stream_commutativity(6, 'carrysave')
+    assert (nvars2, nclauses2) == (nvars, nclauses)
+    assert list(clauses2) == list(clauses)
+
+def test_array_netlist():
+    # The netlist must encode exactly the clauses of the streamed array multiplier
+    for n in range(1, 9):
+        for offset in [1, 7]:
+            nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_array_multiplier(n, offset)
+            nvars2, gates, x_vars2, y_vars2, out_vars2 = build_array_multiplier(n, offset)
+            assert nvars2 == nvars
+            assert list(stream_netlist(gates)) == list(clauses)
+            assert (x_vars2, y_vars2, out_vars2) == (x_vars, y_vars, out_vars)
+
+def test_stream_header():
+    def test(nvars: int, nclauses: int, clauses, counts):
+        clauses = list(clauses)
+        assert len(clauses) == nclauses
+        assert max(abs(lit) for clause in clauses for lit in clause) <= nvars
+        assert counts == (nvars, nclauses, sum(len(clause) for clause in clauses))
+
+    for n in range(1, 8):
+        for arch in MULTIPLIERS:
+            nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n)
+            test(nvars, nclauses, clauses, MULTIPLIER_COUNTS[arch](n))
+        nvars, nclauses, clauses = stream_commutativity(n)
+        test(nvars, nclauses, clauses, count_commutativity(n))
+        nvars, nclauses, clauses = stream_commutativity(n, 'booth', native_xor=True)
+        test(nvars, nclauses, clauses, count_commutativity(n, 'booth', native_xor=True))
+    for c in range(1, 70):
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c)
+        test(nvars, nclauses, clauses, count_backward_multiplication(c))
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_forward_multiplication(c, 70 - c)
+        test(nvars, nclauses, clauses, count_forward_multiplication(c, 70 - c))
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c, native_xor=True)
+        test(nvars, nclauses, clauses, count_backward_multiplication(c, native_xor=True))
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = stream_backward_multiplication(c, 'carrysave', asymmetric=True)
+        test(nvars, nclauses, clauses, count_backward_multiplication(c, 'carrysave', asymmetric=True))
+
+def test_native_xor():
+    pytest.importorskip('pycryptosat')
+    for arch in MULTIPLIERS:
+        n = 4
+        nvars, nclauses, clauses, x_vars, y_vars, out_vars = MULTIPLIERS[arch](n, native_xor=True)
+        clauses = list(clauses)
+        assert any(isinstance(clause, XorClause) for clause in clauses)
+
+        # The extended DIMACS output has one 'x' line per XorClause
+        received = io.StringIO()
+        write_cnf(nvars, nclauses, clauses, received)
+        assert received.getvalue().count('\nx') == sum(isinstance(clause, XorClause) for clause in clauses)
+
+        s = CryptoMiniSat(bootstrap_with=clauses)
+        for x in range(2 ** n):
+            for y in range(2 ** n):
+                assumptions = bits_to_literals(x_vars, x) + bits_to_literals(y_vars, y) + bits_to_literals(out_vars, x * y)
+                assert s.solve(assumptions=assumptions), f"{arch}: {x} * {y} != {x * y}"
+        s.delete()
+
+        nvars, clauses = generate_commutativity(3, arch=arch, native_xor=True)
+        assert not CryptoMiniSat(bootstrap_with=clauses).solve()
+
+    service = FactoringService(7, 'carrysave', 'cryptominisat', native_xor=True)
+    results = { c: factors for c, factors, seconds in service.factor_all([21, 65, 127]) }
+    service.close()
+    assert results == { 21: (3, 7), 65: (5, 13), 127: None }
 
 if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        # Exhaustively check one architecture at a given operand width
+        for arch in ([sys.argv[2]] if sys.argv[2] != 'all' else MULTIPLIERS):
+            verify_multiplier(int(sys.argv[1]), arch)
+            verify_factoring(int(sys.argv[1]), arch)
+        exit()
+
     test_multiplication()
     test_factoring()
-    test_commutativity()
\ No newline at end of file
+    test_factoring_constraints()
+    test_squaring()
+    test_commutativity()
+    test_multiplication_incremental()
+    test_factoring_incremental()
+    test_aig()
+    test_karatsuba()
+    test_templates()
+    test_array_netlist()
+    test_stream_header()
+    test_native_xor()
\ No newline at end of file
@@ -0,0 +1,156 @@
+import argparse, time
+import numpy as np
+from typing import Dict, List
+from generate_multiplier import NETLISTS, build_squarer
+
+# Word with every lane set
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# Bit i of the lane index, for the 64 lanes of a word (i < 6)
+LANE_PATTERNS = [
+    np.uint64(0xAAAAAAAAAAAAAAAA),
+    np.uint64(0xCCCCCCCCCCCCCCCC),
+    np.uint64(0xF0F0F0F0F0F0F0F0),
+    np.uint64(0xFF00FF00FF00FF00),
+    np.uint64(0xFFFF0000FFFF0000),
+    np.uint64(0xFFFFFFFF00000000),
+]
+
+def simulate_netlist(gates, values: Dict[int, np.ndarray]) -> Dict[int, np.ndarray]:
+    """
+    Evaluate a gate netlist (see generate_multiplier) on many input vectors
+    at once. Each signal is an array of uint64 words holding one input vector
+    per bit (lane), so every gate costs one or a few NumPy word operations.
+
+    @param values: words of each netlist input variable
+    @return words of every netlist variable
+    """
+    values = dict(values)
+    num_words = len(next(iter(values.values())))
+    def value(lit: int) -> np.ndarray:
+        return values[lit] if lit > 0 else ~values[-lit]
+
+    for (kind, out, *ins) in gates:
+        if kind == 'and':
+            values[out] = value(ins[0]) & value(ins[1])
+        elif kind == 'xor':
+            values[out] = value(ins[0]) ^ value(ins[1])
+        elif kind == 'xor3':
+            values[out] = value(ins[0]) ^ value(ins[1]) ^ value(ins[2])
+        elif kind == 'maj':
+            (a, b, c) = (value(ins[0]), value(ins[1]), value(ins[2]))
+            values[out] = (a & b) | (c & (a | b))
+        elif kind == 'zero':
+            values[out] = np.zeros(num_words, dtype=np.uint64)
+        else:
+            assert(False), f'Unknown gate {kind}'
+    return values
+
+def counter_words(bits: int, start_word: int, num_words: int) -> List[np.ndarray]:
+    """
+    Words enumerating consecutive input vectors: lane t of word w holds
+    vector number 64 * (start_word + w) + t, and the result has the words of
+    each of its lowest bits
+    """
+    words = np.arange(start_word, start_word + num_words, dtype=np.uint64)
+    patterns = []
+    for i in range(bits):
+        if i < len(LANE_PATTERNS): patterns.append(np.full(num_words, LANE_PATTERNS[i], dtype=np.uint64))
+        else:                      patterns.append(np.where((words >> np.uint64(i - 6)) & np.uint64(1), ONES, np.uint64(0)))
+    return patterns
+
+def lane_values(words: List[np.ndarray]) -> np.ndarray:
+    """
+    Get the number held in each lane by bit-sliced words (lowest bit first),
+    as uint64 if it fits and as Python ints otherwise
+    """
+    dtype = np.uint64 if len(words) <= 64 else object
+    result = None
+    for i, w in enumerate(words):
+        bits = np.unpackbits(w.astype('<u8').view(np.uint8), bitorder='little').astype(dtype)
+        term = bits << (np.uint64(i) if dtype == np.uint64 else i)
+        result = term if result is None else result | term
+    return result
+
+def check_netlist(gates, operands: List[List[int]], out_vars: List[int], function, samples: int = None,
+                  block_words: int = 1 << 12, seed: int = 0) -> int:
+    """
+    Check that a netlist computes function(*operands) on every input vector
+    (or on random ones if samples is given), block_words * 64 vectors at a time.
+    Raises an AssertionError with a counterexample otherwise.
+
+    @param operands: input variables of each operand, lowest bit first
+    @param function: reference, applied to arrays of operand values (uint64,
+                     or Python ints if the outputs are wider than 64 bits)
+    @return number of vectors checked
+    """
+    input_vars = [ v for vs in operands for v in vs ]
+    wide = len(out_vars) > 64
+    if samples == None: total_words = max(1, (1 << len(input_vars)) // 64)
+    else:               total_words = max(1, -(-samples // 64))
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, total_words, block_words):
+        num_words = min(block_words, total_words - start)
+        if samples == None: inputs = counter_words(len(input_vars), start, num_words)
+        else:               inputs = [ rng.integers(0, 1 << 64, num_words, dtype=np.uint64, endpoint=False) for _ in input_vars ]
+        values = simulate_netlist(gates, dict(zip(input_vars, inputs)))
+
+        args = []
+        for vs in operands:
+            args.append(lane_values(inputs[:len(vs)]))
+            inputs = inputs[len(vs):]
+            if wide: args[-1] = args[-1].astype(object)
+        expected = function(*args)
+        received = lane_values([ values[o] if o > 0 else ~values[-o] for o in out_vars ])
+        if wide: received = received.astype(object)
+
+        wrong = np.nonzero(expected != received)[0]
+        assert len(wrong) == 0, f'{function.__name__}{tuple(int(a[wrong[0]]) for a in args)} = {expected[wrong[0]]}, received {received[wrong[0]]}'
+    return total_words * 64
+
+def product(x, y):
+    return x * y
+
+def square(x):
+    return x * x
+
+def check_multiplier_netlist(gates, x_vars: List[int], y_vars: List[int], out_vars: List[int], samples: int = None,
+                             block_words: int = 1 << 12, seed: int = 0) -> int:
+    """
+    Check that a multiplier netlist computes x * y (see check_netlist)
+    """
+    return check_netlist(gates, [x_vars, y_vars], out_vars, product, samples, block_words, seed)
+
+def check_multiplier(n: int, arch: str = 'array', samples: int = None, seed: int = 0) -> int:
+    """
+    Check the netlist of an n-bit multiplier of the given architecture
+    exhaustively (all 2^(2n) input pairs), or on random input pairs
+    """
+    nvars, gates, x_vars, y_vars, out_vars = NETLISTS[arch](n)
+    return check_multiplier_netlist(gates, x_vars, y_vars, out_vars, samples, seed=seed)
+
+def check_squarer(n: int, samples: int = None, seed: int = 0) -> int:
+    """
+    Check the netlist of an n-bit squarer exhaustively, or on random inputs
+    """
+    nvars, gates, x_vars, out_vars = build_squarer(n)
+    return check_netlist(gates, [x_vars], out_vars, square, samples, seed=seed)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog = 'MultiplierSimulator',
+        description = "Checks multiplier netlists by bit-parallel simulation"
+    )
+
+    parser.add_argument('-n', '--size', type=int, required=True)
+    parser.add_argument('-a', '--arch', choices=list(NETLISTS.keys()) + ['squarer', 'all'], default='all', help='multiplier architecture, or the squarer')
+    parser.add_argument('-s', '--samples', type=int, help='check this many random input pairs instead of all of them')
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    for arch in (list(NETLISTS) + ['squarer'] if args.arch == 'all' else [args.arch]):
+        start = time.perf_counter()
+        if arch == 'squarer': count = check_squarer(args.size, args.samples, args.seed)
+        else:                 count = check_multiplier(args.size, arch, args.samples, args.seed)
+        print(f'{arch}: {count} vectors OK in {time.perf_counter() - start:.3f}s')
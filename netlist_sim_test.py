@@ -0,0 +1,34 @@
+from generate_multiplier import NETLISTS, build_asymmetric_multiplier
+from netlist_sim import check_multiplier, check_multiplier_netlist, check_squarer
+
+def test_exhaustive():
+    for arch in NETLISTS:
+        for n in range(1, 9):
+            assert check_multiplier(n, arch) >= 2 ** (2 * n)
+
+def test_sampled():
+    for arch in NETLISTS:
+        check_multiplier(40, arch, samples=1000)
+
+def test_squarer():
+    for n in range(1, 13):
+        check_squarer(n)
+    check_squarer(70, samples=1000)
+
+def test_asymmetric():
+    for (m, k) in [(1, 1), (5, 3), (8, 4), (3, 7)]:
+        for arch in ['array', 'carrysave']:
+            nvars, gates, x_vars, y_vars, out_vars = build_asymmetric_multiplier(m, k, arch=arch)
+            check_multiplier_netlist(gates, x_vars, y_vars, out_vars)
+
+def test_detects_errors():
+    nvars, gates, x_vars, y_vars, out_vars = NETLISTS['carrysave'](6)
+    for i, gate in enumerate(gates):
+        if gate[0] == 'maj':
+            # A full adder whose carry is the XOR of two of its inputs
+            broken = gates[:i] + [('xor', gate[1], gate[2], gate[3])] + gates[i + 1:]
+            try:
+                check_multiplier_netlist(broken, x_vars, y_vars, out_vars)
+            except AssertionError:
+                return
+    assert False, 'No error detected'
@@ -0,0 +1,160 @@
+import io
+from generate_PHP import *
+from clause_store import write_binary_drat
+
+def test_numpy_backend():
+    def test(numPigeons: int, numHoles: int, functional: int, extensionMode: int, encoding: str = 'pairwise', symmetryBreaking: int = 0):
+        # Generate instance with both backends
+        (numVars, clauses, extLevels) = PigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, ClauseStore(), encoding, encoding, symmetryBreaking)
+        expected = io.StringIO()
+        clauses.write_dimacs(numVars, expected)
+
+        received = io.StringIO()
+        (numVars2, extLevels2) = writePigeonholePrinciple(numPigeons, numHoles, functional, extensionMode, received, encoding, encoding, symmetryBreaking)
+
+        # Output must be identical
+        assert numVars2 == numVars
+        assert received.getvalue() == expected.getvalue()
+        assert extLevels2.tolist() == extLevels
+
+    for numHoles in range(1, 7):
+        for functional in range(2):
+            for extensionMode in range(3):
+                test(numHoles + 1, numHoles, functional, extensionMode)
+                test(numHoles, numHoles, functional, extensionMode)
+                test(numHoles + 1, numHoles, functional, extensionMode, 'commander')
+                test(numHoles + 1, numHoles, functional, extensionMode, 'sequential', 3)
+
+def test_count():
+    for numHoles in range(1, 7):
+        for numPigeons in [numHoles - 1, numHoles, numHoles + 1]:
+            for functional in range(2):
+                for extensionMode in range(3):
+                    (numVars, clauses, extLevels) = PigeonholePrinciple(max(1, numPigeons), numHoles, functional, extensionMode)
+                    numLiterals = sum(len(clause) for clause in clauses)
+                    assert countPigeonholePrinciple(max(1, numPigeons), numHoles, functional, extensionMode) == (numVars, len(clauses), numLiterals)
+
+def propagatesToConflict(clauses, assignment) -> bool:
+    """
+    Unit propagate a set of literals over clauses, and report whether a clause is falsified
+    """
+    assignment = set(assignment)
+    changed = True
+    while changed:
+        changed = False
+        for clause in clauses:
+            if any(lit in assignment for lit in clause): continue
+            unassigned = [ lit for lit in clause if -lit not in assignment ]
+            if len(unassigned) == 0: return True
+            if len(unassigned) == 1:
+                assignment.add(unassigned[0])
+                changed = True
+    return False
+
+def checkDRAT(clauses, steps) -> bool:
+    """
+    Forward DRAT check: every added clause must be RUP or RAT on its first literal
+    """
+    active = { tuple(sorted(clause)): 1 for clause in clauses }
+    for (kind, clause) in steps:
+        key = tuple(sorted(clause))
+        if kind == 'd':
+            active[key] -= 1
+            if active[key] == 0: del active[key]
+            continue
+        if not propagatesToConflict(active, [-lit for lit in clause]):
+            pivot = clause[0]
+            for other in [ other for other in active if -pivot in other ]:
+                resolvent = set(clause) | (set(other) - { -pivot })
+                if any(-lit in resolvent for lit in resolvent): continue
+                assert propagatesToConflict(active, [-lit for lit in resolvent]), f"{clause} is neither RUP nor RAT"
+        if len(clause) == 0: return True
+        active[key] = active.get(key, 0) + 1
+    return False
+
+def test_proof():
+    for numHoles in range(1, 6):
+        for numPigeons in [numHoles + 1, numHoles + 2]:
+            for functional in range(2):
+                for extensionMode in range(3):
+                    (numVars, clauses, extLevels) = PigeonholePrinciple(numPigeons, numHoles, functional, extensionMode)
+                    assert checkDRAT(clauses, PigeonholeProof(numPigeons, numHoles, extensionMode))
+
+    # The proof only relies on the propagation of the hole constraints
+    for encoding in ['sequential', 'product', 'binary']:
+        for extensionMode in range(3):
+            (numVars, clauses, extLevels) = PigeonholePrinciple(6, 5, False, extensionMode, None, encoding)
+            numAuxVars = numVars - countPigeonholePrinciple(6, 5, False, extensionMode)[0]
+            assert checkDRAT(clauses, PigeonholeProof(6, 5, extensionMode, numAuxVars))
+
+    # Symmetry breaking clauses and their auxiliary variables
+    (numVars, clauses, extLevels) = PigeonholePrinciple(5, 4, False, 0, None, 'sequential', 'pairwise', 3)
+    assert checkDRAT(clauses, PigeonholeProof(5, 4, 0, numVars - 5 * 4))
+
+    # Binary encoding
+    proof = io.BytesIO()
+    writePigeonholeProof(3, 2, 0, proof)
+    assert proof.getvalue()[:4] == bytes([ord('a'), 2 * 7, 2 * 1 + 1, 0])
+    assert proof.getvalue()[-2:] == bytes([ord('a'), 0])
+
+    # Literals over 63 take several bytes
+    proof = io.BytesIO()
+    write_binary_drat([('d', [-64, 8192])], 8192, proof)
+    assert proof.getvalue() == bytes([ord('d'), 0x81, 0x01, 0x80, 0x80, 0x01, 0])
+
+def test_ext_levels(tmp_path):
+    for numHoles in range(1, 7):
+        for extensionMode in range(3):
+            (numVars, clauses, extLevels) = PigeonholePrinciple(numHoles + 1, numHoles, False, extensionMode)
+
+            # Runs expand back to the levels
+            runs = extLevelRuns(extLevels)
+            assert len(runs) <= 1 + 2 * (numHoles - 1)
+            assert [ lvl for (first, last, lvl) in runs for _ in range(first, last + 1) ] == extLevels
+
+            # Binary side-file
+            path = str(tmp_path / 'levels.bin')
+            writeExtLvlFile(extLevels, path)
+            assert list(loadExtLvlFile(path)) == extLevels
+
+    # Levels that do not fit in 16 bits
+    path = str(tmp_path / 'wide.bin')
+    writeExtLvlFile([0, 1, 70000], path)
+    levels = loadExtLvlFile(path)
+    assert levels.dtype.itemsize == 4 and list(levels) == [0, 1, 70000]
+
+def test_symmetry_breaking():
+    from pysat.solvers import Glucose3
+    for symmetryBreaking in range(1, len(SYMMETRY_BREAKING_MODES)):
+        for numHoles in range(1, 6):
+            for numPigeons in [numHoles - 1, numHoles, numHoles + 1]:
+                for functional in range(2):
+                    args = (max(1, numPigeons), numHoles, functional, 1, None, 'pairwise', 'pairwise', symmetryBreaking)
+                    (numVars, clauses, extLevels) = PigeonholePrinciple(*args)
+                    (plainVars, plainClauses, plainLiterals) = countPigeonholePrinciple(*args[:4])
+                    assert countPigeonholePrinciple(*args[:4], 'pairwise', 'pairwise', symmetryBreaking) == (numVars, len(clauses), sum(len(clause) for clause in clauses))
+                    assert countSymmetryBreaking(max(1, numPigeons), numHoles, symmetryBreaking) == (numVars - plainVars, len(clauses) - plainClauses, sum(len(clause) for clause in clauses[plainClauses:]))
+
+                    # Symmetry breaking must preserve satisfiability
+                    with Glucose3(bootstrap_with=clauses) as g:
+                        assert g.solve() == (max(1, numPigeons) <= numHoles)
+
+    # Double-lex leaves a single solution of functional PHP(n, n): the identity
+    for n in range(1, 5):
+        (numVars, clauses, extLevels) = PigeonholePrinciple(n, n, True, 0, None, 'pairwise', 'pairwise', 3)
+        with Glucose3(bootstrap_with=clauses) as g:
+            solutions = 0
+            while g.solve():
+                model = g.get_model()[:n * n]
+                assert [ lit > 0 for lit in model ] == [ pigeon == hole for pigeon in range(n) for hole in range(n) ]
+                g.add_clause([ -lit for lit in model ])
+                solutions += 1
+            assert solutions == 1
+
+if __name__ == '__main__':
+    test_numpy_backend()
+    test_count()
+    test_proof()
+    test_symmetry_breaking()
+    import pathlib, tempfile
+    with tempfile.TemporaryDirectory() as tmp: test_ext_levels(pathlib.Path(tmp))
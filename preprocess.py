@@ -0,0 +1,234 @@
+import argparse, sys
+from typing import Dict, Iterable, List, Set
+
+class Preprocessor:
+    """
+    CNF simplification before output or solving:
+      - unit propagation (assigned variables are removed from the formula)
+      - tautology, duplicate and subsumed clause removal
+      - bounded variable elimination (a variable is resolved away if that does
+        not increase the number of clauses)
+
+    Clauses are indexed by occurrence lists, so each step only visits the
+    clauses containing the literals involved. Variables keep their numbers, so
+    the simplified formula can be solved as is, and extend_model maps a model
+    of it back to a model of the original formula through the reconstruction
+    stack.
+    """
+
+    def __init__(self, nvars: int, clauses: Iterable[Iterable[int]], frozen: Iterable[int] = ()):
+        """
+        @param frozen: variables that must not be eliminated (e.g. variables
+                       that will be used as assumptions)
+        """
+        self.nvars = nvars
+        self.frozen: Set[int] = set(abs(v) for v in frozen)
+        self.clauses: List[List[int]] = []        # clause index -> literals (None once removed)
+        self.occurs: Dict[int, Set[int]] = {}    # literal -> indices of the clauses containing it
+        self.assignment: Dict[int, bool] = {}    # units found by propagation
+        self.stack = []                           # eliminated (variable, clauses), in elimination order
+        self.units: List[int] = []               # propagation queue
+        self.unsat = False
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, clause: Iterable[int]):
+        """
+        Add a clause, dropping falsified literals. Returns its index, or None
+        if it was not added (tautological, satisfied or empty).
+        """
+        lits = set(clause)
+        if any(-lit in lits for lit in lits): return None # Tautology
+        if any(self.value(lit) == True for lit in lits): return None
+        lits = [lit for lit in lits if self.value(lit) != False]
+        if len(lits) == 0:
+            self.unsat = True
+            return None
+
+        index = len(self.clauses)
+        self.clauses.append(sorted(lits, key=abs))
+        for lit in lits:
+            self.occurs.setdefault(lit, set()).add(index)
+        if len(lits) == 1: self.units.append(lits[0])
+        return index
+
+    def remove_clause(self, index: int):
+        for lit in self.clauses[index]:
+            self.occurs[lit].discard(index)
+        self.clauses[index] = None
+
+    def value(self, lit: int):
+        value = self.assignment.get(abs(lit))
+        if value == None: return None
+        return value if lit > 0 else not value
+
+    def occurrences(self, lit: int) -> Set[int]:
+        return self.occurs.get(lit, set())
+
+    def propagate(self) -> bool:
+        """
+        Unit propagation. Returns False if a conflict was found.
+        """
+        while len(self.units) > 0 and not self.unsat:
+            lit = self.units.pop()
+            if self.value(lit) == True: continue
+            if self.value(lit) == False:
+                self.unsat = True
+                break
+            self.assignment[abs(lit)] = lit > 0
+
+            # Clauses containing lit are satisfied
+            for index in list(self.occurrences(lit)):
+                self.remove_clause(index)
+
+            # Clauses containing -lit shrink
+            for index in list(self.occurrences(-lit)):
+                clause = self.clauses[index]
+                clause.remove(-lit)
+                self.occurs[-lit].discard(index)
+                if len(clause) == 0: self.unsat = True
+                elif len(clause) == 1: self.units.append(clause[0])
+        return not self.unsat
+
+    def subsume(self, index: int):
+        """
+        Remove every other clause that contains the given clause
+        """
+        clause = self.clauses[index]
+        lits = set(clause)
+        pivot = min(clause, key=lambda lit: len(self.occurrences(lit)))
+        for other in list(self.occurrences(pivot)):
+            if other == index or self.clauses[other] == None: continue
+            if len(self.clauses[other]) < len(clause): continue
+            if lits.issubset(self.clauses[other]): self.remove_clause(other)
+
+    def subsumption(self):
+        """
+        Remove duplicate and subsumed clauses, shortest clauses first
+        """
+        order = sorted((i for i, clause in enumerate(self.clauses) if clause != None), key=lambda i: len(self.clauses[i]))
+        for index in order:
+            if self.clauses[index] != None: self.subsume(index)
+
+    def eliminate(self, var: int, max_occurrences: int, max_resolvent: int) -> bool:
+        """
+        Try to eliminate a variable by clause distribution. Returns True on success.
+        """
+        pos = [i for i in self.occurrences(var)]
+        neg = [i for i in self.occurrences(-var)]
+        if len(pos) + len(neg) == 0 or len(pos) + len(neg) > max_occurrences: return False
+
+        # Only eliminate if the resolvents do not outnumber the clauses they replace
+        resolvents = []
+        for i in pos:
+            for j in neg:
+                lits = set(self.clauses[i] + self.clauses[j])
+                lits.discard(var)
+                lits.discard(-var)
+                if any(-lit in lits for lit in lits): continue
+                if len(lits) > max_resolvent: return False
+                resolvents.append(lits)
+                if len(resolvents) > len(pos) + len(neg): return False
+
+        self.stack.append((var, [list(self.clauses[i]) for i in pos + neg]))
+        for i in pos + neg:
+            self.remove_clause(i)
+        for lits in resolvents:
+            index = self.add_clause(lits)
+            if index != None: self.subsume(index)
+        return self.propagate()
+
+    def run(self, bve: bool = True, max_occurrences: int = 16, max_resolvent: int = 16):
+        """
+        Simplify the formula. Returns False if it was found to be unsatisfiable.
+        """
+        if not self.propagate(): return False
+        self.subsumption()
+        if bve:
+            # Try cheap variables first
+            candidates = [
+                v for v in range(1, self.nvars + 1)
+                if v not in self.frozen and v not in self.assignment
+            ]
+            candidates.sort(key=lambda v: len(self.occurrences(v)) * len(self.occurrences(-v)))
+            for v in candidates:
+                if v in self.assignment: continue
+                if not self.eliminate(v, max_occurrences, max_resolvent): continue
+                if self.unsat: return False
+        return not self.unsat
+
+    def get_clauses(self) -> List[List[int]]:
+        """
+        Get the simplified formula (an empty clause if it is unsatisfiable)
+        """
+        if self.unsat: return [[]]
+        return [list(clause) for clause in self.clauses if clause != None]
+
+    def extend_model(self, model: List[int]) -> List[int]:
+        """
+        Map a model of the simplified formula (in pysat format: literal of
+        variable v at index v - 1) to a model of the original formula
+        """
+        values = [False] * (self.nvars + 1)
+        for lit in model:
+            if abs(lit) <= self.nvars: values[abs(lit)] = lit > 0
+        for var, value in self.assignment.items():
+            values[var] = value
+
+        # Undo eliminations last to first: make the variable true only if one
+        # of its positive clauses is not satisfied otherwise
+        for var, clauses in reversed(self.stack):
+            values[var] = False
+            for clause in clauses:
+                if var in clause and not any(lit != var and values[abs(lit)] == (lit > 0) for lit in clause):
+                    values[var] = True
+                    break
+
+        return [v if values[v] else -v for v in range(1, self.nvars + 1)]
+
+def preprocess(nvars: int, clauses: Iterable[Iterable[int]], frozen: Iterable[int] = (), bve: bool = True):
+    """
+    Simplify a formula
+
+    Returns (clauses, preprocessor), where preprocessor.extend_model maps models back
+    """
+    preprocessor = Preprocessor(nvars, clauses, frozen)
+    preprocessor.run(bve)
+    return preprocessor.get_clauses(), preprocessor
+
+def read_dimacs(file):
+    nvars = 0
+    clauses = []
+    clause = []
+    for line in file:
+        line = line.strip()
+        if len(line) == 0 or line[0] == 'c': continue
+        if line[0] == 'p':
+            nvars = int(line.split()[2])
+            continue
+        for lit in map(int, line.split()):
+            if lit == 0:
+                clauses.append(clause)
+                clause = []
+            else:
+                clause.append(lit)
+    return nvars, clauses
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog = 'Preprocessor',
+        description = "Simplifies a DIMACS CNF by unit propagation, subsumption and bounded variable elimination"
+    )
+    parser.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    parser.add_argument('--no-bve', action='store_true', help='skip bounded variable elimination')
+    parser.add_argument('--freeze', type=int, nargs='*', default=[], help='variables that must not be eliminated')
+
+    args = parser.parse_args()
+    nvars, clauses = read_dimacs(args.input)
+    simplified, preprocessor = preprocess(nvars, clauses, args.freeze, not args.no_bve)
+
+    print(f'c preprocessed {len(clauses)} clauses into {len(simplified)}')
+    print(f'c {len(preprocessor.assignment)} units, {len(preprocessor.stack)} eliminated variables')
+    print(f'p cnf {nvars} {len(simplified)}')
+    for clause in simplified:
+        print(' '.join(str(lit) for lit in clause) + ' 0')
@@ -0,0 +1,36 @@
+import random
+from pysat.solvers import Glucose3
+from preprocess import preprocess
+
+def satisfies(model, clauses):
+    values = set(model)
+    return all(any(lit in values for lit in clause) for clause in clauses)
+
+def test_preprocess():
+    rng = random.Random(0)
+    for _ in range(200):
+        nvars = rng.randint(1, 12)
+        clauses = [
+            [rng.choice([-1, 1]) * rng.randint(1, nvars) for _ in range(rng.randint(1, 3))]
+            for _ in range(rng.randint(1, 40))
+        ]
+        simplified, preprocessor = preprocess(nvars, clauses)
+
+        with Glucose3(bootstrap_with=clauses) as g:
+            expected = g.solve()
+        with Glucose3(bootstrap_with=simplified) as g:
+            # Satisfiability is preserved, and models extend to the original formula
+            assert g.solve() == expected
+            if expected:
+                assert satisfies(preprocessor.extend_model(g.get_model()), clauses)
+
+def test_frozen():
+    # x1 <=> x2, x2 <=> x3, with x2 used as an assumption
+    clauses = [[-1, 2], [1, -2], [-2, 3], [2, -3]]
+    simplified, preprocessor = preprocess(3, clauses, frozen=[2])
+    assert 2 not in [var for var, _ in preprocessor.stack]
+    with Glucose3(bootstrap_with=simplified) as g:
+        for value in [-2, 2]:
+            assert g.solve(assumptions=[value])
+            model = preprocessor.extend_model(g.get_model())
+            assert value in model and satisfies(model, clauses)
@@ -0,0 +1,47 @@
+import importlib.util, os
+from pysat.card import IDPool
+from pysat.solvers import Glucose3
+
+spec = importlib.util.spec_from_file_location('snake_in_box', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'math', 'snake-in-box.py'))
+snake = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(snake)
+
+def snakes(d: int, length: int, encoding: str):
+    """
+    Enumerate every snake of the given number of vertices, as vertex tuples
+    """
+    snake.vpool = IDPool()
+    clauses = snake.encode_snake_in_box(d, length, None, encoding)
+    assert snake.count_snake_in_box(d, length, encoding) == (snake.vpool._next() + 1, len(clauses), sum(len(clause) for clause in clauses))
+
+    coords = [ [ snake.vpool.id(f"d({i},{k})") for k in range(d) ] for i in range(length) ]
+    found = set()
+    with Glucose3(bootstrap_with=clauses) as g:
+        while g.solve():
+            model = set(g.get_model())
+            found.add(tuple(sum(1 << k for k, v in enumerate(vs) if v in model) for vs in coords))
+            g.add_clause([ -v if v in model else v for vs in coords for v in vs ])
+    return found
+
+def is_snake(path) -> bool:
+    def distance(a: int, b: int) -> int:
+        return bin(a ^ b).count('1')
+    return path[0] == 0 and all(
+        distance(path[i], path[j]) == 1 if j == i + 1 else distance(path[i], path[j]) >= 2
+        for i in range(len(path)) for j in range(i + 1, len(path))
+    )
+
+def test_encodings():
+    for d in range(1, 5):
+        for length in range(1, min(2 ** d, 9) + 1):
+            expected = snakes(d, length, 'coordinates')
+            assert all(is_snake(path) for path in expected)
+            for encoding in snake.SNAKE_ENCODINGS[1:]:
+                assert snakes(d, length, encoding) == expected, f"{encoding}: d = {d}, {length} vertices"
+
+    # The longest snake in the 4-cube has 7 edges
+    assert len(snakes(4, 8, 'onehot')) > 0
+    assert len(snakes(4, 9, 'log')) == 0
+
+if __name__ == '__main__':
+    test_encodings()